@@ -0,0 +1,89 @@
+# PruebaArranque.py
+# Mide cuánto tarda el servidor de imágenes (ResolucionMax.py) en arrancar.
+# Antes: el modelo EDSR se cargaba al importar el módulo, así que Flask y el
+# receptor TCP esperaban a readModel(). Ahora los modelos se cargan en los
+# workers en segundo plano y /salud dice cuándo están listos.
+# Uso: python PruebaArranque.py  (en el directorio de los modelos .pb)
+
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+PUERTO_HTTP = 5000
+PUERTO_CAMARAS = 8080
+TIMEOUT_S = 120
+
+
+def medir_carga_sincronica(archivo="EDSR_x4.pb"):
+    """Lo que pagaba el arranque anterior: importar y cargar EDSR antes de servir."""
+    if not os.path.exists(archivo):
+        return None
+    inicio = time.perf_counter()
+    from cv2 import dnn_superres
+    sr = dnn_superres.DnnSuperResImpl_create()
+    sr.readModel(archivo)
+    sr.setModel("edsr", 4)
+    return time.perf_counter() - inicio
+
+
+def puerto_abierto(puerto):
+    try:
+        with socket.create_connection(("127.0.0.1", puerto), timeout=0.2):
+            return True
+    except OSError:
+        return False
+
+
+def estado_salud():
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{PUERTO_HTTP}/salud", timeout=0.5) as r:
+            return r.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+
+def medir_arranque():
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen([sys.executable, "ResolucionMax.py"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    marcas = {}
+    try:
+        while time.perf_counter() - inicio < TIMEOUT_S and "listo" not in marcas:
+            ahora = time.perf_counter() - inicio
+            salud = estado_salud()
+            if salud is not None:
+                marcas.setdefault("http", ahora)
+            if puerto_abierto(PUERTO_CAMARAS):
+                marcas.setdefault("receptor", ahora)
+            if salud == 200:
+                marcas["listo"] = ahora
+            time.sleep(0.02)
+    finally:
+        proceso.terminate()
+        proceso.wait()
+    return marcas
+
+
+if __name__ == "__main__":
+    inicio = time.perf_counter()
+    import ResolucionMax  # noqa: F401
+    print(f"Importar ResolucionMax: {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    carga = medir_carga_sincronica()
+    if carga is None:
+        print("Antes (carga de EDSR al importar): EDSR_x4.pb no está en este directorio")
+    else:
+        print(f"Antes (carga de EDSR al importar): +{carga * 1000:.0f} ms antes de servir")
+
+    marcas = medir_arranque()
+    for nombre, descripcion in (("http", "Flask responde"), ("receptor", "receptor TCP escucha"),
+                                ("listo", "modelos cargados (/salud 200)")):
+        valor = marcas.get(nombre)
+        texto = f"{valor * 1000:.0f} ms" if valor is not None else f"no ocurrió en {TIMEOUT_S} s"
+        print(f"Ahora, {descripcion}: {texto}")
@@ -0,0 +1,84 @@
+# PruebaCalibracion.py
+# Simula en el PC dos motores no lineales (zona muerta, saturación y el motor
+# A más débil que el B), construye la tabla con calibracion_motores.calibrar
+# a partir de "medidas" con ruido, y compara para varias velocidades pedidas:
+#   - duty proporcional a VELOCIDAD_BASE con AJUSTE_MOTOR_A/B (lo que haría
+#     escalar el ciclo útil sin calibrar)
+#   - la tabla calibrada
+# el error de velocidad y cuánto se desvía el rumbo en un metro de recta.
+# Al final mide cuánto tarda buscar los duties en la tabla.
+
+import math
+import random
+import time
+
+from calibracion_motores import TablaCalibracion, calibrar, DUTY_MAXIMO
+
+# Mismos valores que motor_controller.py (no se puede importar sin machine)
+VELOCIDAD_BASE = 40000
+AJUSTE_MOTOR_A = 0.75
+AJUSTE_MOTOR_B = 1.00
+CM_POR_SEGUNDO = 25.0
+ANCHO_EJE_MM = 150.0
+
+RUIDO_MEDIDA = 0.01  # 1 % de error al medir cada recorrido
+VELOCIDADES = (80, 120, 160, 200, 250, 300, 340)
+REPETICIONES = 20000
+
+# (zona muerta, velocidad máxima mm/s, constante) de cada rueda
+MOTORES = {"a": (10000, 380.0, 18600.0), "b": (12000, 420.0, 31000.0)}
+
+
+def velocidad_rueda(motor, duty):
+    """Velocidad en mm/s de la rueda: nada bajo la zona muerta, satura arriba."""
+    zona, maxima, constante = MOTORES[motor]
+    if duty <= zona:
+        return 0.0
+    return maxima * (1 - math.exp(-(duty - zona) / constante))
+
+
+def medir_simulado(motor, duty, tiempo_s):
+    return velocidad_rueda(motor, duty) * tiempo_s * (1 + random.uniform(-RUIDO_MEDIDA, RUIDO_MEDIDA))
+
+
+def duties_proporcionales(velocidad_mm_s):
+    escala = velocidad_mm_s / (CM_POR_SEGUNDO * 10)
+    return (min(DUTY_MAXIMO, int(VELOCIDAD_BASE * AJUSTE_MOTOR_A * escala)),
+            min(DUTY_MAXIMO, int(VELOCIDAD_BASE * AJUSTE_MOTOR_B * escala)))
+
+
+def evaluar(duty_a, duty_b):
+    """(velocidad real del centro, grados que se desvía el rumbo en 1 m)."""
+    va, vb = velocidad_rueda("a", duty_a), velocidad_rueda("b", duty_b)
+    centro = (va + vb) / 2
+    if centro == 0:
+        return 0.0, float("inf")
+    tiempo_s = 1000 / centro
+    return centro, math.degrees((va - vb) * tiempo_s / ANCHO_EJE_MM)
+
+
+if __name__ == "__main__":
+    random.seed(1)
+    tabla = calibrar(medir_simulado)
+    print(f"Tabla calibrada: {tabla.velocidad_minima:.0f}-{tabla.velocidad_maxima:.0f} mm/s, "
+          f"{len(tabla.duty_a)} entradas por motor ({len(tabla.duty_a) * 2 * 2} bytes)")
+
+    print(f"\n{'pedida':>8} | {'proporcional: real':>19} {'error':>7} {'rumbo/m':>8} | "
+          f"{'calibrada: real':>16} {'error':>7} {'rumbo/m':>8}")
+    for velocidad in VELOCIDADES:
+        columnas = []
+        for ancho, duties in ((19, duties_proporcionales(velocidad)), (16, tabla.duties(velocidad))):
+            real, rumbo = evaluar(*duties)
+            columnas.append(f"{real:{ancho}.0f} {(real - velocidad) / velocidad * 100:+6.1f}% {rumbo:+7.1f}°")
+        print(f"{velocidad:3d} mm/s | " + " | ".join(columnas))
+
+    # Costo de la búsqueda (se hace al arrancar cada avance)
+    inicio = time.perf_counter()
+    for i in range(REPETICIONES):
+        tabla.duties(VELOCIDADES[i % len(VELOCIDADES)])
+    por_busqueda = (time.perf_counter() - inicio) / REPETICIONES * 1e6
+    sin_archivo = TablaCalibracion.por_defecto(CM_POR_SEGUNDO * 10, int(VELOCIDAD_BASE * AJUSTE_MOTOR_A),
+                                               int(VELOCIDAD_BASE * AJUSTE_MOTOR_B))
+    print(f"\nBúsqueda de duties: {por_busqueda:.2f} µs por llamada")
+    print(f"Sin archivo de calibración: duties {sin_archivo.duties(120)} a cualquier velocidad "
+          f"({sin_archivo.velocidad_real(120):.0f} mm/s, como antes)")
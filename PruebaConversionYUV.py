@@ -0,0 +1,67 @@
+# PruebaConversionYUV.py
+# Compara en el PC la conversión YUV422 -> BGR píxel a píxel del servidor
+# original con conversion_yuv.yuv422_a_bgr (vectorizada): tiempo por frame
+# para varios tamaños y que el resultado sea idéntico bit a bit.
+
+import time
+
+import numpy as np
+
+from conversion_yuv import yuv422_a_bgr
+
+TAMANOS = ((160, 120), (320, 240), (640, 480))
+REPETICIONES = 20
+
+
+def yuv422_a_bgr_referencia(yuv, width, height):
+    """
+    Versión píxel a píxel (la del servidor original), solo para comparar.
+    Los valores se pasan a int de Python para que la fórmula no desborde
+    en los escalares uint8 de NumPy.
+    """
+    yuv = np.frombuffer(yuv, dtype=np.uint8).reshape((height, width, 2))
+    bgr = np.zeros((height, width, 3), dtype=np.uint8)
+
+    def convert(y, u, v):
+        c = y - 16
+        d = u - 128
+        e = v - 128
+        r = min(max((298 * c + 409 * e + 128) >> 8, 0), 255)
+        g = min(max((298 * c - 100 * d - 208 * e + 128) >> 8, 0), 255)
+        b = min(max((298 * c + 516 * d + 128) >> 8, 0), 255)
+        return b, g, r
+
+    for y in range(height):
+        for x in range(0, width, 2):
+            y0 = int(yuv[y, x, 0])
+            u = int(yuv[y, x, 1])
+            y1 = int(yuv[y, x + 1, 0])
+            v = int(yuv[y, x + 1, 1])
+            bgr[y, x] = convert(y0, u, v)
+            bgr[y, x + 1] = convert(y1, u, v)
+    return bgr
+
+
+def benchmark(tamanos=TAMANOS, repeticiones=REPETICIONES):
+    """Compara la conversión por bucles contra la vectorizada."""
+    for width, height in tamanos:
+        frame = np.random.randint(0, 256, width * height * 2, dtype=np.uint8).tobytes()
+
+        inicio = time.perf_counter()
+        referencia = yuv422_a_bgr_referencia(frame, width, height)
+        t_ref = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            vectorizado = yuv422_a_bgr(frame, width, height)
+        t_vec = (time.perf_counter() - inicio) / repeticiones
+
+        iguales = np.array_equal(referencia, vectorizado)
+        print(f"{width}x{height}: bucle {t_ref * 1000:.1f} ms | "
+              f"vectorizado {t_vec * 1000:.2f} ms | "
+              f"x{t_ref / t_vec:.0f} | idénticos: {iguales}")
+        assert iguales, (width, height)
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,210 @@
+# PruebaEntregaFiable.py
+# Entrega de comandos de la central al carro en el PC, sobre una red simulada
+# que pierde, duplica y retrasa datagramas (en los dos sentidos):
+#   - antes: UDP sin números; un comando perdido no llega nunca y uno
+#     duplicado se ejecuta dos veces
+#   - ahora: emisor_central.EmisorCentral + IngestaUDP con sobre de secuencia,
+#     ACK y ventana de duplicados
+# Mide comandos ejecutados una sola vez, perdidos, ejecutados dos veces y la
+# latencia de entrega (de enviar() a la cola del carro), además del RTO al
+# que converge el emisor. Por último, RAFAGA comandos seguidos con el primero
+# perdido: tiene que llegar aunque el carro ya haya visto muchos posteriores,
+# y ACK mal formados, que el emisor cuenta y descarta.
+
+import heapq
+import json
+import random
+import time
+
+from emisor_central import EmisorCentral, RTO_INICIAL_MS
+from ingesta_udp import IngestaUDP
+
+MI_IP = "192.168.4.123"
+CARRO = ("192.168.4.123", 5555)
+CENTRAL = ("192.168.4.1", 1234)
+COMANDOS = 200
+SEPARACION_S = 0.01       # Entre comandos de la central
+RETARDO_MS = (3, 8)       # Retardo de un sentido, uniforme
+ESCENARIOS = ((0.0, 0.0), (0.1, 0.02), (0.3, 0.05))  # (pérdida, duplicación)
+RAFAGA = 40
+
+
+class RedConPerdidas:
+    """Datagramas en vuelo ordenados por instante de llegada."""
+
+    def __init__(self, perdida, duplicacion, semilla=1, descartar=()):
+        self.azar = random.Random(semilla)
+        self.perdida = perdida
+        self.duplicacion = duplicacion
+        self.descartar = descartar  # Números de envío (desde 1) que se pierden siempre
+        self.envios = 0
+        self.en_vuelo = []
+        self.orden = 0
+
+    def enviar(self, datos, destino):
+        self.envios += 1
+        if self.envios in self.descartar:
+            return
+        copias = 2 if self.azar.random() < self.duplicacion else 1
+        for _ in range(copias):
+            if self.azar.random() < self.perdida:
+                continue
+            llegada = time.perf_counter() + self.azar.uniform(*RETARDO_MS) / 1000
+            self.orden += 1
+            heapq.heappush(self.en_vuelo, (llegada, self.orden, destino, bytes(datos)))
+
+    def recibir(self, destino):
+        ahora = time.perf_counter()
+        for i, (llegada, _, para, datos) in enumerate(sorted(self.en_vuelo)):
+            if llegada > ahora:
+                return None
+            if para == destino:
+                self.en_vuelo.remove((llegada, _, para, datos))
+                heapq.heapify(self.en_vuelo)
+                return datos
+        return None
+
+
+class SocketSimulado:
+    def __init__(self, red, direccion, remoto):
+        self.red = red
+        self.direccion = direccion
+        self.remoto = remoto
+
+    def sendto(self, datos, destino):
+        self.red.enviar(datos, destino)
+
+    def recv_into(self, buffer):
+        datos = self.red.recibir(self.direccion)
+        if datos is None:
+            raise OSError(11)
+        buffer[:len(datos)] = datos
+        return len(datos)
+
+    def recvfrom(self, tamano):
+        datos = self.red.recibir(self.direccion)
+        if datos is None:
+            raise OSError(11)
+        return datos, self.remoto
+
+
+def comando(i):
+    return json.dumps({"ip_destino": MI_IP, "id_prueba": i,
+                       "Carro_1": {"Paso_1": {"Movimiento": {"distancia_mm": i, "velocidad_mm_s": 200,
+                                                             "radio_mm": "inf"}}}})
+
+
+def vaciar(ingesta, ejecutados, inicio):
+    msg = ingesta.siguiente()
+    while msg is not None:
+        data = msg[1] if msg[1] is not None else json.loads(msg[0])
+        ejecutados.append((data["id_prueba"], time.perf_counter() - inicio[data["id_prueba"]]))
+        msg = ingesta.siguiente()
+
+
+def correr(perdida, duplicacion, fiable):
+    red = RedConPerdidas(perdida, duplicacion)
+    sock_carro = SocketSimulado(red, CARRO, CENTRAL)
+    sock_central = SocketSimulado(red, CENTRAL, CARRO)
+    ingesta = IngestaUDP(sock_carro, MI_IP, lambda crudo: None,
+                         responder=lambda texto: sock_carro.sendto(texto.encode(), CENTRAL))
+    emisor = EmisorCentral(sock_central)
+    ejecutados = []
+    inicio = {}
+    proximo = time.perf_counter()
+    for i in range(COMANDOS):
+        while time.perf_counter() < proximo:
+            if fiable:
+                emisor.procesar()
+            vaciar(ingesta, ejecutados, inicio)
+            time.sleep(0.0005)
+        proximo += SEPARACION_S
+        inicio[i] = time.perf_counter()
+        if fiable:
+            emisor.enviar(comando(i), CARRO)
+        else:
+            sock_central.sendto(comando(i).encode(), CARRO)
+    # Sin ACK no se sabe cuándo acabó: se esperan 3 s. Con ACK, hasta que no
+    # quede nada pendiente (un comando con varios reintentos retiene la ventana)
+    final = time.perf_counter() + (20 if fiable else 3)
+    while time.perf_counter() < final and (not fiable or emisor.procesar()):
+        vaciar(ingesta, ejecutados, inicio)
+        time.sleep(0.0005)
+    time.sleep(0.02)
+    vaciar(ingesta, ejecutados, inicio)
+    return ejecutados, emisor, ingesta
+
+
+def rafaga_sin_el_primero():
+    """RAFAGA comandos seguidos sin esperar ACK; la red pierde el primer datagrama."""
+    red = RedConPerdidas(0.0, 0.0, descartar=(1,))
+    sock_carro = SocketSimulado(red, CARRO, CENTRAL)
+    sock_central = SocketSimulado(red, CENTRAL, CARRO)
+    ingesta = IngestaUDP(sock_carro, MI_IP, lambda crudo: None,
+                         responder=lambda texto: sock_carro.sendto(texto.encode(), CENTRAL))
+    emisor = EmisorCentral(sock_central)
+    ejecutados = []
+    inicio = {}
+    for i in range(RAFAGA):
+        inicio[i] = time.perf_counter()
+        emisor.enviar(comando(i), CARRO)
+    final = time.perf_counter() + 3
+    while time.perf_counter() < final and emisor.procesar():
+        vaciar(ingesta, ejecutados, inicio)
+        time.sleep(0.0005)
+    vaciar(ingesta, ejecutados, inicio)
+    return sorted(i for i, _ in ejecutados), emisor, ingesta
+
+
+def acks_invalidos():
+    red = RedConPerdidas(0.0, 0.0)
+    emisor = EmisorCentral(SocketSimulado(red, CENTRAL, CARRO), sesion=7)
+    emisor.enviar(comando(0), CARRO)
+    for ack in ('{"ack":"1","s":7,"ip":"%s"}', '{"ack":[1],"s":7,"ip":"%s"}', '{"ack":true,"s":7,"ip":"%s"}',
+                '{"ack":1,"s":7}', '{"ack":1,"s":7,"ip":"%s"}'):
+        red.enviar((ack % MI_IP if "%s" in ack else ack).encode(), CENTRAL)
+    time.sleep(0.02)
+    return emisor.procesar(), emisor.invalidos, emisor.confirmados
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(p * len(valores)))] if valores else float("nan")
+
+
+if __name__ == "__main__":
+    print(f"{COMANDOS} comandos cada {SEPARACION_S * 1000:.0f} ms, retardo {RETARDO_MS[0]}-{RETARDO_MS[1]} ms "
+          f"por sentido, RTO inicial {RTO_INICIAL_MS} ms")
+    print(f"\n{'pérdida':>8} {'dup':>5} {'modo':>8} {'una vez':>8} {'perdidos':>9} {'dos veces':>10} "
+          f"{'mediana ms':>11} {'p95 ms':>7} {'máx ms':>7} {'reenvíos':>9} {'rápidos':>8} {'RTO ms':>7}")
+    for perdida, duplicacion in ESCENARIOS:
+        for fiable in (False, True):
+            ejecutados, emisor, ingesta = correr(perdida, duplicacion, fiable)
+            veces = {}
+            for i, _ in ejecutados:
+                veces[i] = veces.get(i, 0) + 1
+            una = sum(1 for v in veces.values() if v == 1)
+            dobles = sum(1 for v in veces.values() if v > 1)
+            primeras = {}
+            for i, latencia in ejecutados:
+                primeras.setdefault(i, latencia * 1000)
+            latencias = list(primeras.values())
+            extra = (f"{emisor.retransmisiones:9d} {emisor.rapidas:8d} {emisor.rto:7d}" if fiable
+                     else f"{'-':>9} {'-':>8} {'-':>7}")
+            print(f"{perdida:8.0%} {duplicacion:5.0%} {'fiable' if fiable else 'antes':>8} {una:8d} "
+                  f"{COMANDOS - len(veces):9d} {dobles:10d} {percentil(latencias, 0.5):11.1f} "
+                  f"{percentil(latencias, 0.95):7.1f} {max(latencias):7.1f} {extra}")
+            if fiable:
+                assert una == COMANDOS and dobles == 0, (perdida, duplicacion)
+                assert emisor.fallidos == 0
+    print("\nuna vez: ejecutados exactamente una vez; latencia: hasta la primera entrega en la cola del carro")
+
+    ejecutados, emisor, ingesta = rafaga_sin_el_primero()
+    print(f"\n{RAFAGA} comandos seguidos con el primero perdido: {len(set(ejecutados))} ejecutados, "
+          f"{len(ejecutados) - len(set(ejecutados))} dos veces, {emisor.retransmisiones} reenvíos, "
+          f"{ingesta.duplicados} repetidos descartados en el carro")
+    assert ejecutados == list(range(RAFAGA)) and emisor.fallidos == 0
+
+    pendientes, invalidos, confirmados = acks_invalidos()
+    print(f"ACK mal formados: {invalidos} descartados, {confirmados} confirmado por el bueno")
+    assert (pendientes, invalidos, confirmados) == (0, 4, 1)
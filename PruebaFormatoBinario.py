@@ -0,0 +1,148 @@
+# PruebaFormatoBinario.py
+# Formato binario de formato_binario.py frente al JSON de siempre, en el PC:
+#   - ida y vuelta: JSON -> binario -> plan da el mismo plan que
+#     compilar_programa, y binario -> JSON -> binario da los mismos bytes
+#   - valores que no caben se rechazan con ValueError
+#   - un programa binario que llega por IngestaUDP se abre con el mismo plan
+#     que su JSON, y uno para otro carro se reenvía sin tocar; un JSON con
+#     una clave "plan" no cuela ese plan
+#   - tamaño y tiempo de decodificación (json.loads + compilar_programa
+#     frente a decodificar) para varios tamaños de programa
+
+import json
+import random
+import time
+
+import comandos
+from comandos import abrir_programa, compilar_programa
+from formato_binario import a_json, codificar, decodificar, TAMANO_CABECERA, TAMANO_REGISTRO
+from ingesta_udp import IngestaUDP
+
+MI_IP = "192.168.4.123"
+OTRA_IP = "192.168.4.124"
+REPETICIONES = 2000
+
+
+def programa(pasos, semilla=1, ip=MI_IP):
+    azar = random.Random(semilla)
+    carro = {}
+    for i in range(1, pasos + 1):
+        mov = {"distancia_mm": azar.randint(-2000, 2000), "velocidad_mm_s": azar.choice((100, 150, 250)),
+               "radio_mm": azar.choice(("inf", "INF", 90, -45, 12.5, 0))}
+        if mov["radio_mm"] not in ("inf", "INF") and azar.random() < 0.5:
+            mov["vel_grados_s"] = azar.choice((30, 90))
+        paso = {"Movimiento": mov}
+        if azar.random() < 0.4:
+            paso["Brazo"] = {"angulo0_grados": azar.randint(0, 180), "angulo1_grados": 45.5,
+                             "angulo2_grados": azar.randint(0, 90), "t_ser": azar.choice((0.5, 1.0, 1.25))}
+            if azar.random() < 0.5:
+                paso["Brazo"]["curva"] = azar.choice(("lineal", "coseno", "min_jerk"))
+        if azar.random() < 0.5:
+            paso["sincronia"] = azar.choice(("paralelo", "brazo_primero", "avance_primero"))
+        carro["Paso_{}".format(i)] = paso
+    return {"ip_destino": ip, "permitir_arcos": bool(semilla % 2), "Carro_{}".format(semilla % 4 + 1): carro}
+
+
+class SocketSimulado:
+    def __init__(self, datagramas):
+        self.datagramas = list(datagramas)
+
+    def recv_into(self, buffer):
+        if not self.datagramas:
+            raise OSError(11)
+        d = self.datagramas.pop(0)
+        buffer[:len(d)] = d
+        return len(d)
+
+
+def comprobar_ida_y_vuelta():
+    for semilla in range(200):
+        data = programa(1 + semilla % 30, semilla)
+        binario = codificar(data)
+        decodificado, plan = decodificar(binario)
+        assert plan == compilar_programa(data), semilla
+        assert decodificado["ip_destino"] == MI_IP
+        assert decodificado["permitir_arcos"] == data["permitir_arcos"]
+        assert compilar_programa(a_json(binario)) == compilar_programa(data)
+        assert codificar(a_json(binario)) == binario
+        assert codificar(json.loads(json.dumps(a_json(binario)))) == binario
+    print("Ida y vuelta JSON <-> binario: 200 programas, mismos planes y mismos bytes")
+
+
+def comprobar_rechazos():
+    base = programa(3)
+    casos = (("distancia con decimales", ("Movimiento", "distancia_mm"), 10.5),
+             ("distancia fuera de rango", ("Movimiento", "distancia_mm"), 40000),
+             ("ángulo con dos decimales", ("Brazo", "angulo0_grados"), 10.25),
+             ("curva desconocida", ("Brazo", "curva"), "cubica"),
+             ("velocidad negativa", ("Movimiento", "velocidad_mm_s"), -5))
+    for nombre, (seccion, campo), valor in casos:
+        data = json.loads(json.dumps(base))
+        paso = data["Carro_2"]["Paso_1"]
+        paso.setdefault("Brazo", {"angulo0_grados": 0, "angulo1_grados": 0, "angulo2_grados": 0})
+        paso[seccion][campo] = valor
+        try:
+            codificar(data)
+        except ValueError:
+            continue
+        raise AssertionError("No se rechazó: " + nombre)
+    binario = codificar(base)
+    for malo in (binario[:-1], b"\xfe\x02" + binario[2:], binario[:TAMANO_CABECERA - 1],
+                 binario[:-2] + b"\x07\x00"):
+        try:
+            decodificar(malo)
+        except ValueError:
+            continue
+        raise AssertionError("Se aceptó un binario inválido")
+    print(f"Rechazos: {len(casos)} valores no representables y 4 binarios corruptos dan ValueError")
+
+
+def comprobar_ingesta():
+    local = programa(12, 3)
+    otro = programa(12, 5, ip=OTRA_IP)
+    reenviados = []
+    inyectados = [json.dumps(dict(local, plan=[[9, 9, 9]])).encode(),
+                  json.dumps({"ip_destino": MI_IP, "plan": [[9, 9, 9]]}).encode()]
+    ingesta = IngestaUDP(SocketSimulado([codificar(local), codificar(otro), json.dumps(local).encode(),
+                                         b"\xfe\x01basura"] + inyectados),
+                         MI_IP, lambda crudo: reenviados.append(bytes(crudo)))
+    comandos.cache_planes.__init__(comandos.cache_planes.capacidad)
+    mensajes = []
+    msg = ingesta.siguiente()
+    while msg is not None:
+        mensajes.append(msg)
+        msg = ingesta.siguiente()
+    planes = []
+    for texto, data, plan in mensajes:
+        abierto = abrir_programa(texto, data=data, plan=plan)
+        planes.append(abierto and tuple(abierto.pasos[i] for i in sorted(abierto.pasos)))
+    assert len(planes) == 4 and planes[0] == planes[1] == planes[2] == compilar_programa(local)
+    assert planes[3] is None
+    assert reenviados == [codificar(otro)] and ingesta.invalidos == 1
+    print("Ingesta: binario y JSON del mismo programa dan el mismo plan; el de otro carro se reenvía "
+          "byte a byte; el corrupto se descarta; \"plan\" en un JSON se ignora")
+
+
+def medir(funcion, argumento):
+    inicio = time.perf_counter()
+    for _ in range(REPETICIONES):
+        funcion(argumento)
+    return (time.perf_counter() - inicio) / REPETICIONES * 1e6
+
+
+if __name__ == "__main__":
+    comprobar_ida_y_vuelta()
+    comprobar_rechazos()
+    comprobar_ingesta()
+
+    print(f"\nCabecera {TAMANO_CABECERA} B + {TAMANO_REGISTRO} B por paso")
+    print(f"{'pasos':>6} {'JSON B':>8} {'binario B':>10} {'relación':>9} "
+          f"{'µs JSON':>9} {'µs binario':>11} {'aceleración':>12}")
+    for pasos in (1, 8, 30, 70):
+        data = programa(pasos, pasos)
+        texto = json.dumps(data)
+        binario = codificar(data)
+        t_json = medir(lambda t: compilar_programa(json.loads(t)), texto)
+        t_binario = medir(decodificar, binario)
+        print(f"{pasos:6d} {len(texto):8d} {len(binario):10d} {len(texto) / len(binario):8.1f}x "
+              f"{t_json:9.1f} {t_binario:11.1f} {t_json / t_binario:11.1f}x")
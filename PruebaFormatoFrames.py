@@ -0,0 +1,118 @@
+# PruebaFormatoFrames.py
+# Compara el ancho de banda y la velocidad de los modos de codec_frames sobre
+# secuencias de frames sintéticas, y verifica que el servidor reconstruye
+# exactamente lo que envió la cámara.
+# Los tiempos de codificación son de CPython; en la Pico W son mayores.
+
+import time
+
+import numpy as np
+
+from codec_frames import CodificadorFrames, DecodificadorFrames, desempaquetar_cabecera, TAMANO_CABECERA
+
+WIDTH, HEIGHT = 320, 240
+FRAMES = 30
+
+MODOS = {
+    "crudo (4 B + YUV)": None,
+    "clave": dict(),
+    "luma": dict(luma=True),
+    "delta": dict(delta=True),
+    "luma + delta": dict(luma=True, delta=True),
+}
+
+
+def fondo(rng):
+    return rng.integers(0, 256, (HEIGHT, WIDTH * 2), dtype=np.uint8)
+
+
+def secuencia_estatica(rng):
+    base = fondo(rng)
+    return [base.copy() for _ in range(FRAMES)]
+
+
+def secuencia_objeto(rng):
+    base = fondo(rng)
+    frames = []
+    for i in range(FRAMES):
+        frame = base.copy()
+        y = 20 + i * 5
+        frame[y:y + 40, 100:180] = 255
+        frames.append(frame)
+    return frames
+
+
+def secuencia_ruido(rng):
+    # Ruido de sensor: unos pocos píxeles cambian en la mitad de las filas
+    base = fondo(rng)
+    frames = []
+    for _ in range(FRAMES):
+        frame = base.copy()
+        filas = rng.choice(HEIGHT, HEIGHT // 2, replace=False)
+        frame[filas, rng.integers(0, WIDTH * 2, HEIGHT // 2)] ^= 1
+        frames.append(frame)
+    return frames
+
+
+def secuencia_panoramica(rng):
+    base = fondo(rng)
+    return [np.roll(base, 2 * i, axis=1) for i in range(FRAMES)]
+
+
+SECUENCIAS = {
+    "estática": secuencia_estatica,
+    "objeto en movimiento": secuencia_objeto,
+    "ruido de sensor": secuencia_ruido,
+    "panorámica": secuencia_panoramica,
+}
+
+
+def esperado(frame, luma):
+    if not luma:
+        return frame.tobytes()
+    salida = frame.copy()
+    salida[:, 1::2] = 128
+    return salida.tobytes()
+
+
+def medir(frames, opciones):
+    if opciones is None:
+        return len(frames[0].tobytes()) + 4, 0.0, 0.0, True
+
+    codificador = CodificadorFrames(WIDTH, HEIGHT, **opciones)
+    decodificador = DecodificadorFrames()
+    total_bytes = 0
+    t_codificar = t_decodificar = 0.0
+    exacto = True
+    for i, frame in enumerate(frames):
+        buf = bytearray(frame.tobytes())
+
+        inicio = time.perf_counter()
+        trozos = codificador.codificar(buf, i * 33)
+        t_codificar += time.perf_counter() - inicio
+
+        mensaje = b"".join(bytes(trozo) for trozo in trozos)
+        total_bytes += len(mensaje)
+
+        inicio = time.perf_counter()
+        cabecera = desempaquetar_cabecera(mensaje[:TAMANO_CABECERA])
+        reconstruido = decodificador.decodificar(cabecera, bytearray(mensaje[TAMANO_CABECERA:]))
+        t_decodificar += time.perf_counter() - inicio
+
+        exacto = exacto and bytes(reconstruido) == esperado(frame, opciones.get("luma"))
+    n = len(frames)
+    return total_bytes / n, t_codificar / n, t_decodificar / n, exacto
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    crudo = WIDTH * HEIGHT * 2 + 4
+    for nombre_secuencia, generar in SECUENCIAS.items():
+        frames = generar(rng)
+        print(f"\n== {nombre_secuencia} ({FRAMES} frames {WIDTH}x{HEIGHT}) ==")
+        for nombre_modo, opciones in MODOS.items():
+            promedio, t_cod, t_dec, exacto = medir(frames, opciones)
+            print(f"{nombre_modo:>18}: {promedio / 1024:7.1f} KiB/frame ({promedio / crudo * 100:5.1f} %) | "
+                  f"codificar {t_cod * 1000:6.2f} ms | decodificar {t_dec * 1000:5.2f} ms | "
+                  f"exacto: {exacto}")
+            assert exacto, (nombre_secuencia, nombre_modo)
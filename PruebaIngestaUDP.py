@@ -0,0 +1,189 @@
+# PruebaIngestaUDP.py
+# Ráfaga de datagramas por UDP en localhost contra:
+#   - la recepción anterior de CarroWiFi.recibir_del_central (un datagrama
+#     por llamada con recvfrom(8192), json.loads para mirar ip_destino,
+#     json.dumps para reenviar) seguida del despacho anterior del runtime
+#     (control_de + abrir_programa, que vuelve a parsear el texto)
+#   - ingesta_udp.IngestaUDP (drenado sobre un buffer fijo, un solo parseo,
+#     el data parseado llega hasta abrir_programa)
+# Mide tiempo por datagrama, json.loads por datagrama, buffers de recepción
+# creados y memoria de pico. La escritura en la OLED que hacía la recepción
+# anterior no se simula (en la Pico W es además una escritura I2C por mensaje).
+# Antes comprueba que los datagramas que no son UTF-8 ni JSON se descartan.
+
+import json
+import socket
+import time
+import tracemalloc
+
+import comandos
+from comandos import abrir_programa, control_de
+from ingesta_udp import IngestaUDP
+
+MI_IP = "192.168.4.123"
+OTRA_IP = "192.168.4.124"
+RAFAGA = 300
+REPETIDOS = 4     # De cada programa local se envían unos cuantos iguales (caché)
+
+
+def programa(ip, distancia):
+    pasos = {"Paso_{}".format(i): {"Movimiento": {"distancia_mm": distancia + i, "velocidad_mm_s": 200,
+                                                  "radio_mm": "inf" if i % 2 else 90}}
+             for i in range(1, 6)}
+    return json.dumps({"ip_destino": ip, "Carro_1": pasos})
+
+
+def rafaga():
+    mensajes = []
+    for i in range(RAFAGA):
+        if i % 3 == 0:
+            mensajes.append(programa(OTRA_IP, i))
+        else:
+            mensajes.append(programa(MI_IP, (i // REPETIDOS) * 10))
+    return mensajes
+
+
+class ContadorParseos:
+    """Cuenta las llamadas a json.loads (comandos e ingesta_udp usan el módulo json)."""
+
+    def __init__(self):
+        self.llamadas = 0
+        self._original = json.loads
+
+    def __enter__(self):
+        def contar(*args, **kwargs):
+            self.llamadas += 1
+            return self._original(*args, **kwargs)
+        json.loads = contar
+        return self
+
+    def __exit__(self, *exc):
+        json.loads = self._original
+
+
+class RecepcionAnterior:
+    """Copia de CarroWiFi.recibir_del_central antes del cambio (sin OLED)."""
+
+    def __init__(self, sock):
+        self.s = sock
+        self.my_ip = MI_IP
+        self.uart = []
+        self.buffers = 0
+
+    def recibir_del_central(self):
+        try:
+            data, addr = self.s.recvfrom(8192)
+            self.buffers += 1
+            msg = data.decode('utf-8')
+            try:
+                json_data = json.loads(msg)
+                ip_destino = json_data.get("ip_destino", "")
+                if ip_destino == self.my_ip:
+                    return msg
+                else:
+                    self.uart.append(json.dumps(json_data) + "\n")
+                return
+            except ValueError:
+                return msg
+        except OSError:
+            return None
+
+
+def vaciar_cache():
+    # Misma instancia que usan comandos e ingesta_udp, vacía para cada medida
+    comandos.cache_planes.__init__(comandos.cache_planes.capacidad)
+
+
+def sockets():
+    receptor = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receptor.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    receptor.bind(("127.0.0.1", 0))
+    receptor.setblocking(False)
+    emisor = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    return receptor, emisor
+
+
+def enviar(emisor, destino, mensajes):
+    for m in mensajes:
+        emisor.sendto(m.encode(), destino)
+    time.sleep(0.05)  # Que lleguen todos al buffer del receptor
+
+
+def medir_anterior(mensajes):
+    receptor, emisor = sockets()
+    recepcion = RecepcionAnterior(receptor)
+    enviar(emisor, receptor.getsockname(), mensajes)
+    vaciar_cache()
+    sondeos = 0
+    with ContadorParseos() as parseos:
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        # Bucle de red del runtime: se lee hasta que recibir_del_central
+        # devuelve None... o un reenvío, que también devolvía None
+        while recepcion.buffers < len(mensajes):
+            sondeos += 1
+            msg = recepcion.recibir_del_central()
+            while msg:
+                control_de(msg)
+                abrir_programa(msg)
+                msg = recepcion.recibir_del_central()
+        duracion = time.perf_counter() - inicio
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    receptor.close()
+    emisor.close()
+    return duracion, parseos.llamadas, recepcion.buffers, sondeos, len(recepcion.uart), pico
+
+
+def probar_invalidos():
+    """Basura en el socket se cuenta y se descarta sin tumbar la ingesta."""
+    receptor, emisor = sockets()
+    reenviados = []
+    ingesta = IngestaUDP(receptor, MI_IP, lambda crudo: reenviados.append(bytes(crudo)))
+    for datos in (b'\xff\xfe{"x":1}', b'@1:1\n\xff\xfe{"x":1}', b'[1, 2]', programa(MI_IP, 10).encode()):
+        emisor.sendto(datos, receptor.getsockname())
+    time.sleep(0.05)
+    ingesta.drenar()
+    receptor.close()
+    emisor.close()
+    assert ingesta.recibidos == 4 and ingesta.invalidos == 3 and not reenviados, vars(ingesta)
+    assert ingesta.siguiente() is not None and ingesta.siguiente() is None
+
+
+def medir_ingesta(mensajes):
+    receptor, emisor = sockets()
+    reenviados = []
+    ingesta = IngestaUDP(receptor, MI_IP, lambda crudo: reenviados.append(bytes(crudo)))
+    enviar(emisor, receptor.getsockname(), mensajes)
+    vaciar_cache()
+    sondeos = 0
+    with ContadorParseos() as parseos:
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        while ingesta.recibidos < len(mensajes):
+            sondeos += 1
+            msg = ingesta.siguiente()
+            while msg is not None:
+                control_de(msg[0], msg[1])
+                abrir_programa(msg[0], data=msg[1], plan=msg[2])
+                msg = ingesta.siguiente()
+        duracion = time.perf_counter() - inicio
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    receptor.close()
+    emisor.close()
+    return duracion, parseos.llamadas, 0, sondeos, len(reenviados), pico
+
+
+if __name__ == "__main__":
+    probar_invalidos()
+    mensajes = rafaga()
+    print(f"Ráfaga de {len(mensajes)} datagramas ({sum(MI_IP in m for m in mensajes)} para este carro, "
+          f"cada programa repetido {REPETIDOS} veces)")
+    print(f"\n{'':>10} {'µs/datagrama':>13} {'json.loads/datagrama':>21} {'buffers':>8} "
+          f"{'sondeos':>8} {'reenviados':>10} {'pico heap':>10}")
+    for nombre, medir in (("anterior", medir_anterior), ("ingesta", medir_ingesta)):
+        duracion, parseos, buffers, sondeos, reenviados, pico = medir(mensajes)
+        print(f"{nombre:>10} {duracion / len(mensajes) * 1e6:13.1f} {parseos / len(mensajes):21.2f} {buffers:8d} "
+              f"{sondeos:8d} {reenviados:10d} {pico / 1024:8.1f} KB")
+    print("\nsondeos: vueltas del bucle de red para vaciar la ráfaga (antes cada reenvío cortaba la lectura)")
@@ -0,0 +1,100 @@
+# PruebaInterpolacionBrazo.py
+# Compara en el PC el movimiento del brazo anterior (_mover_suavemente: 1000
+# iteraciones con sleep por servo, base, hombro y codo uno detrás de otro)
+# con interpolacion_brazo (los tres servos en un solo tick, contra plazos):
+#   - cuánto tarda de verdad un movimiento pedido de TIEMPO_S
+#   - cuántas veces se escriben los servos según lo que se mueven
+#   - velocidad inicial y máxima de cada curva (lo brusco que arranca)
+
+import time
+
+from comandos import CURVAS
+from interpolacion_brazo import TrayectoriaBrazo, recorrer, PERIODO_SERVO_MS
+
+TIEMPO_S = 1.0
+DESDE = (0, 90, 90)
+HASTA = (90, 45, 30)
+CALIBRACION = {'base': (-9717, 1532862), 'hombro': (-11111, 1550000), 'codo': (-11668, 1550000)}
+
+
+class ServoSimulado:
+    def __init__(self):
+        self.escrituras = 0
+
+    def duty_ns(self, duty):
+        self.escrituras += 1
+
+
+def angulo_a_duty_ns(servo_nombre, angulo):
+    m, b = CALIBRACION[servo_nombre]
+    return int(m * angulo + b)
+
+
+def mover_suavemente_anterior(servo_pwm, servo_nombre, angulo_actual, angulo_final, tiempo_segundos):
+    """Copia de BrazoRobotico._mover_suavemente antes del cambio."""
+    pasos = 1000
+    delay = tiempo_segundos / pasos
+    delta = (angulo_final - angulo_actual) / pasos
+    for i in range(pasos + 1):
+        angulo_interpolado = angulo_actual + delta * i
+        servo_pwm.duty_ns(angulo_a_duty_ns(servo_nombre, angulo_interpolado))
+        time.sleep(delay)
+
+
+def medir_anterior():
+    servos = {nombre: ServoSimulado() for nombre in CALIBRACION}
+    inicio = time.perf_counter()
+    for i, nombre in enumerate(CALIBRACION):
+        mover_suavemente_anterior(servos[nombre], nombre, DESDE[i], HASTA[i], TIEMPO_S)
+    return time.perf_counter() - inicio, sum(s.escrituras for s in servos.values())
+
+
+def medir_nuevo(desde, hasta, curva):
+    servos = {nombre: ServoSimulado() for nombre in CALIBRACION}
+    nombres = tuple(CALIBRACION)
+
+    def posicionar_paso(trayectoria, k):
+        for nombre, angulo in zip(nombres, trayectoria.angulos(k)):
+            servos[nombre].duty_ns(angulo_a_duty_ns(nombre, angulo))
+
+    trayectoria = TrayectoriaBrazo(desde, hasta, TIEMPO_S * 1000, curva)
+    inicio = time.perf_counter()
+    recorrer(trayectoria, posicionar_paso)
+    return time.perf_counter() - inicio, sum(s.escrituras for s in servos.values()), trayectoria
+
+
+def velocidades(trayectoria):
+    """(velocidad del primer paso, velocidad máxima) de la articulación que más se mueve, en °/s."""
+    j = max(range(3), key=lambda i: abs(trayectoria.delta[i]))
+    por_paso = []
+    for k in range(1, trayectoria.pasos + 1):
+        grados = abs(trayectoria.angulos(k)[j] - trayectoria.angulos(k - 1)[j])
+        por_paso.append(grados * 1000 / (trayectoria.instante_ms(k) - trayectoria.instante_ms(k - 1)))
+    return por_paso[0], max(por_paso)
+
+
+def comprobar_paso_en():
+    """paso_en es la inversa de instante_ms, también cuando la división no es exacta."""
+    for duracion, delta in ((1000, 90), (1000, 3), (999, 7), (300, 45), (50, 90)):
+        trayectoria = TrayectoriaBrazo(DESDE, (DESDE[0] + delta, DESDE[1], DESDE[2]), duracion)
+        for t in range(-1, trayectoria.duracion_ms + 2):
+            k = trayectoria.paso_en(t)
+            assert k == 0 or trayectoria.instante_ms(k) <= t, (duracion, delta, t, k)
+            assert k == trayectoria.pasos or trayectoria.instante_ms(k + 1) > t, (duracion, delta, t, k)
+
+
+if __name__ == "__main__":
+    comprobar_paso_en()
+    print(f"Movimiento {DESDE} -> {HASTA} pedido en {TIEMPO_S:.1f} s")
+    duracion, escrituras = medir_anterior()
+    print(f"{'anterior (servo a servo)':>28}: {duracion:5.2f} s, {escrituras} escrituras de servo")
+    for nombre, curva in CURVAS.items():
+        duracion, escrituras, trayectoria = medir_nuevo(DESDE, HASTA, curva)
+        inicial, maxima = velocidades(trayectoria)
+        print(f"{'interpolación ' + nombre:>28}: {duracion:5.2f} s, {escrituras} escrituras de servo, "
+              f"velocidad inicial {inicial:5.1f} °/s, máxima {maxima:5.1f} °/s")
+
+    print(f"\nPasos según lo que se mueve (máximo uno cada {PERIODO_SERVO_MS} ms):")
+    for delta in (0, 1, 5, 20, 90):
+        trayectoria = TrayectoriaBrazo(DESDE, (DESDE[0] + delta, DESDE[1], DESDE[2]), TIEMPO_S * 1000)
+        print(f"  {delta:3d}°: {trayectoria.pasos:3d} pasos")
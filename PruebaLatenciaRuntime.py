@@ -0,0 +1,315 @@
+# PruebaLatenciaRuntime.py
+# Mide en el PC la latencia entre que llega un mensaje y el carro reacciona,
+# usando runtime_carro.RuntimeCarro con motor (MotorController sin machine), brazo y red simulados.
+#   - programa nuevo con el carro quieto: hasta que arrancan los motores
+#   - "abortar" mientras se mueve: hasta que se detienen los motores
+#   - "reemplazar" mientras se mueve: hasta que arranca el programa nuevo
+# Con el bucle bloqueante anterior, un mensaje que llega durante un programa no
+# se leía hasta terminarlo: esa latencia es el tiempo que le quedaba al programa.
+# Además, un fragmento con un paso inválido (o un mensaje que ni siquiera es un
+# objeto) durante un programa no puede terminar el runtime, y con la cola de
+# pendientes llena la ingesta deja de confirmar programas (la central los
+# repetirá) en vez de descartar alguno ya confirmado.
+
+import asyncio
+import json
+import random
+import sys
+import time
+import types
+
+from calibracion_motores import TablaCalibracion
+from comandos import fragmentar_programa
+from ingesta_udp import IngestaUDP
+from perfiles_movimiento import Rampa, crear_perfil
+from runtime_carro import RuntimeCarro, TICK_RED_MS, MAX_PENDIENTES
+from secuencia import sobre
+
+
+class _Salida:
+    """Pin, PWM y Timer de machine que no hacen nada: en el PC no hay hardware."""
+    OUT = 1
+    PERIODIC = 1
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def value(self, *args):
+        return 0
+
+    def freq(self, *args):
+        pass
+
+    def duty_u16(self, *args):
+        pass
+
+    def init(self, *args, **kwargs):
+        pass
+
+    def deinit(self):
+        pass
+
+
+try:
+    import machine
+except ImportError:
+    machine = types.ModuleType("machine")
+    machine.Pin = machine.PWM = machine.Timer = _Salida
+    sys.modules["machine"] = machine
+
+from motor_controller import MotorController, CM_POR_SEGUNDO
+
+REPETICIONES = 20
+MI_IP = "192.168.0.123"
+
+
+class MotorSimulado(MotorController):
+    """
+    MotorController con las salidas de machine simuladas: las duraciones, los
+    arcos y los perfiles son los de verdad, y se registra cuándo arranca y para.
+    aceleracion: la de las rampas de los avances (None: sin rampas, velocidad constante).
+    """
+
+    def __init__(self, aceleracion=None):
+        super().__init__()
+        self.aceleracion = aceleracion
+        # Sin archivo de calibración, aunque haya uno en el directorio de la prueba
+        self.calibracion = TablaCalibracion.por_defecto(CM_POR_SEGUNDO * 10, self.velocidad_a, self.velocidad_b)
+        self.en_movimiento = False
+        self.cambios = []  # (instante, en_movimiento)
+
+    def _marcar(self, en_movimiento):
+        if en_movimiento != self.en_movimiento:
+            self.en_movimiento = en_movimiento
+            self.cambios.append((time.perf_counter(), en_movimiento))
+
+    def perfil_avance(self, distancia_mm, velocidad_mm_s=None, acelerar=True, frenar=True):
+        rampa = Rampa(self.calibracion, velocidad_mm_s, self.aceleracion)
+        return crear_perfil(rampa, distancia_mm, acelerar, frenar)
+
+    def iniciar_avance(self, adelante=True, velocidad_mm_s=None, perfil=None):
+        super().iniciar_avance(adelante, velocidad_mm_s, perfil)
+        self._marcar(True)
+
+    def iniciar_arco(self, derecha, adelante, relacion, velocidad_mm_s=None):
+        super().iniciar_arco(derecha, adelante, relacion, velocidad_mm_s)
+        self._marcar(True)
+
+    def iniciar_giro(self, derecha=True):
+        super().iniciar_giro(derecha)
+        self._marcar(True)
+
+    def detener(self):
+        super().detener()
+        self._marcar(False)
+
+
+class BrazoSimulado:
+    def __init__(self):
+        self.angulos_actuales = [0, 90, 90]
+
+    def destino(self, angulos):
+        return tuple(angulos)
+
+    def posicionar_paso(self, trayectoria, k):
+        self.angulos_actuales = list(trayectoria.angulos(k))
+
+
+class RedSimulada:
+    """Entrega los mensajes de 'entrantes' ya parseados, como ingesta_udp."""
+    send_interval = 5
+
+    def __init__(self):
+        self.entrantes = []
+
+    def recibir(self):
+        if not self.entrantes:
+            return None
+        texto = self.entrantes.pop(0)
+        return texto, json.loads(texto), None
+
+    def enviar(self, texto):
+        return True
+
+    def read_internal_temp(self):
+        return 30.0
+
+
+class SocketSimulado:
+    def __init__(self):
+        self.datagramas = []
+
+    def recv_into(self, buffer):
+        if not self.datagramas:
+            raise OSError(11)  # EAGAIN
+        datos = self.datagramas.pop(0)
+        buffer[:len(datos)] = datos
+        return len(datos)
+
+
+class RedConIngesta(RedSimulada):
+    """Como CarroWiFi: los datagramas pasan por IngestaUDP y se guardan los ACK."""
+
+    def __init__(self):
+        super().__init__()
+        self.sock = SocketSimulado()
+        self.confirmados = []
+        self.ingesta = IngestaUDP(self.sock, MI_IP, lambda datagrama: True, responder=self.enviar)
+
+    def recibir(self):
+        return self.ingesta.siguiente()
+
+    def enviar(self, texto):
+        if texto.startswith('{"ack"'):
+            self.confirmados.append(json.loads(texto)["ack"])
+        return True
+
+
+def programa(distancia_mm, pasos=1):
+    carro = {"Paso_{}".format(i): {"Movimiento": {"distancia_mm": distancia_mm, "velocidad_mm_s": 1000,
+                                                  "radio_mm": "inf"}}
+             for i in range(1, pasos + 1)}
+    return {"ip_destino": MI_IP, "Carro_1": carro}
+
+
+def primer_cambio(motor, desde, en_movimiento):
+    for instante, estado in motor.cambios:
+        if instante >= desde and estado == en_movimiento:
+            return instante - desde
+    return None
+
+
+async def escenario(rng):
+    motor = MotorSimulado()
+    red = RedSimulada()
+    runtime = RuntimeCarro(motor, BrazoSimulado(), red)
+    tarea = asyncio.create_task(runtime.correr())
+    # El programa dura 10 pasos de 30 cm (12 s). Antes cada paso esperaba además
+    # distancia / velocidad y tomaba los mm como cm (30 mm -> 1.2 s + 0.03 s)
+    largo = programa(300, pasos=10)
+    duracion = 10 * (300 / CM_POR_SEGUNDO + 300 / 1000)
+
+    await asyncio.sleep(0.05)
+    inicio = time.perf_counter()
+    red.entrantes.append(json.dumps(largo))
+    await asyncio.sleep(0.2)
+    arranque = primer_cambio(motor, inicio, True)
+
+    # Abortar en un momento al azar del programa
+    await asyncio.sleep(rng.uniform(0, 1.5))
+    restante = duracion - (time.perf_counter() - inicio)
+    marca = time.perf_counter()
+    red.entrantes.append(json.dumps({"control": "abortar"}))
+    await asyncio.sleep(0.1)
+    aborto = primer_cambio(motor, marca, False)
+
+    # Reemplazar un programa en curso
+    red.entrantes.append(json.dumps(largo))
+    await asyncio.sleep(0.3 + rng.uniform(0, 1.0))
+    nuevo = dict(programa(200), control="reemplazar")
+    marca = time.perf_counter()
+    red.entrantes.append(json.dumps(nuevo))
+    await asyncio.sleep(0.1)
+    cambios = [c for c in motor.cambios if c[0] >= marca]
+    reemplazo = next((c[0] - marca for c in cambios if c[1]), None)
+
+    tarea.cancel()
+    try:
+        await tarea
+    except asyncio.CancelledError:
+        pass
+    return arranque, aborto, reemplazo, restante
+
+
+async def mensajes_invalidos():
+    motor = MotorSimulado()
+    red = RedSimulada()
+    runtime = RuntimeCarro(motor, BrazoSimulado(), red)
+    tarea = asyncio.create_task(runtime.correr())
+    fragmentos = fragmentar_programa(programa(300, pasos=6), id_programa=3, tamano_max=400)
+    roto = json.loads(fragmentos[1])
+    for paso in roto["Carro_1"].values():
+        del paso["Movimiento"]["distancia_mm"]
+    red.entrantes.append(fragmentos[0])
+    await asyncio.sleep(0.1)
+    programa_en_curso = runtime.programa
+    red.entrantes.extend([json.dumps(roto), "[1, 2]"])
+    await asyncio.sleep(0.1)
+    assert not tarea.done(), tarea
+    assert programa_en_curso is not None and programa_en_curso.rechazados == 1
+    # El runtime sigue atendiendo la red: el resto del programa y un abortar
+    red.entrantes.extend(fragmentos[1:])
+    await asyncio.sleep(0.1)
+    assert len(programa_en_curso.seqs) == len(fragmentos)
+    red.entrantes.append(json.dumps({"control": "abortar"}))
+    await asyncio.sleep(0.1)
+    assert runtime.programa is None and not motor.en_movimiento and not tarea.done()
+    tarea.cancel()
+    try:
+        await tarea
+    except asyncio.CancelledError:
+        pass
+
+
+async def cola_llena():
+    motor = MotorSimulado()
+    red = RedConIngesta()
+    runtime = RuntimeCarro(motor, BrazoSimulado(), red)
+    red.ingesta.admitir = runtime.admite
+    tarea = asyncio.create_task(runtime.correr())
+    textos = {}
+
+    def enviar(n, data):
+        textos[n] = json.dumps(data)
+        red.sock.datagramas.append(sobre(1, n, textos[n].encode()))
+
+    enviar(1, programa(300, pasos=10))  # Ocupa el ejecutor unos segundos
+    await asyncio.sleep(0.1)
+    for n in range(2, 22):
+        enviar(n, programa(10 + n))
+    await asyncio.sleep(0.1)
+    # Se confirman solo los que caben, y todos los confirmados siguen en la cola
+    assert sorted(red.confirmados) == list(range(1, 2 + MAX_PENDIENTES)), red.confirmados
+    assert [m[0] for m in runtime.pendientes] == [textos[n] for n in range(2, 2 + MAX_PENDIENTES)]
+
+    # Un abortar se confirma aunque la cola esté llena
+    enviar(22, {"ip_destino": MI_IP, "control": "abortar"})
+    await asyncio.sleep(0.1)
+    assert red.confirmados[-1] == 22 and runtime.programa is None and not motor.en_movimiento
+
+    # La central repite los que no se confirmaron y ahora entran los que caben
+    for n in range(2 + MAX_PENDIENTES, 22):
+        red.sock.datagramas.append(sobre(1, n, textos[n].encode()))
+    await asyncio.sleep(0.1)
+    assert red.confirmados[-MAX_PENDIENTES:] == list(range(2 + MAX_PENDIENTES, 2 + 2 * MAX_PENDIENTES))
+    assert red.ingesta.descartados == (20 - MAX_PENDIENTES) + (20 - 2 * MAX_PENDIENTES)
+    runtime.abortar()
+    await asyncio.sleep(0.05)
+    tarea.cancel()
+    try:
+        await tarea
+    except asyncio.CancelledError:
+        pass
+
+
+def resumir(nombre, valores):
+    valores = [v * 1000 for v in valores if v is not None]
+    print(f"{nombre:>42}: media {sum(valores) / len(valores):7.1f} ms | máx {max(valores):7.1f} ms")
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    resultados = [asyncio.run(escenario(rng)) for _ in range(REPETICIONES)]
+    arranques, abortos, reemplazos, restantes = zip(*resultados)
+    print(f"{REPETICIONES} repeticiones, tick de red {TICK_RED_MS} ms")
+    resumir("programa nuevo -> motores en marcha", arranques)
+    resumir("abortar -> motores detenidos", abortos)
+    resumir("reemplazar -> programa nuevo en marcha", reemplazos)
+    resumir("antes: abortar (esperaba el fin del programa)", restantes)
+
+    asyncio.run(mensajes_invalidos())
+    print("\nFragmento inválido y mensaje que no es un objeto durante un programa: descartados, el runtime sigue")
+
+    asyncio.run(cola_llena())
+    print(f"Con {MAX_PENDIENTES} pendientes solo se confirman los que caben (y los controles); "
+          "los demás se repiten después")
@@ -0,0 +1,84 @@
+# PruebaLineaTiempo.py
+# Compara en el PC la duración de una rutina de pasos cortos con:
+#   - esperas encadenadas (arrancar, sleep(duración), detener, siguiente paso)
+#   - linea_tiempo.LineaTiempo (plazos absolutos con un solo reloj)
+# mientras otra tarea ocupa el procesador a ratos (como la pantalla OLED o los
+# print por USB en la Pico W). Con esperas encadenadas cada bloqueo alarga la
+# rutina; con plazos, solo retrasa un evento sin acumularse.
+
+import asyncio
+import time
+
+from PruebaLatenciaRuntime import MotorSimulado, BrazoSimulado
+from comandos import compilar_programa, P_OP, P_DISTANCIA, P_ANGULO, OP_GIRO_Y_RECTO
+from linea_tiempo import LineaTiempo
+
+PASOS = 30
+DISTANCIA_MM = 50        # 200 ms por paso
+BLOQUEO_MS = 15          # La otra tarea bloquea BLOQUEO_MS cada PERIODO_BLOQUEO_MS
+PERIODO_BLOQUEO_MS = 40
+HOLGURA_MS = 5           # Despertar tarde del planificador de asyncio en el PC
+
+
+def rutina():
+    carro = {"Paso_{}".format(i): {"Movimiento": {"distancia_mm": DISTANCIA_MM, "velocidad_mm_s": 125,
+                                                  "radio_mm": "inf" if i % 3 else 30}}
+             for i in range(1, PASOS + 1)}
+    return compilar_programa({"Carro_1": carro})
+
+
+async def carga():
+    while True:
+        await asyncio.sleep(PERIODO_BLOQUEO_MS / 1000)
+        time.sleep(BLOQUEO_MS / 1000)  # Bloquea el bucle, como una escritura I2C larga
+
+
+async def esperas_encadenadas(plan, motor):
+    for paso in plan:
+        if paso[P_OP] == OP_GIRO_Y_RECTO:
+            motor.iniciar_giro()
+            await asyncio.sleep(motor.duracion_giro_ms(paso[P_ANGULO]) / 1000)
+        motor.iniciar_avance()
+        await asyncio.sleep(motor.perfil_avance(paso[P_DISTANCIA]).duracion_ms / 1000)
+        motor.detener()
+
+
+async def con_plazos(plan, motor):
+    linea = LineaTiempo(motor, BrazoSimulado())
+    plazo = linea.iniciar_programa()
+    for numero, paso in enumerate(plan, 1):
+        plazo = await linea.ejecutar_paso(numero, paso, plazo)
+    return linea
+
+
+async def medir(ejecutar, plan):
+    motor = MotorSimulado()
+    tarea_carga = asyncio.create_task(carga())
+    inicio = time.perf_counter()
+    resultado = await ejecutar(plan, motor)
+    duracion = time.perf_counter() - inicio
+    tarea_carga.cancel()
+    return duracion, resultado
+
+
+if __name__ == "__main__":
+    plan = rutina()
+    motor = MotorSimulado()
+    planificado = sum(motor.perfil_avance(p[P_DISTANCIA]).duracion_ms +
+                      (motor.duracion_giro_ms(p[P_ANGULO]) if p[P_OP] == OP_GIRO_Y_RECTO else 0)
+                      for p in plan) / 1000
+
+    encadenado, _ = asyncio.run(medir(esperas_encadenadas, plan))
+    plazos, linea = asyncio.run(medir(con_plazos, plan))
+    errores = [real_fin - plan_fin for _, _, plan_fin, _, real_fin in linea.registro]
+
+    print(f"\n{PASOS} pasos, bloqueos de {BLOQUEO_MS} ms cada {PERIODO_BLOQUEO_MS} ms")
+    print(f"{'planificado':>22}: {planificado:6.3f} s")
+    print(f"{'esperas encadenadas':>22}: {encadenado:6.3f} s ({(encadenado - planificado) * 1000:+.0f} ms)")
+    print(f"{'plazos absolutos':>22}: {plazos:6.3f} s ({(plazos - planificado) * 1000:+.0f} ms)")
+    print(f"Error de fin por paso con plazos: máx {max(errores)} ms, último {errores[-1]} ms (no se acumula)")
+
+    # Cada paso puede acabar tarde por un bloqueo, pero el retraso no pasa al
+    # siguiente: ningún paso (ni la rutina entera) acumula más de un bloqueo
+    assert max(errores) <= BLOQUEO_MS + HOLGURA_MS, errores
+    assert (plazos - planificado) * 1000 <= BLOQUEO_MS + HOLGURA_MS, plazos
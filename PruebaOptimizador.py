@@ -0,0 +1,95 @@
+# PruebaOptimizador.py
+# Aplica optimizador_rutas a rutinas de ejemplo, muestra el informe (pasos,
+# tiempo estimado ahorrado) y ejecuta el plan optimizado en la línea de
+# tiempo con el motor simulado de PruebaLatenciaRuntime.py, para comprobar
+# cuántas veces se detiene realmente la base y cuánto dura.
+# Antes, comprueba la geometría de los arcos con los métodos de
+# MotorController (relacion_arco, duracion_arco_ms), no con una copia.
+
+import asyncio
+import math
+import time
+
+from PruebaLatenciaRuntime import MotorSimulado, BrazoSimulado
+from motor_controller import ANCHO_EJE_MM
+from comandos import compilar_programa
+from linea_tiempo import LineaTiempo
+from optimizador_rutas import OptimizadorRutas
+
+
+def movimiento(distancia_mm, radio="inf", velocidad=250):
+    return {"Movimiento": {"distancia_mm": distancia_mm, "velocidad_mm_s": velocidad, "radio_mm": radio}}
+
+
+def brazo(angulo0, t_ser=0.3, sincronia="paralelo"):
+    return {"Brazo": {"angulo0_grados": angulo0, "angulo1_grados": 45, "angulo2_grados": 30, "t_ser": t_ser},
+            "sincronia": sincronia}
+
+
+RUTINAS = {
+    # Una recta larga enviada como tramos cortos (como la genera la central)
+    "recta por tramos": [movimiento(100) for _ in range(10)],
+    # Cuadrado: recta, giro de 90° y recta, con pasos vacíos de relleno
+    "cuadrado": [movimiento(200), movimiento(0), movimiento(200, 90), movimiento(200, 90),
+                 movimiento(0, 0), movimiento(200, 90)],
+    # Slalom con el brazo moviéndose a la vez en algunos pasos
+    "slalom con brazo": [dict(movimiento(300, 30 * (-1) ** i), **(brazo(10 * i) if i % 2 else {}))
+                         for i in range(8)],
+}
+
+
+def programa(pasos):
+    return {"Carro_1": {"Paso_{}".format(i): paso for i, paso in enumerate(pasos, 1)}}
+
+
+async def ejecutar(plan):
+    motor = MotorSimulado()
+    linea = LineaTiempo(motor, BrazoSimulado())
+    plazo = linea.iniciar_programa()
+    inicio = time.perf_counter()
+    for numero, paso in enumerate(plan, 1):
+        plazo = await linea.ejecutar_paso(numero, paso, plazo)
+    duracion = time.perf_counter() - inicio
+    paradas = sum(1 for _, en_movimiento in motor.cambios[:-1] if not en_movimiento)
+    return duracion, paradas
+
+
+def comprobar_arcos():
+    """Con las ruedas a v y relacion * v durante duracion_arco_ms, el centro
+    recorre la distancia pedida y la base gira el ángulo pedido."""
+    motor = MotorSimulado()
+    velocidad = motor.calibracion.velocidad_real(None)
+    for distancia, angulo in ((300, 30), (200, 90), (1000, 10), (120, 45)):
+        relacion = motor.relacion_arco(distancia, angulo)
+        t = motor.duracion_arco_ms(distancia, relacion) / 1000
+        recorrido = velocidad * (1 + relacion) / 2 * t
+        girado = math.degrees(velocidad * (1 - relacion) / ANCHO_EJE_MM * t)
+        assert abs(recorrido - distancia) < 1, (distancia, angulo, recorrido)
+        assert abs(girado - angulo) < 0.5, (distancia, angulo, girado)
+    # Radio de giro menor que medio eje: no se puede hacer como arco
+    assert motor.relacion_arco(50, 90) is None
+
+
+def probar(nombre, pasos, permitir_arcos):
+    plan = compilar_programa(programa(pasos))
+    optimizador = OptimizadorRutas(MotorSimulado())
+    optimizado, informe = optimizador.optimizar(plan, permitir_arcos=permitir_arcos)
+    antes, paradas_antes = asyncio.run(ejecutar(plan))
+    despues, paradas_despues = asyncio.run(ejecutar(optimizado))
+    ahorro = informe["ms_antes"] - informe["ms_despues"]
+    return (f"{nombre + (' (arcos)' if permitir_arcos else ''):>26}: "
+            f"{informe['pasos_antes']:2d} -> {informe['pasos_despues']:2d} pasos | "
+            f"{informe['eliminados']} eliminados, {informe['juntados']} juntados, {informe['arcos']} arcos | "
+            f"paradas {paradas_antes:2d} -> {paradas_despues:2d} | "
+            f"ejecución {antes:5.2f} -> {despues:5.2f} s | ahorro estimado {ahorro} ms")
+
+
+if __name__ == "__main__":
+    comprobar_arcos()
+    lineas = []
+    for nombre, pasos in RUTINAS.items():
+        for permitir_arcos in (False, True):
+            lineas.append(probar(nombre, pasos, permitir_arcos))
+    print()
+    for linea in lineas:
+        print(linea)
@@ -0,0 +1,122 @@
+# PruebaParseoComandos.py
+# Compara en el PC el parseo anterior de main.py (lista de diccionarios con
+# claves de texto, JSON parseado en cada mensaje) con el plan compilado de
+# comandos.py (tuplas con opcodes enteros y caché de planes).
+# Mide tiempo y memoria asignada por mensaje con tracemalloc. En la Pico W los
+# tiempos son mucho mayores, pero la proporción de asignaciones es parecida.
+
+import json
+import sys
+import time
+import tracemalloc
+
+import comandos
+from comandos import CachePlanes, compilar_programa
+
+REPETICIONES = 2000
+
+
+def programa_ejemplo(pasos=8):
+    carro = {}
+    for i in range(1, pasos + 1):
+        paso = {"Movimiento": {"distancia_mm": 100 * i * (-1) ** i, "velocidad_mm_s": 150,
+                               "radio_mm": "inf" if i % 2 else 45 * (-1) ** i, "vel_grados_s": 90}}
+        if i % 3 == 0:
+            paso["Brazo"] = {"angulo0_grados": 10 * i, "angulo1_grados": 45, "angulo2_grados": 30, "t_ser": 0.5}
+        carro["Paso_{}".format(i)] = paso
+    return json.dumps({"Carro_1": carro})
+
+
+def parsear_comando_anterior(datos_json):
+    """Copia del parser original de main.py (sin los mensajes de error)."""
+    data = json.loads(datos_json)
+    carro_key = next(key for key in data if key.startswith("Carro_"))
+    pasos = data[carro_key]
+    claves_pasos = [k for k in pasos.keys() if k.startswith("Paso_")]
+    claves_ordenadas = sorted(claves_pasos, key=lambda x: int(x.split('_')[1]))
+    secuencia_comandos = []
+    for paso_nombre in claves_ordenadas:
+        paso_data = pasos[paso_nombre]
+        mov = paso_data["Movimiento"]
+        comando_actual = {"tipo": None}
+        comando_actual["distancia_original"] = mov["distancia_mm"]
+        comando_actual["distancia_abs"] = abs(mov["distancia_mm"])
+        comando_actual["velocidad"] = mov["velocidad_mm_s"]
+        comando_actual["direccion_avance"] = "adelante" if mov["distancia_mm"] >= 0 else "atras"
+        if str(mov["radio_mm"]).lower() == "inf":
+            comando_actual["tipo"] = "recto"
+            comando_actual["angulo"] = 0
+            comando_actual["direccion_giro"] = None
+            comando_actual["vel_giro"] = 0
+        else:
+            comando_actual["tipo"] = "giro_y_recto"
+            comando_actual["angulo"] = abs(mov["radio_mm"])
+            comando_actual["direccion_giro"] = "izquierda" if mov["radio_mm"] < 0 else "derecha"
+            comando_actual["vel_giro"] = mov.get("vel_grados_s", 60)
+        if "Brazo" in paso_data:
+            brazo = paso_data["Brazo"]
+            comando_actual["angulos"] = [brazo["angulo0_grados"], brazo["angulo1_grados"], brazo["angulo2_grados"]]
+            comando_actual["t_ser"] = brazo.get("t_ser", 1.0)
+        else:
+            comando_actual["angulos"] = None
+            comando_actual["t_ser"] = None
+        secuencia_comandos.append(comando_actual)
+    return secuencia_comandos
+
+
+def compilado_sin_cache(datos_json):
+    return compilar_programa(json.loads(datos_json))
+
+
+def medir(funcion, mensajes):
+    inicio = time.perf_counter()
+    for mensaje in mensajes:
+        funcion(mensaje)
+    return (time.perf_counter() - inicio) / len(mensajes)
+
+
+def pico_memoria(funcion, mensaje):
+    """Bytes de heap que necesita una llamada (pico durante el parseo)."""
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    resultado = funcion(mensaje)
+    pico = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    del resultado
+    return pico
+
+
+def tamano_profundo(objeto):
+    tamano = sys.getsizeof(objeto)
+    if isinstance(objeto, dict):
+        tamano += sum(tamano_profundo(k) + tamano_profundo(v) for k, v in objeto.items())
+    elif isinstance(objeto, (list, tuple)):
+        tamano += sum(tamano_profundo(v) for v in objeto)
+    return tamano
+
+
+if __name__ == "__main__":
+    mensaje = programa_ejemplo()
+    assert [p[comandos.P_DISTANCIA] for p in comandos.parsear_comando(mensaje)] == \
+        [p["distancia_abs"] for p in parsear_comando_anterior(mensaje)]
+
+    # La central repite unas pocas rutinas
+    rutinas = [programa_ejemplo(n) for n in (4, 8, 12)]
+    mensajes = [rutinas[i % len(rutinas)] for i in range(REPETICIONES)]
+
+    comandos.cache_planes = CachePlanes()
+    casos = (
+        ("anterior (dict por paso)", parsear_comando_anterior),
+        ("compilado sin caché", compilado_sin_cache),
+        ("compilado con caché", comandos.parsear_comando),
+    )
+    print(f"{REPETICIONES} mensajes, {len(rutinas)} rutinas distintas ({len(mensaje)} B la de 8 pasos)")
+    for nombre, funcion in casos:
+        por_mensaje = medir(funcion, mensajes)
+        pico = pico_memoria(funcion, mensaje)
+        print(f"{nombre:>26}: {por_mensaje * 1e6:8.1f} us/mensaje | pico de heap {pico:6d} B/mensaje")
+    print(f"Caché: {comandos.cache_planes.aciertos} aciertos, {comandos.cache_planes.fallos} fallos")
+
+    print(f"Memoria del plan de 8 pasos: anterior {tamano_profundo(parsear_comando_anterior(mensaje))} B, "
+          f"compilado {tamano_profundo(compilado_sin_cache(mensaje))} B")
@@ -0,0 +1,160 @@
+# PruebaProgramaFragmentado.py
+# Simula en el PC la llegada de un programa largo por UDP (localhost) y mide
+# cuándo puede empezar el primer paso:
+#   - antes: un solo datagrama con todo el programa, parseado completo
+#     (si pasa de 8192 B, recvfrom(8192) de CarroWiFi lo trunca y no llega)
+#   - ahora: fragmentos de comandos.fragmentar_programa; Paso_1 se ejecuta en
+#     cuanto llega su fragmento validado.
+# También comprueba que el orden de ejecución no cambia aunque los fragmentos
+# lleguen desordenados o duplicados, y que un fragmento con un paso inválido
+# se descarta entero (sin dejar sus pasos válidos a medias).
+
+import json
+import random
+import socket
+import threading
+import time
+
+from comandos import (ProgramaIncremental, abrir_programa, compilar_programa, fragmentar_programa,
+                      P_DISTANCIA)
+
+PUERTO = 5555
+TAMANO_RECEPCION = 8192   # recvfrom(8192) de CarroWiFi
+PAUSA_WIFI_S = 0.004      # Tiempo entre datagramas simulado (enlace WiFi cargado)
+MBPS_WIFI = 2.0           # Ancho de banda simulado para el datagrama único
+
+
+def programa_largo(pasos):
+    carro = {}
+    for i in range(1, pasos + 1):
+        carro["Paso_{}".format(i)] = {
+            "Movimiento": {"distancia_mm": 10 * i, "velocidad_mm_s": 150,
+                           "radio_mm": "inf" if i % 2 else 90, "vel_grados_s": 90},
+            "Brazo": {"angulo0_grados": i % 180, "angulo1_grados": 45, "angulo2_grados": 30, "t_ser": 0.5},
+        }
+    return {"ip_destino": "192.168.0.123", "Carro_1": carro}
+
+
+def enviar(mensajes, pausas):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        for mensaje, pausa in zip(mensajes, pausas):
+            time.sleep(pausa)
+            s.sendto(mensaje.encode(), ("127.0.0.1", PUERTO))
+
+
+def recibir_completo(receptor, inicio):
+    datos, _ = receptor.recvfrom(TAMANO_RECEPCION)
+    try:
+        plan = compilar_programa(json.loads(datos))
+    except ValueError:
+        return None, len(datos)
+    return time.perf_counter() - inicio, len(plan)
+
+
+def recibir_fragmentado(receptor, inicio):
+    datos, _ = receptor.recvfrom(TAMANO_RECEPCION)
+    programa = abrir_programa(datos.decode())
+    primero = None
+    orden = []
+    receptor.settimeout(0.5)
+    while not programa.terminado:
+        siguiente = programa.siguiente()
+        if siguiente is not None:
+            if primero is None:
+                primero = time.perf_counter() - inicio
+            orden.append(siguiente[0])
+            continue
+        datos, _ = receptor.recvfrom(TAMANO_RECEPCION)
+        programa.agregar_mensaje(datos.decode())
+    return primero, time.perf_counter() - inicio, orden
+
+
+def medir(pasos):
+    data = programa_largo(pasos)
+    completo = json.dumps(data)
+    fragmentos = fragmentar_programa(data, id_programa=1)
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as receptor:
+        receptor.bind(("127.0.0.1", PUERTO))
+
+        inicio = time.perf_counter()
+        # El datagrama único tarda en llegar lo que tarda su último byte
+        hilo = threading.Thread(target=enviar, args=([completo], [len(completo) * 8 / (MBPS_WIFI * 1e6)]))
+        hilo.start()
+        antes, detalle = recibir_completo(receptor, inicio)
+        hilo.join()
+
+        inicio = time.perf_counter()
+        pausas = [len(f) * 8 / (MBPS_WIFI * 1e6) + PAUSA_WIFI_S for f in fragmentos]
+        hilo = threading.Thread(target=enviar, args=(fragmentos, pausas))
+        hilo.start()
+        primero, total, orden = recibir_fragmentado(receptor, inicio)
+        hilo.join()
+
+    print(f"\n{pasos} pasos: mensaje único {len(completo)} B, {len(fragmentos)} fragmentos "
+          f"(máx {max(len(f) for f in fragmentos)} B)")
+    if antes is None:
+        print(f"  antes: el datagrama no cabe en recvfrom({TAMANO_RECEPCION}), se recibieron {detalle} B "
+              f"y el programa es inválido")
+    else:
+        print(f"  antes: primer paso a los {antes * 1000:.1f} ms")
+    print(f"  ahora: primer paso a los {primero * 1000:.1f} ms, programa completo a los {total * 1000:.1f} ms")
+    assert orden == list(range(1, pasos + 1))
+
+
+def comprobar_desorden(pasos=40, repeticiones=50):
+    data = programa_largo(pasos)
+    esperado = [p[P_DISTANCIA] for p in compilar_programa(data)]
+    rng = random.Random(0)
+    for _ in range(repeticiones):
+        fragmentos = fragmentar_programa(data, id_programa=7, tamano_max=600)
+        llegada = fragmentos + rng.sample(fragmentos, len(fragmentos) // 3)
+        rng.shuffle(llegada)
+        programa = ProgramaIncremental(7)
+        ejecutados = []
+        for mensaje in llegada:
+            programa.agregar_mensaje(mensaje)
+            siguiente = programa.siguiente()
+            while siguiente is not None:
+                ejecutados.append(siguiente[1][P_DISTANCIA])
+                siguiente = programa.siguiente()
+        assert programa.terminado and ejecutados == esperado
+    print(f"\nOrden correcto con fragmentos desordenados y duplicados ({repeticiones} pruebas)")
+
+
+def comprobar_fragmento_invalido(pasos=12):
+    data = programa_largo(pasos)
+    esperado = [p[P_DISTANCIA] for p in compilar_programa(data)]
+    fragmentos = fragmentar_programa(data, id_programa=9, tamano_max=600)
+    assert len(fragmentos) >= 3
+    # El segundo fragmento con su último paso roto: sus otros pasos no deben quedar
+    roto = json.loads(fragmentos[1])
+    pasos_rotos = roto["Carro_1"]
+    assert len(pasos_rotos) > 1
+    del pasos_rotos[max(pasos_rotos, key=lambda k: int(k[5:]))]["Movimiento"]["radio_mm"]
+    programa = ProgramaIncremental(9)
+    assert programa.agregar_mensaje(fragmentos[0])
+    antes = dict(programa.pasos)
+    assert programa.agregar_mensaje(json.dumps(roto))
+    assert programa.pasos == antes and programa.rechazados == 1 and 1 not in programa.seqs
+    sin_seq = json.loads(fragmentos[1])
+    del sin_seq["seq"]
+    assert not programa.agregar(sin_seq) and programa.rechazados == 2
+    # El fragmento correcto con el mismo seq se acepta después
+    ejecutados = []
+    for mensaje in fragmentos[1:]:
+        assert programa.agregar_mensaje(mensaje)
+    siguiente = programa.siguiente()
+    while siguiente is not None:
+        ejecutados.append(siguiente[1][P_DISTANCIA])
+        siguiente = programa.siguiente()
+    assert programa.terminado and ejecutados == esperado
+    assert abrir_programa(json.dumps(roto)) is None
+    print("Fragmento con un paso inválido: descartado entero; el reenvío correcto completa el programa")
+
+
+if __name__ == "__main__":
+    for pasos in (10, 40, 100):
+        medir(pasos)
+    comprobar_desorden()
+    comprobar_fragmento_invalido()
@@ -0,0 +1,65 @@
+# PruebaRampas.py
+# Simula en el PC un avance en recta con ruedas que patinan, comparando:
+#   - escalón: ciclo útil de crucero de golpe y parada de golpe (como antes)
+#   - rampa: perfil trapezoidal de perfiles_movimiento.py
+# El carro sigue la velocidad mandada con el retraso del motor, pero no puede
+# acelerar más que la tracción del suelo (si se le pide más, la rueda patina)
+# y al parar (motores sueltos) desliza frenando solo por rozamiento.
+# La línea de tiempo supone que el carro recorre exactamente el perfil; el
+# error es cuánto se aleja el recorrido real de la distancia pedida.
+
+from calibracion_motores import TablaCalibracion
+from perfiles_movimiento import Rampa, crear_perfil, ACELERACION_MM_S2, PERIODO_PERFIL_MS
+
+DISTANCIA_MM = 500
+VELOCIDADES = (150, 250, 350, 450)
+TAU_MOTOR_S = 0.05
+PASO_SIM_S = 0.001
+# (tracción máxima, frenado por rozamiento) en mm/s² para cada suelo (AJUSTAR EXPERIMENTALMENTE)
+SUELOS = {"baldosa": (1200, 700), "madera": (1800, 1000), "alfombra": (2500, 1600)}
+ERROR_ADMISIBLE_MM = 5
+
+# Tabla de ejemplo con todo el rango de velocidades (los ciclos útiles no se usan aquí)
+TABLA = TablaCalibracion([(50, 15000, 17000), (500, 65535, 65535)])
+
+
+def velocidades_mandadas(perfil):
+    """Velocidad mandada en cada tick del perfil (mm/s)."""
+    return [perfil.avance[perfil.indice(tick)] * 1000 / perfil.periodo_ms for tick in range(perfil.ticks)]
+
+
+def simular(mandadas, periodo_ms, traccion, rozamiento):
+    """Distancia real recorrida: la del perfil y luego la que desliza hasta parar."""
+    v = recorrido = 0.0
+    pasos_por_tick = int(periodo_ms / 1000 / PASO_SIM_S)
+    for objetivo in mandadas:
+        for _ in range(pasos_por_tick):
+            aceleracion = max(-traccion, min(traccion, (objetivo - v) / TAU_MOTOR_S))
+            v += aceleracion * PASO_SIM_S
+            recorrido += v * PASO_SIM_S
+    while v > 0:
+        v = max(0.0, v - rozamiento * PASO_SIM_S)
+        recorrido += v * PASO_SIM_S
+    return recorrido
+
+
+if __name__ == "__main__":
+    print(f"Avance de {DISTANCIA_MM} mm, rampa de {ACELERACION_MM_S2} mm/s² a {1000 // PERIODO_PERFIL_MS} Hz")
+    print(f"\n{'velocidad':>10} {'perfil':>8} {'duración':>9} | "
+          + " | ".join(f"{suelo:>9}" for suelo in SUELOS) + " | peor")
+    maxima = {"escalón": 0, "rampa": 0}
+    for velocidad in VELOCIDADES:
+        for nombre, aceleracion in (("escalón", None), ("rampa", ACELERACION_MM_S2)):
+            perfil = crear_perfil(Rampa(TABLA, velocidad, aceleracion), DISTANCIA_MM)
+            mandadas = velocidades_mandadas(perfil)
+            errores = [simular(mandadas, perfil.periodo_ms, *SUELOS[suelo]) - DISTANCIA_MM for suelo in SUELOS]
+            peor = max(abs(e) for e in errores)
+            if peor <= ERROR_ADMISIBLE_MM:
+                maxima[nombre] = velocidad
+            print(f"{velocidad:6d} mm/s {nombre:>8} {perfil.duracion_ms / 1000:8.2f}s | "
+                  + " | ".join(f"{e:+7.1f}mm" for e in errores) + f" | {peor:5.1f} mm")
+            if aceleracion is not None:
+                assert peor <= ERROR_ADMISIBLE_MM, (velocidad, errores)
+
+    print(f"\nVelocidad más alta con error <= {ERROR_ADMISIBLE_MM} mm en todos los suelos: "
+          f"escalón {maxima['escalón'] or '-'} mm/s, rampa {maxima['rampa'] or '-'} mm/s")
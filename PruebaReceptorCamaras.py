@@ -0,0 +1,78 @@
+# PruebaReceptorCamaras.py
+# Throughput por loopback del receptor de cámaras: la recepción original del
+# servidor (data += packet de 1024 bytes, un hilo por conexión) contra
+# receptor_camaras.ReceptorCamaras (asyncio, recv_into sobre un buffer), con
+# frames del formato de siempre (4 bytes de tamaño + datos) y ACK por frame.
+
+import socket
+import threading
+import time
+
+from receptor_camaras import RegistroCamaras, ReceptorCamaras
+
+
+def _recibir_concatenando(conn, size):
+    """Recepción original (data += packet de 1024 bytes), solo para comparar."""
+    data = b''
+    while len(data) < size:
+        packet = conn.recv(min(1024, size - len(data)))
+        if not packet:
+            break
+        data += packet
+    return data
+
+
+def _servidor_concatenando(servidor):
+    while True:
+        conn, _ = servidor.accept()
+        with conn:
+            while True:
+                size_bytes = conn.recv(4)
+                if len(size_bytes) < 4:
+                    break
+                _recibir_concatenando(conn, int.from_bytes(size_bytes, 'big'))
+                conn.sendall(b"ACK")
+
+
+def _medir_envio(port, size, repeticiones):
+    frame = bytes(size)
+    with socket.create_connection(("127.0.0.1", port)) as s:
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            s.sendall(size.to_bytes(4, 'big'))
+            s.sendall(frame)
+            if s.recv(4) != b"ACK":
+                raise RuntimeError("El servidor no confirmó el frame")
+        return time.perf_counter() - inicio
+
+
+def benchmark(tamanos=(38400, 153600, 614400, 2457600), repeticiones=50):
+    """Throughput por loopback: recepción original contra recv_into."""
+    servidor = socket.socket()
+    servidor.bind(("127.0.0.1", 0))
+    servidor.listen(1)
+    port_original = servidor.getsockname()[1]
+    threading.Thread(target=_servidor_concatenando, args=(servidor,), daemon=True).start()
+
+    with socket.socket() as libre:
+        libre.bind(("127.0.0.1", 0))
+        port_nuevo = libre.getsockname()[1]
+    recibidos = []
+    ReceptorCamaras(RegistroCamaras(), lambda id_camara, frame: recibidos.append(len(frame)),
+                    "127.0.0.1", port_nuevo).iniciar_en_hilo()
+    time.sleep(0.5)
+
+    for size in tamanos:
+        t_original = _medir_envio(port_original, size, repeticiones)
+        t_nuevo = _medir_envio(port_nuevo, size, repeticiones)
+        mb = size * repeticiones / 1e6
+        print(f"{size:>8} B: concatenando {mb / t_original:8.1f} MB/s | "
+              f"recv_into {mb / t_nuevo:8.1f} MB/s | x{t_original / t_nuevo:.1f}")
+    # Cada frame confirmado llegó entero a al_recibir (que corre justo después del ACK)
+    time.sleep(0.1)
+    assert recibidos == [size for size in tamanos for _ in range(repeticiones)]
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,284 @@
+# PruebaRelayUART.py
+# Reenvío por UART en el PC, con un par de UART simuladas conectadas entre sí
+# que transmiten a la velocidad de la línea (10 bits por byte), tienen un
+# buffer de transmisión de TXBUF_UART bytes (write espera si se llena, como
+# machine.UART) y entregan basura si los dos extremos no están a los mismos
+# baudios. Mide:
+#   - cuánto se bloquea el bucle de asyncio reenviando programas grandes con
+#     el uart.write anterior (json.dumps + "\n") y con RelayUART.encolar
+#   - caudal a 9600 baudios y después de negociar BAUDIOS_OBJETIVO
+#   - contrapresión: ráfaga mayor que el buffer circular
+#   - negociación con el otro extremo a mitad de una trama de datos: la
+#     respuesta espera al final de la trama y no se corrompe nada
+#   - los dos extremos con los valores por defecto (como carro_wifi_module.py),
+#     que proponen BAUDIOS_OBJETIVO a la vez
+#   - una trama de control mientras se espera una confirmación que no llega:
+#     sale al vencer el plazo, ya a la velocidad anterior
+
+import asyncio
+import json
+import struct
+import time
+
+from relay_uart import (RelayUART, trama, TXBUF_UART, BAUDIOS_OBJETIVO, CAPACIDAD_RELAY, TIPO_BAUDIOS,
+                        TIPO_CONFIRMAR, TIMEOUT_BAUDIOS_MS)
+
+PASOS = 12
+MENSAJES = 6
+
+
+class UARTSimulada:
+    def __init__(self, baudios):
+        self.baudrate = baudios
+        self.otro = None
+        self.tx = bytearray()
+        self.rx = bytearray()
+        self._t = time.perf_counter()
+        self.bloqueado_s = 0.0
+
+    def _transmitir(self):
+        """Pasa al otro extremo los bytes que ya salieron por la línea."""
+        ahora = time.perf_counter()
+        if not self.tx:
+            self._t = ahora
+            return
+        n = min(len(self.tx), int((ahora - self._t) * self.baudrate / 10))
+        if n:
+            salida = bytes(self.tx[:n])
+            if self.otro.baudrate != self.baudrate:
+                salida = bytes((b * 7 + 3) & 0xFF for b in salida)
+            self.otro.rx.extend(salida)
+            del self.tx[:n]
+            self._t += n * 10 / self.baudrate
+
+    def write(self, datos):
+        datos = datos.encode() if isinstance(datos, str) else bytes(datos)
+        inicio = time.perf_counter()
+        for i in range(0, len(datos), TXBUF_UART):
+            trozo = datos[i:i + TXBUF_UART]
+            self._transmitir()
+            while len(self.tx) + len(trozo) > TXBUF_UART:
+                time.sleep(0.0005)
+                self._transmitir()
+            self.tx.extend(trozo)
+        self.bloqueado_s += time.perf_counter() - inicio
+        return len(datos)
+
+    def any(self):
+        self.otro._transmitir()
+        return len(self.rx)
+
+    def read(self):
+        self.otro._transmitir()
+        if not self.rx:
+            return None
+        datos = bytes(self.rx)
+        self.rx.clear()
+        return datos
+
+    def txdone(self):
+        self._transmitir()
+        return not self.tx
+
+    def init(self, baudrate):
+        while not self.txdone():
+            time.sleep(0.0005)
+        self.baudrate = baudrate
+
+
+def par_uart(baudios):
+    a, b = UARTSimulada(baudios), UARTSimulada(baudios)
+    a.otro, b.otro = b, a
+    return a, b
+
+
+def programa(i):
+    pasos = {"Paso_{}".format(k): {"Movimiento": {"distancia_mm": 100 + k, "velocidad_mm_s": 200,
+                                                  "radio_mm": "inf" if k % 2 else 90},
+                                   "Brazo": {"base": k, "hombro": 90, "codo": 45, "tiempo_s": 1.0}}
+             for k in range(1, PASOS + 1)}
+    return json.dumps({"ip_destino": "192.168.4.{}".format(124 + i), "Carro_1": pasos}).encode()
+
+
+async def latido(estado):
+    """Tarea de 10 ms que mide el mayor retraso del bucle."""
+    anterior = time.perf_counter()
+    while estado["activo"]:
+        await asyncio.sleep(0.01)
+        ahora = time.perf_counter()
+        estado["peor"] = max(estado["peor"], ahora - anterior - 0.01)
+        anterior = ahora
+
+
+async def bloqueo_anterior(mensajes):
+    a, b = par_uart(9600)
+    estado = {"activo": True, "peor": 0.0}
+    tarea = asyncio.ensure_future(latido(estado))
+    await asyncio.sleep(0.02)
+    for m in mensajes:
+        a.write(json.dumps(json.loads(m)) + "\n")
+        await asyncio.sleep(0)
+    estado["activo"] = False
+    await tarea
+    return estado["peor"], a.bloqueado_s
+
+
+async def bloqueo_relay(mensajes):
+    a, b = par_uart(9600)
+    relay = RelayUART(a, baudios=9600, baudios_objetivo=None)
+    estado = {"activo": True, "peor": 0.0}
+    tarea = asyncio.ensure_future(latido(estado))
+    drenado = asyncio.ensure_future(relay.tarea())
+    await asyncio.sleep(0.02)
+    inicio = time.perf_counter()
+    for m in mensajes:
+        relay.encolar(memoryview(m))
+        await asyncio.sleep(0)
+    encolar_s = time.perf_counter() - inicio
+    await asyncio.sleep(0.5)
+    estado["activo"] = False
+    await tarea
+    drenado.cancel()
+    return estado["peor"], encolar_s
+
+
+async def caudal(mensajes, objetivo):
+    a, b = par_uart(9600)
+    llegados = []
+    emisor = RelayUART(a, baudios=9600, baudios_objetivo=objetivo)
+    receptor = RelayUART(b, baudios=9600, baudios_objetivo=None, recibir=llegados.append)
+    tareas = [asyncio.ensure_future(emisor.tarea()), asyncio.ensure_future(receptor.tarea())]
+    while objetivo and emisor.baudios != objetivo:
+        await asyncio.sleep(0.01)
+    inicio = time.perf_counter()
+    for m in mensajes:
+        while not emisor.encolar(m):   # Contrapresión: esperar a que haya sitio
+            await asyncio.sleep(0.01)
+    while len(llegados) < len(mensajes):
+        await asyncio.sleep(0.01)
+    duracion = time.perf_counter() - inicio
+    for t in tareas:
+        t.cancel()
+    intactos = sum(x == m for x, m in zip(llegados, mensajes))
+    return emisor.baudios, receptor.baudios, sum(map(len, mensajes)) / duracion, intactos, receptor.lector
+
+
+async def contrapresion(mensajes):
+    a, b = par_uart(115200)
+    llegados = []
+    emisor = RelayUART(a, baudios=115200, baudios_objetivo=None)
+    receptor = RelayUART(b, baudios=115200, baudios_objetivo=None, recibir=llegados.append)
+    aceptados = [m for m in mensajes if emisor.encolar(m)]
+    tareas = [asyncio.ensure_future(emisor.tarea()), asyncio.ensure_future(receptor.tarea())]
+    while len(llegados) < len(aceptados):
+        await asyncio.sleep(0.01)
+    for t in tareas:
+        t.cancel()
+    return len(aceptados), emisor.rechazados, emisor.maximo_usado, llegados == aceptados
+
+
+async def negociar_enviando(tramas):
+    """a propone BAUDIOS_OBJETIVO mientras b le está enviando tramas de datos."""
+    a, b = par_uart(9600)
+    llegados = []
+    proponente = RelayUART(a, baudios=9600, baudios_objetivo=BAUDIOS_OBJETIVO, recibir=llegados.append)
+    otro = RelayUART(b, baudios=9600, baudios_objetivo=None)
+    for t in tramas:
+        assert otro.encolar(t)
+    tareas = [asyncio.ensure_future(otro.tarea())]
+    await asyncio.sleep(0.05)  # b ya va por la mitad de la primera trama
+    assert otro._resto
+    tareas.append(asyncio.ensure_future(proponente.tarea()))
+    while len(llegados) < len(tramas):
+        await asyncio.sleep(0.01)
+    for t in tareas:
+        t.cancel()
+    return proponente.baudios, otro.baudios, llegados == tramas, proponente.lector
+
+
+async def ambos_proponen(desfase_s, tramas):
+    """Los dos relays como en carro_wifi_module.py; b arranca desfase_s después."""
+    a, b = par_uart(9600)
+    llegados_a, llegados_b = [], []
+    relay_a = RelayUART(a, baudios=9600, recibir=llegados_a.append)
+    relay_b = RelayUART(b, baudios=9600, recibir=llegados_b.append)
+    tareas = [asyncio.ensure_future(relay_a.tarea())]
+    await asyncio.sleep(desfase_s)
+    tareas.append(asyncio.ensure_future(relay_b.tarea()))
+    inicio = time.perf_counter()
+    while (relay_a.baudios != relay_b.baudios or relay_a._confirmar or relay_b._confirmar
+           or time.perf_counter() - inicio < 2 * TIMEOUT_BAUDIOS_MS / 1000):
+        await asyncio.sleep(0.01)
+    for t in tramas:
+        assert relay_a.encolar(t) and relay_b.encolar(t)
+    while len(llegados_a) < len(tramas) or len(llegados_b) < len(tramas):
+        await asyncio.sleep(0.01)
+    for t in tareas:
+        t.cancel()
+    return relay_a.baudios, relay_b.baudios, llegados_a == llegados_b == tramas
+
+
+async def control_sin_confirmacion():
+    """El otro extremo propone BAUDIOS_OBJETIVO y no confirma nunca."""
+    a, b = par_uart(9600)
+    relay = RelayUART(a, baudios=9600, baudios_objetivo=None)
+    b.write(trama(TIPO_BAUDIOS, struct.pack(">II", BAUDIOS_OBJETIVO, 0)))
+    tarea = asyncio.ensure_future(relay.tarea())
+    while relay._confirmar is None:
+        await asyncio.sleep(0.01)
+    tarea.cancel()
+    inicio = time.perf_counter()
+    await asyncio.wait_for(relay._enviar_ya(TIPO_CONFIRMAR, b""), 4 * TIMEOUT_BAUDIOS_MS / 1000)
+    return time.perf_counter() - inicio, relay.baudios
+
+
+async def principal():
+    mensajes = [programa(i) for i in range(MENSAJES)]
+    total = sum(map(len, mensajes))
+    print(f"{MENSAJES} programas de {PASOS} pasos para otros carros, {total} bytes")
+
+    # A 9600 baudios cada programa ocupa la línea unos dos segundos: se miden dos
+    lote = mensajes[:2]
+    print(f"Bloqueo reenviando {len(lote)} ({sum(map(len, lote))} bytes) a 9600 baudios:")
+    peor, bloqueado = await bloqueo_anterior(lote)
+    print(f"{'anterior':>10}: uart.write bloqueó {bloqueado * 1000:7.1f} ms, "
+          f"retraso máximo del bucle {peor * 1000:7.1f} ms")
+    peor, encolar = await bloqueo_relay(lote)
+    print(f"{'relay':>10}: encolar tardó   {encolar * 1000:7.1f} ms, "
+          f"retraso máximo del bucle {peor * 1000:7.1f} ms")
+
+    print()
+    for objetivo, lote in ((None, mensajes[:1]), (BAUDIOS_OBJETIVO, mensajes)):
+        baudios_a, baudios_b, bytes_s, intactos, lector = await caudal(lote, objetivo)
+        print(f"{baudios_a:>7} baudios (receptor {baudios_b}): {bytes_s:8.0f} B/s, "
+              f"{intactos}/{len(lote)} tramas intactas, {lector.errores_suma} errores de suma, "
+              f"{lector.descartados} bytes descartados")
+
+    rafaga = mensajes * 2
+    aceptados, rechazados, maximo, iguales = await contrapresion(rafaga)
+    print(f"\nRáfaga de {len(rafaga)} programas ({sum(map(len, rafaga))} B) en un buffer de "
+          f"{CAPACIDAD_RELAY} B: {aceptados} aceptados, {rechazados} rechazados, "
+          f"uso máximo {maximo} B, entregados intactos: {iguales}")
+    assert iguales
+
+    tramas = [bytes(range(i, i + 100)) * 2 for i in range(8)]
+    baudios_a, baudios_b, iguales, lector = await negociar_enviando(tramas)
+    print(f"\nNegociación a mitad de una trama de datos: {baudios_a}/{baudios_b} baudios, "
+          f"{len(tramas)} tramas entregadas intactas: {iguales}, {lector.errores_suma} errores de suma")
+    assert baudios_a == baudios_b == BAUDIOS_OBJETIVO and iguales
+
+    print()
+    for desfase in (0, 0.005, 0.02, 0.1):
+        baudios_a, baudios_b, iguales = await ambos_proponen(desfase, tramas)
+        print(f"Los dos proponen {BAUDIOS_OBJETIVO} (desfase {desfase * 1000:.0f} ms): "
+              f"{baudios_a}/{baudios_b} baudios, tramas intactas en los dos sentidos: {iguales}")
+        assert baudios_a == baudios_b == BAUDIOS_OBJETIVO and iguales
+
+    espera, baudios = await control_sin_confirmacion()
+    print(f"\nTrama de control esperando una confirmación que no llega: sale en {espera * 1000:.0f} ms, "
+          f"a {baudios} baudios")
+    assert baudios == 9600
+
+
+if __name__ == "__main__":
+    asyncio.run(principal())
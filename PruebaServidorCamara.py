@@ -0,0 +1,110 @@
+# PruebaServidorCamara.py
+# Servidor de prueba para medir la transmisión de la cámara (ResolucionMaxMicro)
+# sin Flask ni superresolución: usa el mismo receptor (receptor_camaras) y solo
+# cuenta frames y bytes por cámara.
+#   python PruebaServidorCamara.py            -> escucha en el 8080 e imprime fps cada 5 s
+#   python PruebaServidorCamara.py comparar   -> además simula en el PC el envío
+#                                                anterior (una conexión por frame,
+#                                                pausas fijas) y el nuevo (persistente)
+
+import socket
+import sys
+import threading
+import time
+
+from codec_frames import CodificadorFrames
+from receptor_camaras import RegistroCamaras, ReceptorCamaras
+
+PUERTO = 8080
+INTERVALO_REPORTE_S = 5
+WIDTH, HEIGHT = 320, 240
+CAPTURA_S = 0.05  # Tiempo simulado de cam.capture()
+
+
+class Contador:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.frames = {}
+        self.bytes = {}
+
+    def al_recibir(self, id_camara, frame):
+        with self._lock:
+            self.frames[id_camara] = self.frames.get(id_camara, 0) + 1
+            self.bytes[id_camara] = self.bytes.get(id_camara, 0) + len(frame)
+
+    def tomar(self):
+        with self._lock:
+            frames, datos = self.frames, self.bytes
+            self.frames, self.bytes = {}, {}
+        return frames, datos
+
+
+def reportar(contador):
+    while True:
+        time.sleep(INTERVALO_REPORTE_S)
+        frames, datos = contador.tomar()
+        for id_camara in sorted(frames):
+            print(f"{id_camara}: {frames[id_camara] / INTERVALO_REPORTE_S:.2f} fps, "
+                  f"{datos[id_camara] / INTERVALO_REPORTE_S / 1000:.1f} KB/s (frames decodificados)")
+
+
+def camara_anterior(port, duracion):
+    """Envío original: conexión nueva por frame, trozos de 1024 B con sleep(0.01) y sleep(2)."""
+    buf = bytearray(WIDTH * HEIGHT * 2)
+    fin = time.time() + duracion
+    frames = 0
+    while time.time() < fin:
+        time.sleep(CAPTURA_S)
+        with socket.create_connection(("127.0.0.1", port), source_address=("127.0.0.2", 0)) as s:
+            s.send(len(buf).to_bytes(4, 'big'))
+            for i in range(0, len(buf), 1024):
+                s.send(buf[i:i + 1024])
+                time.sleep(0.01)
+            s.recv(4)
+        frames += 1
+        time.sleep(2)
+    return frames
+
+
+def camara_persistente(port, duracion):
+    """Envío nuevo: una conexión, capturar y enviar seguido, esperar solo el ACK."""
+    buf = bytearray(WIDTH * HEIGHT * 2)
+    codificador = CodificadorFrames(WIDTH, HEIGHT, id_camara=2)
+    fin = time.time() + duracion
+    frames = 0
+    with socket.create_connection(("127.0.0.1", port)) as s:
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while time.time() < fin:
+            time.sleep(CAPTURA_S)
+            for trozo in codificador.codificar(buf, int(time.time() * 1000)):
+                s.sendall(trozo)
+            if s.recv(4) != b"ACK":
+                codificador.pedir_clave()
+            frames += 1
+    return frames
+
+
+def comparar(port, duracion=12):
+    resultados = {}
+    hilos = [
+        threading.Thread(target=lambda: resultados.__setitem__("anterior", camara_anterior(port, duracion))),
+        threading.Thread(target=lambda: resultados.__setitem__("persistente", camara_persistente(port, duracion))),
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    for nombre, frames in resultados.items():
+        print(f"Cámara simulada {nombre}: {frames / duracion:.2f} fps "
+              f"(captura simulada de {CAPTURA_S * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    contador = Contador()
+    ReceptorCamaras(RegistroCamaras(), contador.al_recibir, port=PUERTO).iniciar_en_hilo()
+    threading.Thread(target=reportar, args=(contador,), daemon=True).start()
+    if len(sys.argv) > 1 and sys.argv[1] == "comparar":
+        time.sleep(0.5)
+        comparar(PUERTO)
+    else:
+        threading.Event().wait()
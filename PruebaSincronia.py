@@ -0,0 +1,66 @@
+# PruebaSincronia.py
+# Mide en el PC cuánto dura una rutina de pasos mixtos (brazo + avance) con
+# cada "sincronia" del paso, usando el runtime con el hardware simulado de
+# PruebaLatenciaRuntime.py.
+# Antes cada paso duraba 3 x t_ser (servos uno tras otro) + t_ser (espera
+# extra) + el avance (con los mm tomados como cm y una espera extra de
+# distancia / velocidad); con "paralelo" debería durar lo que el más largo.
+
+import asyncio
+import json
+import time
+
+from PruebaLatenciaRuntime import MotorSimulado, BrazoSimulado, RedSimulada, CM_POR_SEGUNDO
+from runtime_carro import RuntimeCarro
+
+PASOS = 8
+T_SER = 0.4
+DISTANCIA_MM = 100
+VELOCIDAD_MM_S = 1000
+TOLERANCIA_S = 0.1       # Holgura para el planificador de asyncio en el PC
+
+
+def rutina(sincronia):
+    carro = {}
+    for i in range(1, PASOS + 1):
+        carro["Paso_{}".format(i)] = {
+            "Movimiento": {"distancia_mm": DISTANCIA_MM, "velocidad_mm_s": VELOCIDAD_MM_S, "radio_mm": "inf"},
+            "Brazo": {"angulo0_grados": 10 * i, "angulo1_grados": 45, "angulo2_grados": 30, "t_ser": T_SER},
+            "sincronia": sincronia,
+        }
+    return json.dumps({"Carro_1": carro})
+
+
+async def medir(sincronia):
+    red = RedSimulada()
+    runtime = RuntimeCarro(MotorSimulado(), BrazoSimulado(), red)
+    tarea = asyncio.create_task(runtime.correr())
+    red.entrantes.append(rutina(sincronia))
+    inicio = time.perf_counter()
+    while runtime.programa is None:
+        await asyncio.sleep(0.001)
+    while runtime.programa is not None:
+        await asyncio.sleep(0.001)
+    duracion = time.perf_counter() - inicio
+    tarea.cancel()
+    try:
+        await tarea
+    except asyncio.CancelledError:
+        pass
+    return duracion
+
+
+if __name__ == "__main__":
+    avance = DISTANCIA_MM / 10 / CM_POR_SEGUNDO
+    antes = PASOS * (3 * T_SER + T_SER + DISTANCIA_MM / CM_POR_SEGUNDO + DISTANCIA_MM / VELOCIDAD_MM_S)
+    resultados = {s: asyncio.run(medir(s)) for s in ("brazo_primero", "avance_primero", "paralelo")}
+    print(f"\n{PASOS} pasos: brazo {T_SER:.2f} s, avance {avance:.2f} s por paso")
+    print(f"{'antes (secuencial + esperas extra)':>36}: {antes:6.2f} s")
+    for sincronia, duracion in resultados.items():
+        print(f"{sincronia:>36}: {duracion:6.2f} s")
+    minimo = PASOS * max(T_SER, avance)
+    print(f"{'mínimo (actuador más largo)':>36}: {minimo:6.2f} s")
+    # En paralelo cada paso dura lo que el actuador más largo; en secuencia, la suma
+    assert abs(resultados["paralelo"] - minimo) <= TOLERANCIA_S, resultados
+    for sincronia in ("brazo_primero", "avance_primero"):
+        assert abs(resultados[sincronia] - PASOS * (T_SER + avance)) <= TOLERANCIA_S, resultados
@@ -0,0 +1,101 @@
+# PruebaTablasServo.py
+# Microbenchmark de una escritura de los tres servos del brazo en el PC:
+#   - anterior: ángulos interpolados en flotante en cada paso (como la línea
+#     de tiempo antes), diccionario de calibración y m * angulo + b por servo
+#   - tablas: TablasServo.escribir con los índices precalculados del paso
+# También comprueba que las tablas dan el mismo duty_ns que la fórmula y que
+# la corrección del codo coincide con la de BrazoRobotico.
+
+import time
+import tracemalloc
+
+from interpolacion_brazo import TrayectoriaBrazo
+from tablas_servo import TablasServo, PASOS_POR_GRADO, ANGULO_MINIMO, ANGULO_MAXIMO
+
+REPETICIONES = 100000
+CALIBRACION = {'base': (-9717, 1532862), 'hombro': (-11111, 1550000), 'codo': (-11668, 1550000)}
+DESDE = (0, 90, 90)
+HASTA = (90, 45, 30)
+
+
+class ServoSimulado:
+    def duty_ns(self, duty):
+        pass
+
+
+def corregir_codo(angulo_hombro, angulo_codo):
+    """Copia de BrazoRobotico._corregir_codo."""
+    if angulo_hombro == 90:
+        return -angulo_codo + 90
+    elif 0 < angulo_hombro < 90:
+        return -0.6429 * angulo_codo + 102.86
+    return angulo_codo
+
+
+def angulo_a_duty_ns(servo_nombre, angulo):
+    """Copia de BrazoRobotico._angulo_a_duty_ns antes del cambio."""
+    m, b = CALIBRACION[servo_nombre]
+    return int(m * angulo + b)
+
+
+def escritura_anterior(servos, desde, hasta, avance):
+    angulos = tuple(a + (b - a) * avance for a, b in zip(desde, hasta))
+    servos[0].duty_ns(angulo_a_duty_ns('base', angulos[0]))
+    servos[1].duty_ns(angulo_a_duty_ns('hombro', angulos[1]))
+    servos[2].duty_ns(angulo_a_duty_ns('codo', angulos[2]))
+
+
+def medir(funcion):
+    """(µs por escritura, bytes de heap de pico en una escritura)."""
+    inicio = time.perf_counter()
+    for i in range(REPETICIONES):
+        funcion(i)
+    por_escritura = (time.perf_counter() - inicio) / REPETICIONES * 1e6
+    tracemalloc.start()
+    funcion(7)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return por_escritura, pico
+
+
+if __name__ == "__main__":
+    servos = (ServoSimulado(), ServoSimulado(), ServoSimulado())
+    inicio = time.perf_counter()
+    tablas = TablasServo(CALIBRACION, corregir_codo)
+    construccion_ms = (time.perf_counter() - inicio) * 1000
+    trayectoria = TrayectoriaBrazo(DESDE, HASTA, 1000)
+    pasos = trayectoria.pasos
+
+    anterior = medir(lambda i: escritura_anterior(servos, DESDE, HASTA, (i % pasos) / pasos))
+    con_tablas = medir(lambda i: tablas.escribir(servos[0], servos[1], servos[2], trayectoria.indices,
+                                                 3 * (i % pasos)))
+
+    n = len(tablas.base)
+    memoria = 3 * n * 4 + 2 * n * 2
+    print(f"Tablas: {n} valores por servo ({1 / PASOS_POR_GRADO}° de {ANGULO_MINIMO}° a {ANGULO_MAXIMO}°), "
+          f"{memoria} bytes, construidas en {construccion_ms:.1f} ms")
+    print(f"{'anterior':>10}: {anterior[0]:5.2f} µs por escritura, pico de heap {anterior[1]:4d} B")
+    print(f"{'tablas':>10}: {con_tablas[0]:5.2f} µs por escritura, pico de heap {con_tablas[1]:4d} B")
+    print("(En CPython leer un entero grande del array crea un objeto; en MicroPython los duty_ns "
+          "caben en un entero pequeño y no usan heap)")
+
+    # Precisión: en la rejilla de la tabla el duty es el de la fórmula (salvo
+    # donde la fórmula da negativo, que la tabla limita a 0)
+    error = 0
+    for nombre in CALIBRACION:
+        tabla = getattr(tablas, nombre)
+        for i in range(n):
+            duty = angulo_a_duty_ns(nombre, ANGULO_MINIMO + i / PASOS_POR_GRADO)
+            if duty >= 0:
+                error = max(error, abs(tabla[i] - duty))
+    print(f"\nDiferencia con la fórmula en la rejilla: {error} ns")
+    assert error == 0, error
+    diferencias = []
+    for codo in range(0, 181, 5):
+        for hombro in (90, 45):
+            esperado = corregir_codo(hombro, codo)
+            diferencias.append(abs(tablas.corregir_codo(hombro, codo) - esperado))
+    print(f"Corrección del codo: diferencia máxima {max(diferencias):.2f}° "
+          f"(resolución {1 / PASOS_POR_GRADO}°)")
+    # La tabla redondea al paso más cercano: como mucho media resolución
+    assert max(diferencias) <= 0.5 / PASOS_POR_GRADO, max(diferencias)
@@ -0,0 +1,142 @@
+# PruebaTelemetria.py
+# Telemetría en el PC con el runtime y el hardware simulado de
+# PruebaLatenciaRuntime.py:
+#   - un programa de pasos cortos con send_interval de 1 s: datagramas,
+#     bytes, muestras de cada tipo, cuántas se fundieron y retraso de los pasos
+#     con y sin telemetría
+#   - la red cae unos segundos: las muestras esperan y, si no caben, se
+#     cuentan como perdidas; al volver la red sale todo lo que quedó
+#   - coste de muestrear y de serializar un datagrama lleno (lista plana)
+#     frente a una lista de objetos
+
+import asyncio
+import json
+import time
+
+from PruebaLatenciaRuntime import MotorSimulado, BrazoSimulado, RedSimulada
+from runtime_carro import RuntimeCarro
+from telemetria import Telemetria, MUESTRA_PASO, MUESTRA_ESTADO, CAMPOS, CAPACIDAD_TELEMETRIA, MAX_POR_DATAGRAMA
+
+PASOS = 16
+DISTANCIA_MM = 100
+REPETICIONES = 2000
+
+
+class RedTelemetria(RedSimulada):
+    send_interval = 1
+
+    def __init__(self):
+        super().__init__()
+        self.enviados = []
+        self.conectada = True
+
+    def enviar(self, texto):
+        if not self.conectada:
+            return False
+        self.enviados.append(texto)
+        return True
+
+
+def rutina():
+    # Recto y giro alternados: el optimizador no los junta
+    carro = {"Paso_{}".format(i): {"Movimiento": {"distancia_mm": DISTANCIA_MM, "velocidad_mm_s": 1000,
+                                                  "radio_mm": "inf" if i % 2 else 30}}
+             for i in range(1, PASOS + 1)}
+    return json.dumps({"Carro_1": carro})
+
+
+async def ejecutar(con_telemetria, cortes=()):
+    """Corre la rutina; cortes: (desde_s, hasta_s) sin red. Devuelve (red, runtime, retraso máximo)."""
+    red = RedTelemetria()
+    runtime = RuntimeCarro(MotorSimulado(), BrazoSimulado(), red)
+    if not con_telemetria:
+        async def sin_telemetria():
+            await asyncio.Event().wait()
+        runtime.tarea_telemetria = sin_telemetria
+    tarea = asyncio.create_task(runtime.correr())
+    inicio = time.perf_counter()
+    red.entrantes.append(rutina())
+    while runtime.programa is None:
+        await asyncio.sleep(0.001)
+    while runtime.programa is not None:
+        t = time.perf_counter() - inicio
+        red.conectada = not any(a <= t < b for a, b in cortes)
+        await asyncio.sleep(0.005)
+    red.conectada = True
+    await asyncio.sleep(2.1)  # Dos intervalos más para vaciar lo pendiente
+    tarea.cancel()
+    try:
+        await tarea
+    except asyncio.CancelledError:
+        pass
+    retraso = max(abs(e[4] - e[2]) for e in runtime.linea.registro)
+    return red, runtime, retraso
+
+
+def muestras(red):
+    todas = []
+    for texto in red.enviados:
+        m = json.loads(texto)["m"]
+        todas.extend(tuple(m[i:i + len(CAMPOS)]) for i in range(0, len(m), len(CAMPOS)))
+    return todas
+
+
+def medir_coste():
+    telemetria = Telemetria()
+    inicio = time.perf_counter()
+    for i in range(REPETICIONES):
+        telemetria.muestrear(i % 10, 31.5, 2, bajo_carga=False)
+    muestreo = (time.perf_counter() - inicio) / REPETICIONES * 1e6
+
+    telemetria = Telemetria()
+    for i in range(CAPACIDAD_TELEMETRIA):
+        if i % 2:
+            telemetria.registrar_paso(i, 400, 403, 3)
+        else:
+            telemetria.muestrear(i, 31.5, 2)
+    campos = {"temperatura": 31.5, "estado": "paso 3", "paso": 3}
+    tamano = []
+    inicio = time.perf_counter()
+    for _ in range(REPETICIONES):
+        telemetria.usadas = CAPACIDAD_TELEMETRIA
+        telemetria.publicar(lambda texto: tamano.append(len(texto)) or True, campos)
+    plana = (time.perf_counter() - inicio) / REPETICIONES * 1e6
+
+    objetos = [dict(zip(CAMPOS, (i % 2, 1000 * i, i, 400, 403, 3))) for i in range(MAX_POR_DATAGRAMA)]
+    inicio = time.perf_counter()
+    for _ in range(REPETICIONES):
+        texto = json.dumps(dict(campos, muestras=objetos))
+    con_objetos = (time.perf_counter() - inicio) / REPETICIONES * 1e6
+    return muestreo, plana, tamano[0], con_objetos, len(texto)
+
+
+if __name__ == "__main__":
+    red, runtime, retraso = asyncio.run(ejecutar(True))
+    _, _, retraso_sin = asyncio.run(ejecutar(False))
+    todas = muestras(red)
+    pasos = [m for m in todas if m[0] == MUESTRA_PASO]
+    estados = [m for m in todas if m[0] == MUESTRA_ESTADO]
+    ejecutados = len(runtime.linea.registro)  # Pasos que quedan tras el optimizador
+    assert [m[2] for m in pasos] == list(range(1, ejecutados + 1))
+    assert [json.loads(t)["seq"] for t in red.enviados] == list(range(len(red.enviados)))
+    print(f"Programa de {PASOS} pasos ({ejecutados} tras optimizar), send_interval {RedTelemetria.send_interval} s")
+    print(f"  {len(red.enviados)} datagramas, {sum(map(len, red.enviados))} bytes, "
+          f"{len(pasos)} muestras de paso y {len(estados)} de estado "
+          f"({runtime.telemetria.fundidas} fundidas bajo carga)")
+    print(f"  Una muestra por datagrama serían {len(todas) + runtime.telemetria.fundidas} datagramas")
+    print(f"  Retraso máximo de fin de paso: {retraso} ms con telemetría, {retraso_sin} ms sin ella")
+    peor = max(m[4] for m in estados)
+    print(f"  Retraso máximo del bucle visto por la telemetría: {peor} ms")
+
+    red, runtime, _ = asyncio.run(ejecutar(True, cortes=((0.2, 5.0),)))
+    todas = muestras(red)
+    pasos = [m[2] for m in todas if m[0] == MUESTRA_PASO]
+    print(f"\nRed caída de 0.2 s a 5.0 s: {len(red.enviados)} datagramas en total, "
+          f"{len(pasos)}/{len(runtime.linea.registro)} muestras de paso entregadas, {runtime.telemetria.perdidas} perdidas, "
+          f"{runtime.telemetria.usadas} tomadas después del último envío")
+    assert pasos == list(range(1, len(runtime.linea.registro) + 1))
+
+    muestreo, plana, tamano, con_objetos, tamano_objetos = medir_coste()
+    print(f"\nmuestrear: {muestreo:.2f} µs")
+    print(f"datagrama de {MAX_POR_DATAGRAMA} muestras: lista plana {plana:6.1f} µs, {tamano} B | "
+          f"lista de objetos {con_objetos:6.1f} µs, {tamano_objetos} B")
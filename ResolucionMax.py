@@ -1,128 +1,158 @@
-from flask import Flask, send_file, Response
-import threading
-import socket
-import numpy as np
-import cv2
-import os
+from flask import Flask, Response, jsonify, request
+import html
 import random
-from cv2 import dnn_superres
+from pipeline_frames import PipelineFrames
+from superresolucion import SelectorNivel, niveles_disponibles
+from almacen_frames import AlmacenFrames, PersistenciaDisco
+from receptor_camaras import RegistroCamaras, ReceptorCamaras
 
 app = Flask(__name__)
 WIDTH, HEIGHT = 320, 240  # Cambiado de 160x120 a 320x240
-YUV_FILE = "latest.yuv"
-PNG_FILE = "latest.png"
+YUV_FILE = "latest_{}.yuv"  # Un archivo por cámara
+PNG_FILE = "latest_{}.png"
 EXPECTED_SIZE = WIDTH * HEIGHT * 2  # 320*240*2 = 153600 bytes
+PUERTO_CAMARAS = 8080
 
-# Superresolución
-sr = dnn_superres.DnnSuperResImpl_create()
-sr.readModel("EDSR_x4.pb")
-sr.setModel("edsr", 4)
+# Superresolución (los modelos se cargan dentro de cada worker del pipeline)
+DIRECTORIO_MODELOS = "."
+# "auto" elige por frame el mejor nivel que cabe en el presupuesto de latencia;
+# también se puede fijar un nivel: "ninguno", "bicubico", "lanczos", "espcn_x2",
+# "fsrcnn_x2", "espcn_x4", "fsrcnn_x4", "edsr_x4"
+NIVEL_SR = "auto"
+PRESUPUESTO_LATENCIA_S = 0.25
+CAPACIDAD_COLA = 4  # Frames pendientes como máximo (uno por cámara); se descarta el más antiguo
+
+# Guardar latest_<camara>.yuv / .png en disco (en segundo plano, fuera del camino crítico)
+PERSISTIR_EN_DISCO = True
+
+# /stream: si no llega un frame nuevo en este tiempo se reenvía el último, así
+# la escritura falla si el cliente se fue y el generador (y su hilo) termina
+TIMEOUT_STREAM = 5.0
 
 def generar_datos_falsos():
     print("Generando imagen falsa por datos incompletos.")
     return bytes([random.randint(0, 255) for _ in range(EXPECTED_SIZE)])
 
-def yuv422_to_png(yuv_data):
-    try:
-        yuv = np.frombuffer(yuv_data, dtype=np.uint8)
-        if yuv.size != EXPECTED_SIZE:
-            print("Advertencia: tamaño inesperado. Completando.")
-            yuv_padded = bytearray(yuv_data)
-            yuv_padded.extend([random.randint(0, 255) for _ in range(EXPECTED_SIZE - len(yuv_padded))])
-            yuv = np.frombuffer(yuv_padded, dtype=np.uint8)
-
-        yuv = yuv.reshape((HEIGHT, WIDTH, 2))
-        bgr = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
-
-        for y in range(HEIGHT):
-            for x in range(0, WIDTH, 2):
-                y0 = yuv[y, x, 0]
-                u  = yuv[y, x, 1]
-                y1 = yuv[y, x+1, 0]
-                v  = yuv[y, x+1, 1]
-
-                def convert(y, u, v):
-                    c = y - 16
-                    d = u - 128
-                    e = v - 128
-                    r = np.clip((298 * c + 409 * e + 128) >> 8, 0, 255)
-                    g = np.clip((298 * c - 100 * d - 208 * e + 128) >> 8, 0, 255)
-                    b = np.clip((298 * c + 516 * d + 128) >> 8, 0, 255)
-                    return b, g, r
-
-                bgr[y, x] = convert(y0, u, v)
-                bgr[y, x+1] = convert(y1, u, v)
-
-        enhanced = sr.upsample(bgr)
-        cv2.imwrite(PNG_FILE, enhanced)
-        print("Imagen mejorada y guardada.")
-    except Exception as e:
-        print(f"Error en conversión YUV->PNG: {e}")
-
-def tcp_receiver():
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.bind(("0.0.0.0", 8080))
-        s.listen(1)
-        print("Esperando imagen de la Pico W en el puerto 8080...")
-        while True:
-            conn, addr = s.accept()
-            with conn:
-                print(f"Conexión desde {addr}")
-                try:
-                    size_bytes = conn.recv(4)
-                    if not size_bytes or len(size_bytes) < 4:
-                        print("No se recibió tamaño.")
-                        conn.sendall(b"NACK")
-                        continue
-
-                    size = int.from_bytes(size_bytes, 'big')
-                    data = b''
-                    while len(data) < size:
-                        packet = conn.recv(min(1024, size - len(data)))
-                        if not packet:
-                            break
-                        data += packet
-
-                    if len(data) != size:
-                        print(f"Incompleto ({len(data)} / {size}).")
-                        conn.sendall(b"NACK")
-                        continue
-                    else:
-                        conn.sendall(b"ACK")
-
-                    yuv_data = data
-                    with open(YUV_FILE, "wb") as f:
-                        f.write(yuv_data)
-                    print(f"Imagen recibida correctamente.")
-                    yuv422_to_png(yuv_data)
-
-                except Exception as e:
-                    print(f"Error en recepción: {e}")
-                    try:
-                        conn.sendall(b"NACK")
-                    except:
-                        pass
+def al_crear_camara(id_camara, almacen):
+    if PERSISTIR_EN_DISCO:
+        nombre = id_camara.replace(":", "_")
+        PersistenciaDisco(almacen, YUV_FILE.format(nombre), PNG_FILE.format(nombre)).iniciar()
+
+registro = RegistroCamaras(al_crear=al_crear_camara)
+pipeline = None
+receptor = None
+
+def al_recibir_frame(id_camara, yuv_data):
+    registro.almacen(id_camara).publicar_crudo(yuv_data)
+    pipeline.enviar(yuv_data, id_camara)
+
+def al_procesar_frame(id_camara, imagen):
+    registro.almacen(id_camara).publicar(imagen)
+
+def almacen_pedido():
+    """Almacén de la cámara pedida con ?camara=<id> (o de la última activa)."""
+    return registro.obtener(request.args.get("camara"))
 
 @app.route('/')
 def index():
-    return '''
+    camaras = registro.listar()
+    if not camaras:
+        contenido = "<p>No se ha conectado ninguna cámara todavía.</p>"
+    else:
+        contenido = ""
+        for camara in camaras:
+            id_camara = html.escape(camara["id"], quote=True)
+            contenido += f'''
+            <h2>Cámara {id_camara}</h2>
+            <img src="/stream?camara={id_camara}" width="1280" height="960"/>
+            <p><a href="/image?camara={id_camara}">Última imagen (PNG)</a></p>'''
+    return f'''
     <html>
         <head><title>Imagen desde Pico W</title></head>
         <body>
-            <h1>Última imagen recibida</h1>
-            <img src="/image" width="1280" height="960"/>
+            <h1>Imagen en vivo</h1>{contenido}
         </body>
     </html>
     '''
 
+@app.route('/camaras')
+def camaras():
+    return jsonify(registro.listar())
+
 @app.route('/image')
 def image():
-    if os.path.exists(PNG_FILE):
-        return send_file(PNG_FILE, mimetype="image/png")
-    else:
+    formato = request.args.get("formato", "png")
+    if formato not in AlmacenFrames.FORMATOS:
+        return Response(f"Formato no soportado: {formato}", status=400)
+    almacen = almacen_pedido()
+    if almacen is None:
         return Response("No se ha recibido ninguna imagen todavía.", status=404)
 
+    # Si el cliente ya tiene esta generación no se toca la imagen
+    etag = almacen.etag(almacen.generacion, formato)
+    if almacen.generacion and etag in request.if_none_match:
+        respuesta = Response(status=304)
+        respuesta.set_etag(etag)
+        return respuesta
+
+    generacion, datos = almacen.obtener(formato)
+    if datos is None:
+        return Response("No se ha recibido ninguna imagen todavía.", status=404)
+
+    respuesta = Response(datos, mimetype=AlmacenFrames.FORMATOS[formato][1])
+    respuesta.set_etag(almacen.etag(generacion, formato))
+    respuesta.headers["Cache-Control"] = "no-cache"
+    return respuesta
+
+@app.route('/stream')
+def stream():
+    almacen = almacen_pedido()
+    if almacen is None:
+        return Response("No se ha recibido ninguna imagen todavía.", status=404)
+
+    def generar():
+        generacion = 0
+        parte = None
+        while True:
+            # Cada cliente pide el frame más reciente cuando termina de enviar
+            # el anterior: un cliente lento se salta frames en vez de acumularlos
+            nueva = almacen.esperar(generacion, timeout=TIMEOUT_STREAM)
+            if nueva != generacion or parte is None:
+                generacion, jpeg = almacen.obtener("jpeg")
+                if jpeg is None:
+                    continue
+                parte = (b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: "
+                         + str(len(jpeg)).encode() + b"\r\n\r\n" + jpeg + b"\r\n")
+            # Con la cámara quieta se repite el último frame: si el cliente se
+            # desconectó, esta escritura falla y el servidor cierra el generador
+            yield parte
+
+    return Response(generar(), mimetype="multipart/x-mixed-replace; boundary=frame",
+                    headers={"Cache-Control": "no-cache"})
+
+@app.route('/salud')
+def salud():
+    """200 cuando el receptor escucha y todos los modelos están cargados; 503 mientras no."""
+    if pipeline is None or receptor is None:
+        return jsonify({"listo": False, "receptor": False}), 503
+    estado = pipeline.preparacion()
+    estado["receptor"] = receptor.escuchando
+    estado["listo"] = estado["listo"] and receptor.escuchando
+    return jsonify(estado), 200 if estado["listo"] else 503
+
+@app.route('/estado')
+def estado():
+    if pipeline is None:
+        return Response("Pipeline no iniciado.", status=503)
+    return jsonify(pipeline.estado())
+
 if __name__ == '__main__':
-    threading.Thread(target=tcp_receiver, daemon=True).start()
+    selector = SelectorNivel(niveles_disponibles(DIRECTORIO_MODELOS), PRESUPUESTO_LATENCIA_S,
+                             nivel_fijo=None if NIVEL_SR == "auto" else NIVEL_SR)
+    print(f"Niveles de superresolución disponibles: {', '.join(selector.niveles)}")
+    pipeline = PipelineFrames(WIDTH, HEIGHT, al_procesar_frame, selector, DIRECTORIO_MODELOS,
+                              capacidad_cola=CAPACIDAD_COLA)
+    pipeline.iniciar()
+    receptor = ReceptorCamaras(registro, al_recibir_frame, port=PUERTO_CAMARAS)
+    receptor.iniciar_en_hilo()
     app.run(host="0.0.0.0", port=5000)
-
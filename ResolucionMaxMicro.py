@@ -1,8 +1,12 @@
+import errno
 import machine
+import micropython
 import network
+import select
 import socket
 import time
 from ov7670_wrapper import *
+from codec_frames import CodificadorFrames
 
 # Pines para la cámara OV7670
 data_pin_base = 0
@@ -21,6 +25,18 @@ PASSWORD = "Barragan2025"
 SERVER_IP = "192.168.20.166"
 SERVER_PORT = 8080
 
+# Formato de envío (ver codec_frames.py)
+WIDTH, HEIGHT = 320, 240  # Cambiado de 160x120
+ID_CAMARA = 1             # Identifica a esta cámara en el servidor (0 = usar la IP)
+MODO_LUMA = False         # Solo luminancia: la mitad de bytes, imagen en gris
+MODO_DELTA = True         # Solo las filas que cambiaron respecto al frame anterior
+INTERVALO_CLAVE = 30      # Un frame completo cada N frames
+
+# Conexión persistente con el servidor
+TAMANO_ENVIO = 8192           # Máximo por llamada a send; el socket acepta lo que quepa
+TIMEOUT_RED_MS = 5000         # Sin poder escribir/leer en este tiempo se reconecta
+INTERVALO_REPORTE_MS = 5000   # Cada cuánto se imprimen los fps logrados
+
 def connect_wifi():
     wlan = network.WLAN(network.STA_IF)
     wlan.active(True)
@@ -49,43 +65,127 @@ def init_camera():
     cam.wrapper_configure_test_pattern(OV7670_WRAPPER_TEST_PATTERN_NONE)
     return cam
 
-def send_image(cam):
-    width, height = 320, 240  # Cambiado de 160x120
-    buf_size = width * height * 2  # YUV422
-    buf = bytearray(buf_size)
+@micropython.viper
+def compactar_luma(buf, n: int):
+    # Versión viper de codec_frames.compactar_luma (el bucle en Python es muy lento)
+    p = ptr8(buf)
+    for i in range(n):
+        p[i] = p[2 * i]
 
-    print("Capturando imagen...")
-    cam.capture(buf)
+class ConexionServidor:
+    """
+    Conexión TCP persistente con el servidor. Los envíos no usan pausas fijas:
+    se espera (poll) a que el socket admita más datos y se escribe lo que quepa.
+    """
 
-    try:
+    def __init__(self):
+        self.addr = None
+        self.s = None
+        self.poller = None
+
+    def abrir(self):
+        if self.addr is None:
+            self.addr = socket.getaddrinfo(SERVER_IP, SERVER_PORT)[0][-1]
         print("Conectando al servidor...")
-        addr = socket.getaddrinfo(SERVER_IP, SERVER_PORT)[0][-1]
         s = socket.socket()
-        s.connect(addr)
-        print("Conectado. Enviando imagen...")
+        s.connect(self.addr)
+        s.setblocking(False)
+        self.poller = select.poll()
+        self.poller.register(s, select.POLLOUT)
+        self.s = s
+        print("Conectado.")
+
+    def cerrar(self):
+        if self.s is not None:
+            try:
+                self.s.close()
+            except OSError:
+                pass
+        self.s = None
 
-        start_time = time.ticks_ms()
+    def _esperar(self, evento):
+        self.poller.modify(self.s, evento)
+        eventos = self.poller.poll(TIMEOUT_RED_MS)
+        if not eventos:
+            raise OSError("Timeout de red")
+        if eventos[0][1] & (select.POLLERR | select.POLLHUP):
+            raise OSError("Conexión cerrada")
 
-        s.send(len(buf).to_bytes(4, 'big'))  # Tamaño en 4 bytes
+    def enviar(self, datos):
+        mv = memoryview(datos)
+        enviado = 0
+        while enviado < len(mv):
+            self._esperar(select.POLLOUT)
+            try:
+                enviado += self.s.send(mv[enviado:enviado + TAMANO_ENVIO])
+            except OSError as e:
+                if e.errno != errno.EAGAIN:
+                    raise
 
-        chunk_size = 1024
-        for i in range(0, len(buf), chunk_size):
-            s.send(buf[i:i+chunk_size])
-            time.sleep(0.01)
+    def leer_respuesta(self):
+        """Devuelve b"ACK" o b"NACK" (se lee solo lo justo, la conexión sigue abierta)."""
+        respuesta = b""
+        while respuesta not in (b"ACK", b"NACK"):
+            if len(respuesta) >= 4:
+                raise OSError("Respuesta inválida del servidor")
+            self._esperar(select.POLLIN)
+            try:
+                datos = self.s.recv(4 - len(respuesta))
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    continue
+                raise
+            if not datos:
+                raise OSError("El servidor cerró la conexión")
+            respuesta += datos
+        return respuesta
 
-        end_time = time.ticks_ms()
-        duracion_total = time.ticks_diff(end_time, start_time) / 1000
+def transmitir(cam, buf, codificador):
+    """Captura y envía frames seguidos por una sola conexión; reconecta si falla."""
+    conexion = ConexionServidor()
+    espera_reconexion = 0.5
+    frames = 0
+    bytes_enviados = 0
+    inicio_reporte = time.ticks_ms()
 
-        print(f"Imagen enviada correctamente en {duracion_total:.2f} segundos.")
-        s.close()
-    except Exception as e:
-        print("Error al enviar:", e)
+    while True:
+        try:
+            if conexion.s is None:
+                connect_wifi()
+                conexion.abrir()
+                codificador.pedir_clave()  # El servidor puede haber perdido el frame base
+                espera_reconexion = 0.5
+
+            cam.capture(buf)
+            for trozo in codificador.codificar(buf, time.ticks_ms()):
+                conexion.enviar(trozo)
+                bytes_enviados += len(trozo)
+
+            if conexion.leer_respuesta() != b"ACK":
+                # El servidor no tiene el frame base: el próximo va completo
+                codificador.pedir_clave()
+            frames += 1
+        except OSError as e:
+            print("Error al enviar:", e, "- reconectando en", espera_reconexion, "s")
+            conexion.cerrar()
+            codificador.pedir_clave()
+            time.sleep(espera_reconexion)
+            espera_reconexion = min(espera_reconexion * 2, 5)
+
+        transcurrido = time.ticks_diff(time.ticks_ms(), inicio_reporte)
+        if transcurrido >= INTERVALO_REPORTE_MS:
+            print(f"{frames * 1000 / transcurrido:.2f} fps, {bytes_enviados / transcurrido:.1f} KB/s")
+            frames = 0
+            bytes_enviados = 0
+            inicio_reporte = time.ticks_ms()
 
 # === FLUJO PRINCIPAL ===
 connect_wifi()
 camera = init_camera()
 time.sleep(1)
 
-while True:
-    send_image(camera)
-    time.sleep(2)
+buf = bytearray(WIDTH * HEIGHT * 2)  # YUV422, se reutiliza en cada captura
+codificador = CodificadorFrames(WIDTH, HEIGHT, ID_CAMARA, luma=MODO_LUMA, delta=MODO_DELTA,
+                                intervalo_clave=INTERVALO_CLAVE, compactar=compactar_luma)
+
+transmitir(camera, buf, codificador)
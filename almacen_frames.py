@@ -0,0 +1,129 @@
+# almacen_frames.py
+# Último frame en memoria con caché de imágenes codificadas.
+# Cada imagen publicada recibe un número de generación; las codificaciones
+# PNG/JPEG se hacen una sola vez por generación y se reutilizan en todas las
+# peticiones HTTP. Guardar en disco es opcional y va en un hilo aparte.
+
+import os
+import threading
+import time
+
+import cv2
+
+
+class AlmacenFrames:
+    """Frame crudo más reciente, su imagen procesada y sus codificaciones."""
+
+    FORMATOS = {
+        "png": (".png", "image/png"),
+        "jpeg": (".jpg", "image/jpeg"),
+    }
+
+    def __init__(self, calidad_jpeg=85):
+        self.calidad_jpeg = calidad_jpeg
+        self._cond = threading.Condition()
+        self._lock_codificacion = threading.Lock()
+        # Distingue ETags de distintos arranques del servidor
+        self._arranque = format(int(time.time()), "x")
+        self.generacion = 0
+        self.imagen = None
+        self.generacion_cruda = 0
+        self.crudo = None
+        self._codificados = {}
+
+    def publicar_crudo(self, crudo):
+        """Guarda el último frame YUV recibido, antes de procesarlo."""
+        with self._cond:
+            self.crudo = crudo
+            self.generacion_cruda += 1
+            self._cond.notify_all()
+
+    def publicar(self, imagen):
+        """Publica una imagen procesada (BGR). Devuelve su generación."""
+        with self._cond:
+            self.generacion += 1
+            self.imagen = imagen
+            self._codificados = {}
+            self._cond.notify_all()
+            return self.generacion
+
+    def obtener(self, formato="png"):
+        """
+        Devuelve (generacion, bytes) de la imagen actual en el formato pedido.
+        Si aún no hay imagen devuelve (0, None).
+        """
+        with self._cond:
+            generacion, imagen = self.generacion, self.imagen
+            datos = self._codificados.get(formato)
+        if imagen is None or datos is not None:
+            return generacion, datos
+
+        # Un solo hilo codifica; los demás esperan y reutilizan el resultado
+        with self._lock_codificacion:
+            with self._cond:
+                if self.generacion == generacion and formato in self._codificados:
+                    return generacion, self._codificados[formato]
+            datos = self._codificar(imagen, formato)
+            with self._cond:
+                if self.generacion == generacion:
+                    self._codificados[formato] = datos
+        return generacion, datos
+
+    def _codificar(self, imagen, formato):
+        extension, _ = self.FORMATOS[formato]
+        parametros = [cv2.IMWRITE_JPEG_QUALITY, self.calidad_jpeg] if formato == "jpeg" else []
+        ok, buffer = cv2.imencode(extension, imagen, parametros)
+        if not ok:
+            raise ValueError(f"No se pudo codificar la imagen como {formato}")
+        return buffer.tobytes()
+
+    def etag(self, generacion, formato):
+        """ETag (sin comillas) de una generación y formato."""
+        return f"{self._arranque}-{generacion}-{formato}"
+
+    def esperar(self, generacion, timeout=None):
+        """Bloquea hasta que haya una imagen más nueva que 'generacion'."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.generacion != generacion, timeout)
+            return self.generacion
+
+
+class PersistenciaDisco:
+    """
+    Hilo que guarda en disco el último frame crudo y la última imagen.
+    Si llegan varios frames mientras escribe, solo guarda el más reciente.
+    """
+
+    def __init__(self, almacen, ruta_yuv, ruta_png):
+        self.almacen = almacen
+        self.ruta_yuv = ruta_yuv
+        self.ruta_png = ruta_png
+
+    def iniciar(self):
+        threading.Thread(target=self._ejecutar, name="persistencia", daemon=True).start()
+
+    def _ejecutar(self):
+        almacen = self.almacen
+        generacion, generacion_cruda = 0, 0
+        while True:
+            with almacen._cond:
+                almacen._cond.wait_for(lambda: almacen.generacion != generacion
+                                       or almacen.generacion_cruda != generacion_cruda)
+                nueva_cruda = almacen.generacion_cruda != generacion_cruda
+                generacion_cruda, crudo = almacen.generacion_cruda, almacen.crudo
+                nueva = almacen.generacion != generacion
+            try:
+                if nueva_cruda:
+                    self._escribir(self.ruta_yuv, crudo)
+                if nueva:
+                    generacion, png = almacen.obtener("png")
+                    self._escribir(self.ruta_png, png)
+            except Exception as e:
+                print(f"Error guardando en disco: {e}")
+
+    def _escribir(self, ruta, datos):
+        # Escribir y renombrar para que nadie lea un archivo a medias
+        temporal = ruta + ".tmp"
+        with open(temporal, "wb") as f:
+            f.write(datos)
+        os.replace(temporal, ruta)
@@ -0,0 +1,137 @@
+# calibracion_motores.py
+# Tabla de calibración velocidad lineal (mm/s) -> ciclo útil (duty_u16) para
+# cada motor, para que velocidad_mm_s de los programas mande de verdad.
+#
+# El archivo de calibración (ARCHIVO_CALIBRACION) tiene los puntos medidos:
+#   {"puntos": [[velocidad_mm_s, duty_a, duty_b], ...]}
+# Al arrancar se interpolan linealmente a arrays cada RESOLUCION_MM_S, así que
+# durante la marcha buscar el duty es un índice, sin cálculo en flotante.
+# Sin archivo, la tabla tiene un solo punto (VELOCIDAD_BASE con los ajustes de
+# motor_controller): el carro va siempre a la misma velocidad, como antes.
+#
+# calibrar() construye los puntos a partir de recorridos cronometrados de
+# cada rueda por separado (ver medir_con_regla).
+
+import json
+from array import array
+
+ARCHIVO_CALIBRACION = "calibracion_motores.json"
+RESOLUCION_MM_S = 5
+DUTY_MAXIMO = 65535
+
+# Ciclos útiles que se prueban al calibrar
+DUTIES_CALIBRACION = (15000, 20000, 25000, 30000, 35000, 40000, 45000, 50000, 55000, 60000, 65535)
+
+
+def _interpolar(x, xs, ys):
+    """Interpolación lineal en una lista ordenada de xs (con extremos fijos)."""
+    if x <= xs[0]:
+        return ys[0]
+    for i in range(1, len(xs)):
+        if x <= xs[i]:
+            x0, x1 = xs[i - 1], xs[i]
+            return ys[i - 1] + (ys[i] - ys[i - 1]) * (x - x0) / (x1 - x0)
+    return ys[-1]
+
+
+class TablaCalibracion:
+    def __init__(self, puntos, resolucion=RESOLUCION_MM_S):
+        puntos = sorted(puntos)
+        if not puntos:
+            raise ValueError("La calibración no tiene puntos")
+        for v, duty_a, duty_b in puntos:
+            if v <= 0 or not 0 < duty_a <= DUTY_MAXIMO or not 0 < duty_b <= DUTY_MAXIMO:
+                raise ValueError("Punto de calibración inválido: {}".format((v, duty_a, duty_b)))
+        self.puntos = puntos
+        self.resolucion = resolucion
+        self.velocidad_minima = puntos[0][0]
+        self.velocidad_maxima = puntos[-1][0]
+
+        # Precalcular un duty por cada 'resolucion' mm/s hasta la velocidad máxima
+        velocidades = [p[0] for p in puntos]
+        n = int(self.velocidad_maxima // resolucion) + 1
+        self.duty_a = array('H', [int(_interpolar(i * resolucion, velocidades, [p[1] for p in puntos])) for i in range(n)])
+        self.duty_b = array('H', [int(_interpolar(i * resolucion, velocidades, [p[2] for p in puntos])) for i in range(n)])
+
+    @classmethod
+    def por_defecto(cls, velocidad_mm_s, duty_a, duty_b):
+        return cls([(velocidad_mm_s, duty_a, duty_b)])
+
+    @classmethod
+    def cargar(cls, ruta, defecto=None):
+        """Lee el archivo de calibración; si no existe o es inválido devuelve 'defecto'."""
+        try:
+            with open(ruta) as f:
+                return cls([tuple(p) for p in json.load(f)["puntos"]])
+        except OSError:
+            return defecto
+        except (ValueError, KeyError, TypeError) as e:
+            print("Calibración inválida en {}: {}".format(ruta, e))
+            return defecto
+
+    def guardar(self, ruta):
+        with open(ruta, "w") as f:
+            json.dump({"puntos": [list(p) for p in self.puntos]}, f)
+
+    def velocidad_real(self, velocidad_mm_s):
+        """La velocidad que se puede dar de verdad (limitada a lo calibrado)."""
+        if velocidad_mm_s is None or velocidad_mm_s > self.velocidad_maxima:
+            return self.velocidad_maxima
+        if velocidad_mm_s < self.velocidad_minima:
+            return self.velocidad_minima
+        return velocidad_mm_s
+
+    def duties(self, velocidad_mm_s):
+        """(duty_a, duty_b) para esa velocidad."""
+        i = int(self.velocidad_real(velocidad_mm_s)) // self.resolucion
+        return self.duty_a[i], self.duty_b[i]
+
+
+def calibrar(medir, tiempo_s=2.0, duties=DUTIES_CALIBRACION, pasos_velocidad=10):
+    """
+    Construye la tabla a partir de recorridos cronometrados.
+    medir(motor, duty, tiempo_s) -> mm que recorrió la rueda ('a' o 'b') con
+    ese duty durante tiempo_s. Las velocidades de la tabla son las que las dos
+    ruedas pueden dar, así el carro va recto a cualquier velocidad.
+    """
+    curvas = {}
+    for motor in ("a", "b"):
+        medidas = []
+        for duty in duties:
+            velocidad = medir(motor, duty, tiempo_s) / tiempo_s
+            if velocidad > 0 and (not medidas or velocidad > medidas[-1][0]):
+                medidas.append((velocidad, duty))
+        if len(medidas) < 2:
+            raise ValueError("El motor {} no se movió con los duties probados".format(motor))
+        curvas[motor] = medidas
+
+    minima = max(curvas["a"][0][0], curvas["b"][0][0])
+    maxima = min(curvas["a"][-1][0], curvas["b"][-1][0])
+    if minima >= maxima:
+        raise ValueError("Los motores no tienen velocidades en común")
+
+    puntos = []
+    for i in range(pasos_velocidad + 1):
+        v = minima + (maxima - minima) * i / pasos_velocidad
+        duty_a = _interpolar(v, [m[0] for m in curvas["a"]], [m[1] for m in curvas["a"]])
+        duty_b = _interpolar(v, [m[0] for m in curvas["b"]], [m[1] for m in curvas["b"]])
+        puntos.append((round(v, 1), int(duty_a), int(duty_b)))
+    return TablaCalibracion(puntos)
+
+
+def medir_con_regla(controlador, ancho_eje_mm):
+    """
+    Callback de medición para calibrar() en el carro, desde el REPL:
+    gira una sola rueda (el carro pivota sobre la otra) y pide el ángulo que
+    giró el carro; la rueda recorrió ese arco de radio ancho_eje_mm.
+        tabla = calibrar(medir_con_regla(MotorController(), ANCHO_EJE_MM))
+        tabla.guardar(ARCHIVO_CALIBRACION)
+    """
+    import math
+
+    def medir(motor, duty, tiempo_s):
+        controlador.correr_rueda(motor, duty, tiempo_s)
+        angulo = float(input("Motor {} a {}: grados que giró el carro? ".format(motor, duty)))
+        return math.radians(angulo) * ancho_eje_mm
+
+    return medir
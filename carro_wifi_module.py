@@ -6,6 +6,8 @@ import network
 import socket
 import json
 from my_oled_lib import MyOLED
+from ingesta_udp import IngestaUDP
+from relay_uart import RelayUART
 OLED_SDA_PIN = 2
 OLED_SCL_PIN = 3
 oled = MyOLED(sda_pin=OLED_SDA_PIN, scl_pin=OLED_SCL_PIN)
@@ -14,6 +16,8 @@ class CarroWiFi:
     def __init__(self, ssid, password, host, port, local_port, my_ip, uart_tx, uart_rx, uart_baud=9600):
         # UART
         self.uart = machine.UART(0, baudrate=uart_baud, tx=machine.Pin(uart_tx), rx=machine.Pin(uart_rx))
+        # Los mensajes para otros carros se encolan enmarcados y se escriben en segundo plano
+        self.relay = RelayUART(self.uart, baudios=uart_baud)
 
         # WiFi
         self.ssid = ssid
@@ -30,11 +34,13 @@ class CarroWiFi:
         self.s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.s.bind(('0.0.0.0', self.local_port))
         self.s.setblocking(False)
+        # Lee todos los datagramas pendientes en un buffer fijo y parsea cada uno una vez;
+        # los comandos numerados se confirman a la central con enviar()
+        self.ingesta = IngestaUDP(self.s, self.my_ip, self.relay.encolar, responder=self.enviar)
 
         # Buffer UART
         self.buffer = b""
-        self.last_send = 0
-        self.send_interval = 5
+        self.send_interval = 5  # Segundos entre datagramas de telemetría (runtime_carro)
 
         # Conectar al iniciar
         self.connect_wifi()
@@ -97,24 +103,27 @@ class CarroWiFi:
         except Exception as e:
             print("❌ Error al enviar al servidor:", e)
 
-    def recibir_del_central(self):
+    def enviar(self, texto):
+        """
+        Envía un datagrama a la central sin intentar reconectar (ensure_wifi
+        puede bloquear segundos). Devuelve False si no salió.
+        """
+        if not self.wlan.isconnected():
+            return False
         try:
-            data, addr = self.s.recvfrom(8192)
-            msg = data.decode('utf-8')
-            oled.write_text(msg, 0, 20)
-            try:
-                json_data = json.loads(msg)
-                ip_destino = json_data.get("ip_destino", "")
-                if ip_destino == self.my_ip:
-                    return msg
-                    # Aquí puedes procesar el mensaje localmente si lo deseas
-                    pass
-                else:
-                    self.uart.write(json.dumps(json_data) + "\n")
-                return 
-            except json.JSONDecodeError:
-                return msg  # Retornar aunque sea malformado
-        except OSError:
-            return None
+            self.s.sendto(texto.encode(), (self.host, self.port))
+            return True
+        except OSError as e:
+            print("❌ Error al enviar al servidor:", e)
+            return False
+
+    def recibir(self):
+        """Siguiente mensaje para este carro como (texto, data, plan), o None."""
+        return self.ingesta.siguiente()
+
+    def recibir_del_central(self):
+        """Como recibir(), pero solo el texto."""
+        msg = self.ingesta.siguiente()
+        return msg[0] if msg is not None else None
 
 
@@ -0,0 +1,189 @@
+# codec_frames.py
+# Formato de frames entre la cámara (Pico W) y el servidor, versión 1.
+# Lo usan los dos lados: la Pico (MicroPython) codifica y el servidor
+# (ResolucionMax / receptor_camaras) decodifica.
+#
+# Cabecera (22 bytes, big endian):
+#   "YF" | versión | tipo | flags | id cámara | ancho | alto | secuencia | timestamp_ms | tamaño payload
+# Tipos: TIPO_CLAVE (frame completo) o TIPO_DELTA (solo las filas que cambiaron
+# respecto al frame anterior de la misma cámara).
+# Flags: FLAG_LUMA (solo Y, un byte por píxel; el servidor pone U = V = 128).
+# Payload de un delta: tramos ">HH" (filas sin cambios, filas copiadas) seguidos
+# de los datos de las filas copiadas; las filas después del último tramo no cambian.
+#
+# El formato anterior (4 bytes de tamaño + YUV422) se sigue aceptando: un
+# tamaño que empiece por "YF" sería de más de 1 GB.
+
+import struct
+try:
+    import binascii
+except ImportError:
+    import ubinascii as binascii
+from array import array
+
+MAGIC = b"YF"
+VERSION = 1
+FORMATO_CABECERA = ">2sBBBBHHIII"
+TAMANO_CABECERA = struct.calcsize(FORMATO_CABECERA)
+FORMATO_TRAMO = ">HH"
+TAMANO_TRAMO = 4
+
+TIPO_CLAVE = 0
+TIPO_DELTA = 1
+FLAG_LUMA = 0x01
+
+
+def empaquetar_cabecera(tipo, flags, id_camara, width, height, secuencia, timestamp_ms, tamano):
+    return struct.pack(FORMATO_CABECERA, MAGIC, VERSION, tipo, flags, id_camara, width, height,
+                       secuencia & 0xFFFFFFFF, timestamp_ms & 0xFFFFFFFF, tamano)
+
+
+def desempaquetar_cabecera(datos):
+    """Devuelve (tipo, flags, id_camara, width, height, secuencia, timestamp_ms, tamano)."""
+    campos = struct.unpack(FORMATO_CABECERA, datos)
+    if campos[0] != MAGIC:
+        raise ValueError("Cabecera de frame inválida")
+    if campos[1] != VERSION:
+        raise ValueError("Versión de formato no soportada: {}".format(campos[1]))
+    return campos[2:]
+
+
+def compactar_luma(buf, n):
+    """Deja los n bytes Y de un frame YUYV al inicio de buf (en el mismo buffer)."""
+    for i in range(n):
+        buf[i] = buf[2 * i]
+
+
+class CodificadorFrames:
+    """
+    Lado cámara. codificar() devuelve la lista de trozos a enviar (cabecera
+    y memoryviews del propio buffer), sin copiar el frame.
+    Para el modo delta no se guarda el frame anterior (no cabe en la RAM de
+    la Pico W) sino un CRC por fila: 4 bytes por fila.
+    """
+
+    def __init__(self, width, height, id_camara=0, luma=False, delta=False,
+                 intervalo_clave=30, compactar=compactar_luma):
+        self.width = width
+        self.height = height
+        self.id_camara = id_camara
+        self.luma = luma
+        self.delta = delta
+        self.intervalo_clave = intervalo_clave
+        self.compactar = compactar
+        self.bytes_fila = width if luma else width * 2
+        self.secuencia = 0
+        self._crc_filas = array('I', [0] * height)
+        self._pedir_clave = True
+
+    def pedir_clave(self):
+        """El siguiente frame sale completo (tras un NACK o una reconexión)."""
+        self._pedir_clave = True
+
+    def codificar(self, buf, timestamp_ms):
+        if self.luma:
+            self.compactar(buf, self.width * self.height)
+        mv = memoryview(buf)[:self.bytes_fila * self.height]
+        clave = self._pedir_clave or not self.delta or self.secuencia % self.intervalo_clave == 0
+
+        if not self.delta:
+            trozos = [mv]
+        else:
+            tramos = self._filas_cambiadas(mv)
+            if clave:
+                trozos = [mv]
+            else:
+                trozos = []
+                for saltar, inicio, copiar in tramos:
+                    trozos.append(struct.pack(FORMATO_TRAMO, saltar, copiar))
+                    trozos.append(mv[inicio * self.bytes_fila:(inicio + copiar) * self.bytes_fila])
+
+        tamano = 0
+        for trozo in trozos:
+            tamano += len(trozo)
+        cabecera = empaquetar_cabecera(TIPO_CLAVE if clave else TIPO_DELTA, FLAG_LUMA if self.luma else 0,
+                                       self.id_camara, self.width, self.height, self.secuencia,
+                                       timestamp_ms, tamano)
+        self.secuencia += 1
+        self._pedir_clave = False
+        return [cabecera] + trozos
+
+    def _filas_cambiadas(self, mv):
+        """Actualiza los CRC por fila y devuelve los tramos (saltar, inicio, copiar)."""
+        tramos = []
+        bytes_fila = self.bytes_fila
+        crc_filas = self._crc_filas
+        inicio = -1
+        ultima = 0  # primera fila después del último tramo
+        for fila in range(self.height):
+            a = fila * bytes_fila
+            crc = binascii.crc32(mv[a:a + bytes_fila]) & 0x3FFFFFFF
+            if crc != crc_filas[fila]:
+                crc_filas[fila] = crc
+                if inicio < 0:
+                    inicio = fila
+            elif inicio >= 0:
+                tramos.append((inicio - ultima, inicio, fila - inicio))
+                ultima = fila
+                inicio = -1
+        if inicio >= 0:
+            tramos.append((inicio - ultima, inicio, self.height - inicio))
+        return tramos
+
+
+class DecodificadorFrames:
+    """
+    Lado servidor, uno por cámara. decodificar() devuelve el frame YUV422
+    completo. Los frames entregados no se modifican después: cada delta se
+    aplica sobre una copia del frame anterior.
+    """
+
+    def __init__(self):
+        self.anterior = None
+        self.secuencia = None
+        self._formato = None
+
+    def decodificar(self, cabecera, payload):
+        tipo, flags, _, width, height, secuencia, _, _ = cabecera
+        luma = flags & FLAG_LUMA
+        bytes_fila = width if luma else width * 2
+
+        if tipo == TIPO_CLAVE:
+            if len(payload) != bytes_fila * height:
+                raise ValueError("Tamaño de frame clave incorrecto: {}".format(len(payload)))
+            if luma:
+                frame = bytearray(width * height * 2)
+                frame[1::2] = b"\x80" * (width * height)
+                frame[0::2] = payload
+            else:
+                frame = payload
+        elif tipo == TIPO_DELTA:
+            if self.anterior is None or self._formato != (width, height, luma) \
+                    or secuencia != (self.secuencia + 1) & 0xFFFFFFFF:
+                raise ValueError("Delta sin frame base (secuencia {})".format(secuencia))
+            frame = bytearray(self.anterior)
+            self._aplicar_delta(frame, payload, bytes_fila, height, luma)
+        else:
+            raise ValueError("Tipo de frame desconocido: {}".format(tipo))
+
+        self.anterior = frame
+        self.secuencia = secuencia
+        self._formato = (width, height, luma)
+        return frame
+
+    def _aplicar_delta(self, frame, payload, bytes_fila, height, luma):
+        fila = 0
+        pos = 0
+        while pos < len(payload):
+            saltar, copiar = struct.unpack_from(FORMATO_TRAMO, payload, pos)
+            pos += TAMANO_TRAMO
+            fila += saltar
+            fin = pos + copiar * bytes_fila
+            if fila + copiar > height or fin > len(payload):
+                raise ValueError("Delta corrupto")
+            if luma:
+                frame[fila * bytes_fila * 2:(fila + copiar) * bytes_fila * 2:2] = payload[pos:fin]
+            else:
+                frame[fila * bytes_fila:(fila + copiar) * bytes_fila] = payload[pos:fin]
+            fila += copiar
+            pos = fin
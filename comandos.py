@@ -0,0 +1,382 @@
+# comandos.py
+# Parseo de los programas "Carro_X" / "Paso_N" que envía la central.
+# Cada mensaje se compila a un plan: una tupla de pasos, y cada paso es una
+# tupla con los campos en posiciones fijas (P_*) y el tipo como entero (OP_*).
+# Así el ejecutor no compara cadenas ni busca claves en diccionarios, y un
+# programa repetido sale de la caché sin volver a parsear el JSON.
+#
+# Programas fragmentados: un programa largo puede llegar en varios datagramas,
+# cada uno con el formato de siempre más tres campos:
+#   {"programa": id, "seq": n, "fin": true/false, "ip_destino": ..., "Carro_1": {"Paso_k": ...}}
+# "seq" empieza en 0 y el último fragmento lleva "fin": true. Cada paso se valida
+# al llegar y el ejecutor puede empezar Paso_1 mientras llegan los demás.
+#
+# Cada Paso_N puede llevar "sincronia": "paralelo" (brazo y avance a la vez),
+# "brazo_primero" (por defecto) o "avance_primero". La sección "Brazo" puede
+# llevar "curva": "lineal" (por defecto), "coseno" o "min_jerk" (ver
+# interpolacion_brazo.py).
+#
+# Programas binarios (formato_binario.py): ingesta_udp los decodifica y el
+# plan ya compilado llega a abrir_programa en su propio argumento, nunca
+# dentro del data (que en los JSON viene de la red tal cual).
+#
+# Mensajes de control: {"control": "abortar"} detiene el programa en curso y
+# descarta lo pendiente; {"control": "reemplazar", "Carro_1": {...}} además
+# arranca ese programa (o su primer fragmento) en lugar del actual.
+
+import json
+
+from tiempo import ticks_ms, ticks_diff
+
+try:
+    from micropython import const
+except ImportError:  # CPython (pruebas en el PC)
+    def const(x):
+        return x
+
+# Tipos de paso
+OP_RECTO = const(0)
+OP_GIRO_Y_RECTO = const(1)
+OP_ARCO = const(2)        # Solo lo genera optimizador_rutas (giro + recto fundidos)
+
+# Campos de un paso
+P_OP = const(0)
+P_SENTIDO = const(1)      # 1 adelante, -1 atrás
+P_DISTANCIA = const(2)    # mm, valor absoluto
+P_VELOCIDAD = const(3)    # mm/s
+P_GIRO = const(4)         # 1 derecha, -1 izquierda, 0 sin giro
+P_ANGULO = const(5)       # grados, valor absoluto
+P_VEL_GIRO = const(6)     # grados/s
+P_ANGULOS = const(7)      # (base, hombro, codo) o None
+P_T_SER = const(8)        # segundos de movimiento del brazo o None
+P_SINCRONIA = const(9)    # SINC_*: cómo se combinan brazo y avance en el paso
+P_CONTINUAR = const(10)   # True: no detener la base al terminar el paso
+P_RELACION = const(11)    # OP_ARCO: velocidad rueda interior / exterior
+P_CURVA = const(12)       # CURVA_*: cómo se interpola el brazo
+
+# Sincronía entre brazo y avance dentro de un paso ("sincronia" en el Paso_N)
+SINC_PARALELO = const(0)
+SINC_BRAZO_PRIMERO = const(1)
+SINC_AVANCE_PRIMERO = const(2)
+SINCRONIAS = {"paralelo": SINC_PARALELO, "brazo_primero": SINC_BRAZO_PRIMERO,
+              "avance_primero": SINC_AVANCE_PRIMERO}
+SINCRONIA_POR_DEFECTO = "brazo_primero"  # El orden de siempre
+
+# Curva de interpolación del brazo ("curva" en la sección Brazo)
+CURVA_LINEAL = const(0)
+CURVA_COSENO = const(1)
+CURVA_MIN_JERK = const(2)
+CURVAS = {"lineal": CURVA_LINEAL, "coseno": CURVA_COSENO, "min_jerk": CURVA_MIN_JERK}
+CURVA_POR_DEFECTO = "lineal"  # Velocidad constante, como antes
+
+CAMPOS_BRAZO = ("angulo0_grados", "angulo1_grados", "angulo2_grados")
+
+CONTROL_ABORTAR = "abortar"
+CONTROL_REEMPLAZAR = "reemplazar"
+
+TAMANO_MAX_DATAGRAMA = 1400       # Sin fragmentación IP en una red WiFi normal
+TIMEOUT_FRAGMENTOS_MS = 2000      # Espera máxima por el siguiente paso de un programa
+
+
+def compilar_paso(paso_nombre, paso_data):
+    """Valida un 'Paso_N' y lo convierte en la tupla del paso."""
+    if "Movimiento" not in paso_data:
+        raise ValueError("Falta la sección 'Movimiento' en el {}".format(paso_nombre))
+
+    mov = paso_data["Movimiento"]
+
+    if "distancia_mm" not in mov or "velocidad_mm_s" not in mov or "radio_mm" not in mov:
+        raise ValueError("Faltan los campos 'distancia_mm', 'velocidad_mm_s' o 'radio_mm' en la sección 'Movimiento' de {}".format(paso_nombre))
+
+    distancia = mov["distancia_mm"]
+    sentido = 1 if distancia >= 0 else -1
+    radio = mov["radio_mm"]
+
+    if str(radio).lower() == "inf":
+        op, giro, angulo, vel_giro = OP_RECTO, 0, 0, 0
+    elif isinstance(radio, (int, float)):
+        op = OP_GIRO_Y_RECTO
+        angulo = abs(radio)
+        giro = -1 if radio < 0 else 1
+        vel_giro = mov.get("vel_grados_s", 60)
+    else:
+        raise ValueError("El valor de 'radio_mm' en {} debe ser 'inf' o un número (grados de giro).".format(paso_nombre))
+
+    # Manejar brazo robótico si está presente en el paso
+    angulos = None
+    t_ser = None
+    curva = CURVA_LINEAL
+    if "Brazo" in paso_data:
+        brazo = paso_data["Brazo"]
+        for campo in CAMPOS_BRAZO:
+            if campo not in brazo:
+                raise ValueError("Falta el campo requerido: {} en Brazo para {}".format(campo, paso_nombre))
+
+        angulos = (brazo["angulo0_grados"], brazo["angulo1_grados"], brazo["angulo2_grados"])
+        for a in angulos:
+            if not isinstance(a, (int, float)):
+                raise TypeError("Los ángulos del brazo deben ser numéricos para {}".format(paso_nombre))
+
+        # t_ser por defecto: 1.0 segundos
+        t_ser = brazo.get("t_ser", 1.0)
+
+        curva = CURVAS.get(brazo.get("curva", CURVA_POR_DEFECTO))
+        if curva is None:
+            raise ValueError("'curva' en Brazo para {} debe ser 'lineal', 'coseno' o 'min_jerk'".format(paso_nombre))
+
+    sincronia = SINCRONIAS.get(paso_data.get("sincronia", SINCRONIA_POR_DEFECTO))
+    if sincronia is None:
+        raise ValueError("'sincronia' en {} debe ser 'paralelo', 'brazo_primero' o 'avance_primero'".format(paso_nombre))
+
+    return (op, sentido, abs(distancia), mov["velocidad_mm_s"], giro, angulo, vel_giro, angulos, t_ser, sincronia,
+            False, None, curva)
+
+
+def clave_carro(data):
+    """Devuelve la clave 'Carro_X' del mensaje."""
+    if data:
+        for key in data:
+            if key.startswith("Carro_"):
+                return key
+    raise ValueError("El JSON no contiene una clave 'Carro_X' principal.")
+
+
+def compilar_programa(data):
+    """Compila el objeto JSON ya decodificado a un plan (tupla de pasos en orden)."""
+    carro_key = clave_carro(data)
+    pasos = data[carro_key]
+    if not pasos:
+        raise ValueError("La sección '{}' no contiene ningún paso.".format(carro_key))
+
+    # Ordenar pasos numéricamente por su número
+    claves_ordenadas = sorted((k for k in pasos if k.startswith("Paso_")), key=lambda x: int(x[5:]))
+    return tuple(compilar_paso(k, pasos[k]) for k in claves_ordenadas)
+
+
+class CachePlanes:
+    """
+    Caché LRU pequeña de planes compilados, indexada por el hash del mensaje.
+    Se guarda también el mensaje para descartar colisiones de hash.
+    """
+
+    def __init__(self, capacidad=8):
+        self.capacidad = capacidad
+        self._planes = {}
+        self._orden = []
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, mensaje):
+        clave = hash(mensaje)
+        entrada = self._planes.get(clave)
+        if entrada is not None and entrada[0] == mensaje:
+            self.aciertos += 1
+            if self._orden[-1] != clave:
+                self._orden.remove(clave)
+                self._orden.append(clave)
+            return entrada[1]
+        self.fallos += 1
+        return None
+
+    def contiene(self, mensaje):
+        """Si el mensaje está en la caché (sin contar acierto ni reordenar)."""
+        entrada = self._planes.get(hash(mensaje))
+        return entrada is not None and entrada[0] == mensaje
+
+    def guardar(self, mensaje, plan):
+        clave = hash(mensaje)
+        if clave in self._planes:
+            self._orden.remove(clave)
+        elif len(self._orden) >= self.capacidad:
+            del self._planes[self._orden.pop(0)]
+        self._planes[clave] = (mensaje, plan)
+        self._orden.append(clave)
+
+
+cache_planes = CachePlanes()
+
+
+class ProgramaIncremental:
+    """
+    Pasos de un programa que se van recibiendo por fragmentos.
+    siguiente() entrega Paso_N en cuanto Paso_N-1 se entregó y Paso_N ya llegó
+    validado. Si la numeración tiene huecos, se espera a tener el programa
+    completo para saltarlos, como hacía el orden del parser original.
+    """
+
+    def __init__(self, id_programa, timeout_ms=TIMEOUT_FRAGMENTOS_MS):
+        self.id = id_programa
+        self.timeout_ms = timeout_ms
+        self.pasos = {}
+        self.seqs = set()
+        self.seq_fin = None
+        self.ultimo = 0  # número del último paso entregado
+        self.rechazados = 0  # Fragmentos inválidos descartados enteros
+        self.ultimo_dato = ticks_ms()
+
+    @classmethod
+    def desde_plan(cls, plan):
+        """Programa que llegó entero en un solo mensaje."""
+        programa = cls(None)
+        for i, paso in enumerate(plan, 1):
+            programa.pasos[i] = paso
+        programa.seqs.add(0)
+        programa.seq_fin = 0
+        return programa
+
+    def agregar(self, data):
+        """
+        Valida y guarda los pasos de un fragmento: todos o ninguno. Devuelve
+        False si el fragmento es inválido; no queda nada de él y su seq puede
+        volver a llegar bien.
+        """
+        try:
+            seq = data["seq"]
+            if seq in self.seqs:
+                return True  # Duplicado
+            pasos = data[clave_carro(data)]
+            nuevos = {}
+            for nombre in pasos:
+                if nombre.startswith("Paso_"):
+                    numero = int(nombre[5:])
+                    if numero > self.ultimo:
+                        nuevos[numero] = compilar_paso(nombre, pasos[nombre])
+        except (KeyError, TypeError, ValueError) as e:
+            print("Fragmento del programa {} descartado: {}".format(self.id, e))
+            self.rechazados += 1
+            return False
+        self.pasos.update(nuevos)
+        self.seqs.add(seq)
+        if data.get("fin"):
+            self.seq_fin = seq
+        self.ultimo_dato = ticks_ms()
+        return True
+
+    def agregar_mensaje(self, mensaje, data=None):
+        """
+        Agrega el mensaje si es un fragmento de este programa; devuelve False si no lo es.
+        Un fragmento de este programa que es inválido se descarta (rechazados)
+        y también devuelve True: no es un mensaje para nadie más.
+        data: el mensaje ya parseado (ingesta_udp), para no volver a parsearlo.
+        """
+        if self.id is None:
+            return False
+        if data is None:
+            if '"programa"' not in mensaje:
+                return False
+            try:
+                data = json.loads(mensaje)
+            except ValueError:
+                return False
+        if not isinstance(data, dict) or data.get("programa") != self.id:
+            return False
+        self.agregar(data)
+        return True
+
+    @property
+    def completo(self):
+        return self.seq_fin is not None and len(self.seqs) == self.seq_fin + 1
+
+    @property
+    def terminado(self):
+        return self.completo and not self.pasos
+
+    def expirado(self):
+        return not self.completo and ticks_diff(ticks_ms(), self.ultimo_dato) > self.timeout_ms
+
+    def siguiente(self):
+        """Devuelve (numero, paso) del siguiente paso listo, o None si hay que esperar."""
+        numero = self.ultimo + 1
+        if numero not in self.pasos:
+            if not self.completo or not self.pasos:
+                return None
+            numero = min(self.pasos)
+        self.ultimo = numero
+        return numero, self.pasos.pop(numero)
+
+
+def abrir_programa(mensaje, optimizar=None, data=None, plan=None):
+    """
+    Crea el ProgramaIncremental de un mensaje nuevo: un programa completo
+    (desde la caché si ya se vio) o el primer fragmento que llega de uno largo.
+    optimizar(plan, data) -> plan se aplica a los programas completos antes de
+    guardarlos en la caché. data: el mensaje ya parseado, si lo hay.
+    plan: el de un programa binario, ya decodificado.
+    Devuelve None si el mensaje es inválido.
+    """
+    try:
+        en_cache = cache_planes.obtener(mensaje)
+        if en_cache is not None:
+            return ProgramaIncremental.desde_plan(en_cache)
+        if data is None:
+            data = json.loads(mensaje)
+        if "programa" in data:
+            programa = ProgramaIncremental(data["programa"])
+            return programa if programa.agregar(data) else None
+        if plan is None:
+            plan = compilar_programa(data)
+        if optimizar is not None:
+            plan = optimizar(plan, data)
+        cache_planes.guardar(mensaje, plan)
+        return ProgramaIncremental.desde_plan(plan)
+
+    except Exception as e:
+        print("ERROR en el parseo:", e)
+        return None
+
+
+def control_de(mensaje, data=None):
+    """Devuelve el campo "control" del mensaje, o None si es un programa normal."""
+    if data is not None:
+        return data.get("control")
+    # Solo se parsea si aparece la clave, para no duplicar el json.loads de cada programa
+    if '"control"' not in mensaje:
+        return None
+    try:
+        data = json.loads(mensaje)
+    except ValueError:
+        return None
+    return data.get("control") if isinstance(data, dict) else None
+
+
+def fragmentar_programa(data, id_programa, tamano_max=TAMANO_MAX_DATAGRAMA):
+    """
+    Lado central: parte un programa {"Carro_X": {...}} en mensajes JSON de
+    como mucho tamano_max bytes, con los pasos en orden y "fin" en el último.
+    """
+    carro_key = clave_carro(data)
+    pasos = data[carro_key]
+    extra = {k: v for k, v in data.items() if k != carro_key}
+    nombres = sorted((k for k in pasos if k.startswith("Paso_")), key=lambda x: int(x[5:]))
+
+    def mensaje(seq, grupo, fin):
+        fragmento = dict(extra, programa=id_programa, seq=seq, fin=fin)
+        fragmento[carro_key] = {k: pasos[k] for k in grupo}
+        return json.dumps(fragmento)
+
+    mensajes = []
+    grupo = []
+    for nombre in nombres:
+        if grupo and len(mensaje(len(mensajes), grupo + [nombre], False)) > tamano_max:
+            mensajes.append(mensaje(len(mensajes), grupo, False))
+            grupo = []
+        grupo.append(nombre)
+    mensajes.append(mensaje(len(mensajes), grupo, True))
+    return mensajes
+
+
+def parsear_comando(datos_json):
+    """
+    Devuelve el plan (tupla de pasos) de un mensaje JSON, o None si es inválido.
+    Los mensajes repetidos se resuelven desde la caché sin parsear.
+    """
+    try:
+        plan = cache_planes.obtener(datos_json)
+        if plan is None:
+            plan = compilar_programa(json.loads(datos_json))
+            cache_planes.guardar(datos_json, plan)
+        return plan
+
+    except Exception as e:
+        print("ERROR en el parseo:", e)
+        return None
@@ -0,0 +1,28 @@
+# conversion_yuv.py
+# Conversión de frames YUV422 (YUYV) de la OV7670 a BGR para OpenCV.
+
+import numpy as np
+
+
+def yuv422_a_bgr(yuv, width, height):
+    """
+    Convierte un frame YUYV completo a BGR usando aritmética de arreglos.
+    yuv: bytes/bytearray/ndarray con width * height * 2 bytes.
+    Devuelve un ndarray (height, width, 3) uint8.
+    Usa la misma fórmula entera BT.601 que la versión píxel a píxel del
+    servidor original (ver PruebaConversionYUV.py): el resultado es idéntico
+    bit a bit.
+    """
+    yuv = np.frombuffer(yuv, dtype=np.uint8).reshape((height, width, 2))
+
+    # Cada par de píxeles comparte U (byte 1 del píxel par) y V (byte 1 del impar)
+    c = yuv[:, :, 0].astype(np.int32) - 16
+    d = np.repeat(yuv[:, 0::2, 1].astype(np.int32) - 128, 2, axis=1)
+    e = np.repeat(yuv[:, 1::2, 1].astype(np.int32) - 128, 2, axis=1)
+
+    c = 298 * c + 128
+    bgr = np.empty((height, width, 3), dtype=np.uint8)
+    bgr[:, :, 0] = np.clip((c + 516 * d) >> 8, 0, 255)
+    bgr[:, :, 1] = np.clip((c - 100 * d - 208 * e) >> 8, 0, 255)
+    bgr[:, :, 2] = np.clip((c + 409 * e) >> 8, 0, 255)
+    return bgr
@@ -0,0 +1,194 @@
+# emisor_central.py
+# Lado central: envío de comandos a los carros con número de secuencia,
+# confirmación y retransmisión (el carro responde con los ACK de secuencia.py).
+#
+# Cada comando se manda una vez con su sobre y queda pendiente hasta que llega
+# su ACK. Se retransmite solo ese comando:
+#   - cuando vence su plazo, RTO, que se ajusta con el RTT medido (SRTT y
+#     RTTVAR como en TCP, RFC 6298) y se duplica en cada reintento;
+#   - antes de vencer, si ya se confirmaron ADELANTAMIENTOS comandos enviados
+#     después de él (se perdió ese, no la red entera) y lleva fuera más que
+#     el RTT habitual (SRTT + RTTVAR).
+# El RTT solo se mide con comandos confirmados al primer intento (algoritmo
+# de Karn): el ACK de un reenvío no dice a cuál de los envíos responde.
+#
+# La numeración es por destino (cada carro tiene su ventana de duplicados) y
+# a cada destino no se le manda un número que esté VENTANA_DUPLICADOS o más
+# por encima del más antiguo sin confirmar: el carro lo tomaría por repetido
+# y no lo ejecutaría. Los comandos que no caben esperan en una cola y salen
+# según llegan los ACK.
+#
+# No bloquea: procesar() lee los ACK y hace los reenvíos que tocan; esperar()
+# lo repite hasta que no queda nada pendiente. Los datagramas que no son ACK
+# (la telemetría de los carros) se entregan a al_recibir(datos, origen).
+
+import json
+
+try:
+    from os import urandom
+except ImportError:
+    from uos import urandom
+
+from secuencia import sobre, VENTANA_DUPLICADOS
+from tiempo import ticks_ms, ticks_diff, ticks_add, sleep_ms
+
+RTO_INICIAL_MS = 200      # Hasta tener la primera medida; la WiFi local responde en pocos ms
+RTO_MINIMO_MS = 20
+RTO_MAXIMO_MS = 2000
+MAX_INTENTOS = 10
+ADELANTAMIENTOS = 3       # ACK de comandos posteriores que adelantan la retransmisión
+TAMANO_RECEPCION = 2048
+LATENCIAS_RECIENTES = 64  # Latencias de entrega que se guardan (las últimas)
+
+
+class EmisorCentral:
+    """sock: socket UDP no bloqueante, en el puerto al que responden los carros."""
+
+    def __init__(self, sock, al_recibir=None, sesion=None):
+        self.sock = sock
+        self.al_recibir = al_recibir
+        # Una sesión nueva en cada arranque: el carro reinicia su ventana de duplicados
+        self.sesion = sesion if sesion is not None else int.from_bytes(urandom(2), "big")
+        self.siguiente = {}   # ip -> siguiente n para ese destino
+        # (ip, n) -> [datagrama, destino, enviado_ms, plazo_ms, intentos, adelantado, primer_envio_ms, transmision]
+        self.pendientes = {}
+        self.en_espera = {}   # ip -> [(n, datagrama, destino, enviar_ms)] que aún no caben en la ventana
+        self.transmisiones = 0  # Orden de cada envío, para saber qué se mandó después de qué
+        self.srtt = None
+        self.rttvar = None
+        self.rto = RTO_INICIAL_MS
+        # Contadores
+        self.enviados = 0
+        self.confirmados = 0
+        self.retransmisiones = 0
+        self.rapidas = 0
+        self.fallidos = 0
+        self.acks_repetidos = 0
+        self.invalidos = 0        # ACK con campos que no son los de texto_ack
+        self.latencias_ms = []    # De enviar() al ACK, las últimas LATENCIAS_RECIENTES
+        self.latencia_maxima_ms = 0
+
+    def enviar(self, cuerpo, destino):
+        """
+        Envía cuerpo (texto JSON o bytes) a destino (ip, puerto); devuelve su
+        número. Si el destino tiene la ventana llena, sale en un procesar() posterior.
+        """
+        if isinstance(cuerpo, str):
+            cuerpo = cuerpo.encode()
+        ip = destino[0]
+        n = self.siguiente.get(ip, 1)
+        self.siguiente[ip] = n + 1
+        ahora = ticks_ms()
+        self.en_espera.setdefault(ip, []).append((n, sobre(self.sesion, n, cuerpo), destino, ahora))
+        self._sacar_de_espera(ip, ahora)
+        return n
+
+    def _sacar_de_espera(self, ip, ahora):
+        """Transmite los comandos en espera de ip que ya caben en la ventana del carro."""
+        cola = self.en_espera.get(ip)
+        while cola:
+            n, datagrama, destino, enviar_ms = cola[0]
+            antiguos = [m for d, m in self.pendientes if d == ip]
+            if antiguos and n - min(antiguos) >= VENTANA_DUPLICADOS:
+                return
+            cola.pop(0)
+            self.pendientes[(ip, n)] = [datagrama, destino, ahora, 0, 0, 0, enviar_ms, 0]
+            self._transmitir((ip, n), ahora)
+            self.enviados += 1
+        self.en_espera.pop(ip, None)
+
+    def _transmitir(self, clave, ahora):
+        envio = self.pendientes[clave]
+        self.sock.sendto(envio[0], envio[1])
+        envio[2] = ahora
+        envio[4] += 1
+        envio[5] = 0
+        self.transmisiones += 1
+        envio[7] = self.transmisiones
+        envio[3] = ticks_add(ahora, min(RTO_MAXIMO_MS, self.rto << (envio[4] - 1)))
+
+    def _medir(self, rtt):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.rto = int(max(RTO_MINIMO_MS, min(RTO_MAXIMO_MS, self.srtt + 4 * self.rttvar)))
+
+    def _confirmar(self, ip, n, ahora):
+        envio = self.pendientes.pop((ip, n), None)
+        if envio is None:
+            self.acks_repetidos += 1
+            return
+        self.confirmados += 1
+        latencia = ticks_diff(ahora, envio[6])
+        if len(self.latencias_ms) >= LATENCIAS_RECIENTES:
+            self.latencias_ms.pop(0)
+        self.latencias_ms.append(latencia)
+        if latencia > self.latencia_maxima_ms:
+            self.latencia_maxima_ms = latencia
+        if envio[4] == 1:
+            self._medir(ticks_diff(ahora, envio[2]))
+        # Los transmitidos antes al mismo destino, aún sin ACK: se perdieron si
+        # los adelantan varios (un reenvío solo lo adelantan los posteriores a él)
+        for (d, m), otro in self.pendientes.items():
+            if d == ip and otro[7] < envio[7]:
+                otro[5] += 1
+                if otro[5] == ADELANTAMIENTOS:
+                    # Se reenvía cuando lleva fuera SRTT + RTTVAR: antes su ACK
+                    # puede estar aún en camino, desordenado con los otros
+                    plazo = ticks_add(otro[2], int(self.srtt + self.rttvar) if self.srtt is not None else 0)
+                    if ticks_diff(plazo, otro[3]) < 0:
+                        otro[3] = plazo
+        self._sacar_de_espera(ip, ahora)
+
+    def _leer(self):
+        try:
+            return self.sock.recvfrom(TAMANO_RECEPCION)
+        except OSError:
+            return None
+
+    def procesar(self):
+        """Lee los ACK pendientes y retransmite lo que toca; devuelve cuántos quedan sin confirmar o en espera."""
+        ahora = ticks_ms()
+        recibido = self._leer()
+        while recibido is not None:
+            datos, origen = recibido
+            try:
+                data = json.loads(datos)
+            except ValueError:
+                data = None
+            if isinstance(data, dict) and "ack" in data:
+                n = data["ack"]
+                if not isinstance(n, int) or isinstance(n, bool) or not isinstance(data.get("ip"), str):
+                    print("ACK inválido descartado:", datos[:40])
+                    self.invalidos += 1
+                elif data.get("s") == self.sesion:
+                    self._confirmar(data["ip"], n, ahora)
+            elif self.al_recibir is not None:
+                self.al_recibir(datos, origen)
+            recibido = self._leer()
+
+        for clave in [c for c, envio in self.pendientes.items() if ticks_diff(ahora, envio[3]) >= 0]:
+            envio = self.pendientes[clave]
+            if envio[4] >= MAX_INTENTOS:
+                print("Comando {} a {} sin confirmar tras {} intentos".format(clave[1], clave[0], envio[4]))
+                del self.pendientes[clave]
+                self.fallidos += 1
+                self._sacar_de_espera(clave[0], ahora)
+                continue
+            if envio[5] >= ADELANTAMIENTOS:
+                self.rapidas += 1
+            self._transmitir(clave, ahora)
+            self.retransmisiones += 1
+        return len(self.pendientes) + sum(len(cola) for cola in self.en_espera.values())
+
+    def esperar(self, timeout_ms=None, periodo_ms=1):
+        """Procesa hasta que no queda nada pendiente; False si se agotó timeout_ms."""
+        inicio = ticks_ms()
+        while self.procesar():
+            if timeout_ms is not None and ticks_diff(ticks_ms(), inicio) >= timeout_ms:
+                return False
+            sleep_ms(periodo_ms)
+        return True
@@ -0,0 +1,170 @@
+# formato_binario.py
+# Formato binario de los programas, alternativo al JSON "Carro_X" / "Paso_N".
+# Un programa completo va en un solo datagrama: una cabecera fija y un
+# registro de tamaño fijo por paso, todo en big endian con struct. El carro
+# distingue los dos formatos por el primer byte: MAGIA no aparece nunca en un
+# texto UTF-8, y un JSON empieza por "{".
+#
+# Cabecera (CABECERA, 10 bytes):
+#   MAGIA | VERSION | ip_destino (4 bytes) | número del carro | flags | número de pasos
+#   flags: FLAG_PERMITIR_ARCOS
+# Paso (REGISTRO, 19 bytes):
+#   flags | distancia_mm (con signo) | velocidad_mm_s | giro (décimas de grado,
+#   con signo) | vel_grados_s | 3 ángulos del brazo (décimas de grado) |
+#   t_ser (ms) | sincronia (SINC_*) | curva (CURVA_*)
+#   flags: PASO_GIRO (radio_mm numérico; si no, "inf"), PASO_BRAZO
+#
+# En el carro, decodificar() da directamente el plan (las mismas tuplas que
+# comandos.compilar_paso) sin pasar por diccionarios. codificar() y a_json()
+# son del lado de la central y de las pruebas. Los programas fragmentados
+# siguen usando JSON: en 1400 bytes caben ya 73 pasos binarios.
+
+import struct
+
+from comandos import (OP_RECTO, OP_GIRO_Y_RECTO, P_OP, P_SENTIDO, P_DISTANCIA, P_VELOCIDAD, P_GIRO, P_ANGULO,
+                      P_VEL_GIRO, P_ANGULOS, P_T_SER, P_SINCRONIA, P_CURVA, SINCRONIAS, SINCRONIA_POR_DEFECTO,
+                      CURVAS, CURVA_POR_DEFECTO, CURVA_LINEAL, CAMPOS_BRAZO, clave_carro,
+                      compilar_paso)
+
+MAGIA = 0xFE
+VERSION = 1
+CABECERA = ">BB4sBBH"
+REGISTRO = ">BhHhHhhhHBB"
+TAMANO_CABECERA = struct.calcsize(CABECERA)
+TAMANO_REGISTRO = struct.calcsize(REGISTRO)
+
+FLAG_PERMITIR_ARCOS = 0x01
+PASO_GIRO = 0x01
+PASO_BRAZO = 0x02
+
+NOMBRES_SINCRONIA = {v: k for k, v in SINCRONIAS.items()}
+NOMBRES_CURVA = {v: k for k, v in CURVAS.items()}
+
+
+def es_binario(mensaje):
+    return len(mensaje) > 0 and mensaje[0] == MAGIA
+
+
+def ip_a_bytes(ip):
+    return bytes(int(x) for x in ip.split("."))
+
+
+def ip_destino(datos):
+    """Los 4 bytes de ip_destino, sin decodificar el resto. ValueError si no es un programa binario."""
+    if datos[0] != MAGIA:
+        raise ValueError("No es un programa binario")
+    if len(datos) < TAMANO_CABECERA:
+        raise ValueError("Programa binario truncado: {} bytes".format(len(datos)))
+    if datos[1] != VERSION:
+        raise ValueError("Versión de programa binario no soportada: {}".format(datos[1]))
+    return bytes(datos[2:6])
+
+
+def _decimas(valor):
+    """Décimas de grado de vuelta a grados (entero si es exacto, como en el JSON)."""
+    return valor // 10 if valor % 10 == 0 else valor / 10
+
+
+def decodificar(datos):
+    """
+    Devuelve (data, plan): data es {"ip_destino", "carro", "permitir_arcos"}
+    y plan el programa ya compilado. Lanza ValueError si el mensaje no es
+    válido.
+    """
+    ip = ip_destino(datos)
+    _, _, _, carro, flags, n = struct.unpack_from(CABECERA, datos, 0)
+    if len(datos) != TAMANO_CABECERA + n * TAMANO_REGISTRO:
+        raise ValueError("Programa binario de {} bytes, se esperaban {} pasos".format(len(datos), n))
+    if n == 0:
+        raise ValueError("El programa binario no contiene ningún paso.")
+    plan = []
+    for i in range(n):
+        (f, distancia, velocidad, giro, vel_giro, a0, a1, a2, t_ms, sincronia,
+         curva) = struct.unpack_from(REGISTRO, datos, TAMANO_CABECERA + i * TAMANO_REGISTRO)
+        if sincronia not in NOMBRES_SINCRONIA or curva not in NOMBRES_CURVA:
+            raise ValueError("'sincronia' o 'curva' inválidas en el paso {}".format(i + 1))
+        if f & PASO_GIRO:
+            op, sentido_giro, angulo = OP_GIRO_Y_RECTO, -1 if giro < 0 else 1, _decimas(abs(giro))
+        else:
+            op, sentido_giro, angulo, vel_giro = OP_RECTO, 0, 0, 0
+        if f & PASO_BRAZO:
+            angulos, t_ser = (_decimas(a0), _decimas(a1), _decimas(a2)), t_ms / 1000
+        else:
+            angulos, t_ser, curva = None, None, CURVA_LINEAL
+        plan.append((op, 1 if distancia >= 0 else -1, abs(distancia), velocidad, sentido_giro, angulo, vel_giro,
+                     angulos, t_ser, sincronia, False, None, curva))
+    data = {"ip_destino": "{}.{}.{}.{}".format(*ip), "carro": "Carro_{}".format(carro),
+            "permitir_arcos": bool(flags & FLAG_PERMITIR_ARCOS)}
+    return data, tuple(plan)
+
+
+# --- Lado central -----------------------------------------------------------
+
+def _entero(valor, escala, minimo, maximo, campo, paso):
+    """valor * escala como entero exacto dentro del rango del campo."""
+    entero = int(round(valor * escala))
+    if abs(entero - valor * escala) > 1e-6 or not minimo <= entero <= maximo:
+        raise ValueError("'{}' en {} no cabe en el formato binario: {}".format(campo, paso, valor))
+    return entero
+
+
+def _registro(nombre, paso):
+    compilar_paso(nombre, paso)  # Mismas validaciones y mensajes que el JSON
+    mov = paso["Movimiento"]
+    flags = 0
+    giro = vel_giro = 0
+    if str(mov["radio_mm"]).lower() != "inf":
+        flags |= PASO_GIRO
+        giro = _entero(mov["radio_mm"], 10, -32768, 32767, "radio_mm", nombre)
+        vel_giro = _entero(mov.get("vel_grados_s", 60), 1, 0, 65535, "vel_grados_s", nombre)
+    angulos = (0, 0, 0)
+    t_ms = 0
+    curva = CURVAS[CURVA_POR_DEFECTO]
+    if "Brazo" in paso:
+        brazo = paso["Brazo"]
+        flags |= PASO_BRAZO
+        angulos = tuple(_entero(brazo[c], 10, -32768, 32767, c, nombre) for c in CAMPOS_BRAZO)
+        t_ms = _entero(brazo.get("t_ser", 1.0), 1000, 0, 65535, "t_ser", nombre)
+        curva = CURVAS[brazo.get("curva", CURVA_POR_DEFECTO)]
+    sincronia = SINCRONIAS[paso.get("sincronia", SINCRONIA_POR_DEFECTO)]
+    return struct.pack(REGISTRO, flags,
+                       _entero(mov["distancia_mm"], 1, -32768, 32767, "distancia_mm", nombre),
+                       _entero(mov["velocidad_mm_s"], 1, 0, 65535, "velocidad_mm_s", nombre),
+                       giro, vel_giro, angulos[0], angulos[1], angulos[2], t_ms, sincronia, curva)
+
+
+def codificar(data):
+    """
+    Programa {"ip_destino": ..., "Carro_X": {"Paso_N": ...}} en binario.
+    Lanza ValueError si algún valor no es representable (distancias que no
+    son mm enteros, ángulos con más de un decimal...).
+    """
+    carro_key = clave_carro(data)
+    pasos = data[carro_key]
+    nombres = sorted((k for k in pasos if k.startswith("Paso_")), key=lambda x: int(x[5:]))
+    flags = FLAG_PERMITIR_ARCOS if data.get("permitir_arcos") else 0
+    cabecera = struct.pack(CABECERA, MAGIA, VERSION, ip_a_bytes(data.get("ip_destino", "0.0.0.0")),
+                           int(carro_key[6:]), flags, len(nombres))
+    return cabecera + b"".join(_registro(k, pasos[k]) for k in nombres)
+
+
+def a_json(datos):
+    """El programa binario en el formato JSON de siempre (pasos numerados desde 1)."""
+    data, plan = decodificar(datos)
+    pasos = {}
+    for i, paso in enumerate(plan, 1):
+        mov = {"distancia_mm": paso[P_SENTIDO] * paso[P_DISTANCIA], "velocidad_mm_s": paso[P_VELOCIDAD],
+               "radio_mm": "inf" if paso[P_OP] == OP_RECTO else paso[P_GIRO] * paso[P_ANGULO]}
+        if paso[P_OP] != OP_RECTO:
+            mov["vel_grados_s"] = paso[P_VEL_GIRO]
+        json_paso = {"Movimiento": mov, "sincronia": NOMBRES_SINCRONIA[paso[P_SINCRONIA]]}
+        if paso[P_ANGULOS] is not None:
+            brazo = dict(zip(CAMPOS_BRAZO, paso[P_ANGULOS]))
+            brazo["t_ser"] = paso[P_T_SER]
+            brazo["curva"] = NOMBRES_CURVA[paso[P_CURVA]]
+            json_paso["Brazo"] = brazo
+        pasos["Paso_{}".format(i)] = json_paso
+    resultado = {"ip_destino": data["ip_destino"], data["carro"]: pasos}
+    if data["permitir_arcos"]:
+        resultado["permitir_arcos"] = True
+    return resultado
@@ -0,0 +1,174 @@
+# ingesta_udp.py
+# Recepción de los datagramas de la central en el carro.
+# En cada sondeo se leen todos los datagramas pendientes (hasta
+# MAX_POR_SONDEO) sobre un mismo buffer reservado al arrancar, y cada uno se
+# parsea una sola vez para decidir a dónde va:
+#   - "ip_destino" es la IP del carro: a la cola local, como (texto, data,
+#     None), y el ejecutor usa ese mismo data sin volver a parsear.
+#   - otro destino: se reenvían los bytes tal cual llegaron por el enlace UART
+#     (reenviar(bytes), que los copia antes de la siguiente lectura).
+# Un programa que ya está en la caché de planes (comandos.cache_planes) no se
+# parsea: ya se vio, y era para este carro.
+# Los programas binarios (formato_binario.py, primer byte MAGIA) se enrutan
+# leyendo solo la IP de la cabecera; los locales se encolan como (bytes, data,
+# plan) con el plan ya decodificado aparte: nunca sale de un JSON recibido.
+# Los datagramas con sobre de secuencia (secuencia.py) se confirman con un ACK
+# por responder(texto) cuando se aceptan (a la cola local o al enlace, si
+# tenían sitio), y los repetidos se vuelven a confirmar sin parsearlos ni
+# ejecutarlos. Al enlace se reenvía el datagrama entero, con su sobre.
+# Lo que se confirma no se descarta después: con la cola local llena (o si
+# admitir() lo rechaza) el mensaje no se confirma y la central lo repite.
+#
+# El socket se recibe desde fuera (CarroWiFi) para poder usarlo en el PC.
+
+import json
+
+from comandos import cache_planes
+from formato_binario import es_binario, decodificar, ip_a_bytes, ip_destino
+from secuencia import SOBRE, VentanaDuplicados, abrir_sobre, texto_ack
+
+TAMANO_BUFFER = 8192     # El mismo máximo que leía recibir_del_central
+MAX_POR_SONDEO = 16      # Datagramas por lectura; el resto queda para la siguiente
+MAX_LOCALES = 16         # Mensajes locales que esperan al ejecutor
+
+
+class IngestaUDP:
+    """
+    sock: socket UDP no bloqueante. mi_ip: la IP del carro.
+    reenviar(bytes): envía un mensaje de otro carro por el enlace. Recibe una
+    vista del buffer de recepción: tiene que copiarla antes de volver. Si
+    devuelve False (enlace lleno) el mensaje no se confirma.
+    responder(texto): envía los ACK a la central (None: no se confirma nada).
+    admitir(texto, data, en_cola): si el que lee la cola local tiene sitio
+    para el mensaje, contando los en_cola que aún esperan aquí (None: solo
+    se limita a MAX_LOCALES).
+    """
+
+    def __init__(self, sock, mi_ip, reenviar, responder=None, admitir=None, tamano_buffer=TAMANO_BUFFER):
+        self.sock = sock
+        self.mi_ip = mi_ip
+        self._mi_ip_binaria = ip_a_bytes(mi_ip)
+        self.reenviar = reenviar
+        self.responder = responder
+        self.admitir = admitir
+        self.ventana = VentanaDuplicados()
+        self.buffer = bytearray(tamano_buffer)
+        self.vista = memoryview(self.buffer)
+        # recv_into en CPython; en MicroPython el socket lee con readinto
+        self._leer = getattr(sock, "recv_into", None) or sock.readinto
+        self.locales = []
+        self.recibidos = 0
+        self.reenviados = 0
+        self.invalidos = 0
+        self.descartados = 0
+        self.duplicados = 0
+
+    def _leer_datagrama(self):
+        """Bytes del siguiente datagrama en el buffer, o 0 si no hay."""
+        try:
+            n = self._leer(self.buffer)
+        except OSError:  # EAGAIN: no hay nada pendiente
+            return 0
+        return n or 0
+
+    def drenar(self, maximo=MAX_POR_SONDEO):
+        """Lee y reparte los datagramas pendientes; devuelve cuántos leyó."""
+        leidos = 0
+        while leidos < maximo:
+            n = self._leer_datagrama()
+            if not n:
+                break
+            leidos += 1
+            crudo = self.vista[:n]
+            if crudo[0] == SOBRE:
+                self._repartir_sobre(crudo)
+            else:
+                self._repartir_cuerpo(crudo, crudo)
+        self.recibidos += leidos
+        return leidos
+
+    def _repartir_sobre(self, datagrama):
+        try:
+            sesion, n, cuerpo = abrir_sobre(datagrama)
+        except ValueError as e:
+            print("Datagrama inválido descartado:", e)
+            self.invalidos += 1
+            return
+        if self.ventana.visto(sesion, n):
+            # La central no recibió el ACK: se repite, pero no se ejecuta otra vez
+            self.duplicados += 1
+            self._confirmar(sesion, n)
+            return
+        if len(cuerpo) and self._repartir_cuerpo(cuerpo, datagrama):
+            self.ventana.marcar(sesion, n)
+            self._confirmar(sesion, n)
+
+    def _confirmar(self, sesion, n):
+        if self.responder is not None:
+            self.responder(texto_ack(sesion, n, self.mi_ip))
+
+    def _repartir_cuerpo(self, cuerpo, datagrama):
+        """Reparte el cuerpo; True si se aceptó. datagrama es lo que se reenvía."""
+        if es_binario(cuerpo):
+            return self._repartir_binario(cuerpo, datagrama)
+        try:
+            texto = str(cuerpo, 'utf-8')
+        except UnicodeError:
+            print("Datagrama inválido descartado: no es UTF-8")
+            self.invalidos += 1
+            return False
+        return self._repartir(texto, datagrama)
+
+    def _reenviar(self, datagrama):
+        if self.reenviar(datagrama) is False:
+            return False
+        self.reenviados += 1
+        return True
+
+    def _repartir(self, texto, datagrama):
+        if cache_planes.contiene(texto):
+            return self._encolar(texto, None)
+        try:
+            data = json.loads(texto)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            print("Datagrama inválido descartado:", texto[:40])
+            self.invalidos += 1
+            return False
+        if data.get("ip_destino", "") == self.mi_ip:
+            return self._encolar(texto, data)
+        return self._reenviar(datagrama)
+
+    def _repartir_binario(self, cuerpo, datagrama):
+        try:
+            local = ip_destino(cuerpo) == self._mi_ip_binaria
+            if local:
+                mensaje = bytes(cuerpo)
+                data, plan = decodificar(mensaje)
+        except ValueError as e:
+            print("Programa binario inválido descartado:", e)
+            self.invalidos += 1
+            return False
+        if local:
+            return self._encolar(mensaje, data, plan)
+        return self._reenviar(datagrama)
+
+    def _encolar(self, texto, data, plan=None):
+        """False si no hay sitio: el mensaje se descarta sin confirmarlo."""
+        if len(self.locales) >= MAX_LOCALES or (
+                self.admitir is not None and not self.admitir(texto, data, len(self.locales))):
+            self.descartados += 1
+            return False
+        self.locales.append((texto, data, plan))
+        return True
+
+    def siguiente(self):
+        """
+        (texto, data, plan) del siguiente mensaje local, o None. data es None
+        si el plan está en caché; en los programas binarios texto son los
+        bytes y plan el decodificado (None en los JSON).
+        """
+        if not self.locales:
+            self.drenar()
+        return self.locales.pop(0) if self.locales else None
@@ -0,0 +1,86 @@
+# interpolacion_brazo.py
+# Interpolación de los tres servos del brazo a la vez, en un solo tick.
+# Una TrayectoriaBrazo va de unos ángulos a otros en duracion_ms siguiendo una
+# curva (CURVA_* de comandos.py):
+#   - lineal: velocidad constante, como antes
+#   - coseno: arranca y frena suave (velocidad en forma de campana)
+#   - min_jerk: 10s³ - 15s⁴ + 6s⁵, además con aceleración nula en los extremos
+# El número de pasos se adapta al movimiento: no más de uno por periodo del
+# PWM de los servos (más rápido no sirve) ni más de los necesarios para que
+# cada paso mueva unos RESOLUCION_SERVO_GRADOS (menos, el servo no lo nota).
+# Al crear la trayectoria se calcula, para cada paso, el índice en las tablas
+# de los servos (tablas_servo.py) de cada articulación; durante el movimiento
+# cada paso es leer índices de arrays.
+
+import math
+from array import array
+
+from comandos import CURVA_LINEAL, CURVA_COSENO, CURVA_MIN_JERK
+from tablas_servo import indice_angulo
+from tiempo import ticks_ms, ticks_diff, ticks_add, sleep_ms
+
+PERIODO_SERVO_MS = 20          # El PWM de los servos es de 50 Hz
+RESOLUCION_SERVO_GRADOS = 0.5  # Banda muerta del servo (AJUSTAR EXPERIMENTALMENTE)
+
+
+def suavizar(curva, s):
+    """Fracción del recorrido hecha en la fracción s (0..1) del tiempo."""
+    if curva == CURVA_COSENO:
+        return (1 - math.cos(math.pi * s)) / 2
+    if curva == CURVA_MIN_JERK:
+        return s * s * s * (10 - 15 * s + 6 * s * s)
+    return s
+
+
+class TrayectoriaBrazo:
+    """
+    Paso k (0..pasos) en el instante instante_ms(k) desde el inicio del movimiento.
+    indices[3k..3k+2]: índices de base, hombro y codo del paso k en las tablas.
+    """
+
+    def __init__(self, desde, hasta, duracion_ms, curva=CURVA_LINEAL):
+        self.desde = tuple(desde)
+        self.hasta = tuple(hasta)
+        self.delta = tuple(b - a for a, b in zip(self.desde, self.hasta))
+        self.duracion_ms = max(1, int(duracion_ms))
+        mayor = max(abs(d) for d in self.delta)
+        self.pasos = max(1, min(self.duracion_ms // PERIODO_SERVO_MS,
+                                math.ceil(mayor / RESOLUCION_SERVO_GRADOS)))
+        self.fracciones = array('f', [suavizar(curva, k / self.pasos) for k in range(self.pasos + 1)])
+        self.indices = array('H')
+        for k in range(self.pasos + 1):
+            for angulo in self.angulos(k):
+                self.indices.append(indice_angulo(angulo))
+
+    def instante_ms(self, k):
+        return self.duracion_ms * k // self.pasos
+
+    def paso_en(self, transcurrido_ms):
+        """Último paso cuyo instante ya llegó: el mayor k con instante_ms(k) <= transcurrido_ms."""
+        if transcurrido_ms >= self.duracion_ms:
+            return self.pasos
+        if transcurrido_ms < 0:
+            return 0
+        # duracion * k // pasos <= t  <=>  duracion * k < (t + 1) * pasos
+        return ((transcurrido_ms + 1) * self.pasos - 1) // self.duracion_ms
+
+    def angulos(self, k):
+        if k >= self.pasos:
+            return self.hasta
+        f = self.fracciones[k]
+        d = self.delta
+        a = self.desde
+        return (a[0] + d[0] * f, a[1] + d[1] * f, a[2] + d[2] * f)
+
+
+def recorrer(trayectoria, posicionar_paso):
+    """
+    Versión con espera (mover_brazo): cada paso en su plazo, contando desde el
+    inicio. posicionar_paso(trayectoria, k) escribe los servos.
+    """
+    inicio = ticks_ms()
+    for k in range(1, trayectoria.pasos + 1):
+        espera = ticks_diff(ticks_add(inicio, trayectoria.instante_ms(k)), ticks_ms())
+        if espera > 0:
+            sleep_ms(espera)
+        posicionar_paso(trayectoria, k)
@@ -0,0 +1,200 @@
+# linea_tiempo.py
+# Ejecución de los pasos contra plazos absolutos en ticks_ms.
+# Cada paso se convierte en eventos con instante fijo (girar, avanzar,
+# detener) y un tramo de brazo (de qué ángulos a cuáles, entre qué instantes).
+# El paso siguiente empieza en el plazo de fin del anterior, no "cuando
+# termine de dormir": los retrasos de un paso no se acumulan en la rutina.
+#
+# Las duraciones salen del controlador de motores (perfil_avance /
+# duracion_giro_ms, en mm y grados), así que se espera una sola vez lo que
+# tarda el carro en recorrer la distancia a la velocidad calibrada que se le
+# pide (velocidad_mm_s del paso, ver calibracion_motores.py). Los avances en
+# recta llevan un perfil trapezoidal (perfiles_movimiento.py): acelera si la
+# base estaba parada y frena si no sigue en el paso siguiente (P_CONTINUAR).
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+from comandos import (OP_GIRO_Y_RECTO, OP_ARCO, P_OP, P_SENTIDO, P_DISTANCIA, P_VELOCIDAD, P_GIRO, P_ANGULO,
+                      P_ANGULOS, P_T_SER, P_SINCRONIA, P_CONTINUAR, P_RELACION,
+                      P_CURVA, SINC_PARALELO, SINC_AVANCE_PRIMERO)
+from interpolacion_brazo import TrayectoriaBrazo
+from tiempo import ticks_ms, ticks_diff, ticks_add
+
+# Acciones de la base
+ACCION_DETENER = 0
+ACCION_AVANZAR = 1
+ACCION_GIRAR = 2
+ACCION_ARCO = 3
+
+TOLERANCIA_INICIO_MS = 20  # Si un paso llega más tarde que esto, se replanifica desde ahora
+
+
+def planificar_paso(paso, motor, inicio, en_marcha=False):
+    """
+    Devuelve (eventos, tramo_brazo, fin) con instantes absolutos en ms:
+    eventos = [(instante, accion, argumento)], tramo_brazo = (inicio, fin, angulos, curva) o None.
+    en_marcha: la base viene avanzando del paso anterior (P_CONTINUAR).
+    """
+    duracion_giro = duracion_avance = 0
+    perfil = None
+    if paso[P_OP] == OP_GIRO_Y_RECTO and paso[P_ANGULO] > 0:
+        duracion_giro = motor.duracion_giro_ms(paso[P_ANGULO])
+    if paso[P_OP] == OP_ARCO:
+        duracion_avance = motor.duracion_arco_ms(paso[P_DISTANCIA], paso[P_RELACION], paso[P_VELOCIDAD])
+    elif paso[P_DISTANCIA] > 0:
+        perfil = motor.perfil_avance(paso[P_DISTANCIA], paso[P_VELOCIDAD],
+                                     not en_marcha or duracion_giro > 0, not paso[P_CONTINUAR])
+        duracion_avance = perfil.duracion_ms
+    duracion_base = duracion_giro + duracion_avance
+    duracion_brazo = max(1, int(paso[P_T_SER] * 1000)) if paso[P_ANGULOS] is not None else 0
+
+    inicio_base = inicio_brazo = inicio
+    if duracion_brazo and duracion_base:
+        if paso[P_SINCRONIA] == SINC_AVANCE_PRIMERO:
+            inicio_brazo = ticks_add(inicio, duracion_base)
+        elif paso[P_SINCRONIA] != SINC_PARALELO:
+            inicio_base = ticks_add(inicio, duracion_brazo)
+
+    eventos = []
+    t = inicio_base
+    if duracion_giro:
+        eventos.append((t, ACCION_GIRAR, paso[P_GIRO] > 0))
+        t = ticks_add(t, duracion_giro)
+    if duracion_avance and paso[P_OP] == OP_ARCO:
+        eventos.append((t, ACCION_ARCO, (paso[P_GIRO] > 0, paso[P_SENTIDO] > 0, paso[P_RELACION], paso[P_VELOCIDAD])))
+        t = ticks_add(t, duracion_avance)
+    elif duracion_avance:
+        eventos.append((t, ACCION_AVANZAR, (paso[P_SENTIDO] > 0, paso[P_VELOCIDAD], perfil)))
+        t = ticks_add(t, duracion_avance)
+    if not paso[P_CONTINUAR]:
+        eventos.append((t, ACCION_DETENER, None))
+
+    tramo_brazo = None
+    fin = t
+    if duracion_brazo:
+        fin_brazo = ticks_add(inicio_brazo, duracion_brazo)
+        tramo_brazo = (inicio_brazo, fin_brazo, paso[P_ANGULOS], paso[P_CURVA])
+        if ticks_diff(fin_brazo, fin) > 0:
+            fin = fin_brazo
+    return eventos, tramo_brazo, fin
+
+
+def duracion_plan_ms(plan, motor):
+    """Duración planificada de un plan completo (sin contar arranques ni frenadas)."""
+    total = 0
+    en_marcha = False
+    for paso in plan:
+        total = planificar_paso(paso, motor, total, en_marcha)[2]
+        en_marcha = bool(paso[P_CONTINUAR])
+    return total
+
+
+class LineaTiempo:
+    """
+    motor: perfil_avance(mm, mm/s, acelerar, frenar), duracion_giro_ms(grados), duracion_arco_ms(),
+    iniciar_avance(adelante, mm/s, perfil), iniciar_giro(derecha), iniciar_arco(), detener().
+    brazo: destino(angulos), posicionar_paso(trayectoria, k), angulos_actuales.
+    """
+
+    def __init__(self, motor, brazo):
+        self.motor = motor
+        self.brazo = brazo
+        self.t0 = ticks_ms()
+        self.en_marcha = False
+        self.registro = []  # (paso, plan_inicio, plan_fin, real_inicio, real_fin) en ms desde t0
+
+    def iniciar_programa(self):
+        """Empieza la cuenta de un programa; devuelve el plazo de inicio del primer paso."""
+        self.t0 = ticks_ms()
+        self.en_marcha = False
+        self.registro = []
+        return self.t0
+
+    def _relativo(self, instante):
+        return ticks_diff(instante, self.t0)
+
+    def _aplicar(self, accion, argumento):
+        if accion == ACCION_AVANZAR:
+            self.motor.iniciar_avance(argumento[0], argumento[1], argumento[2])
+        elif accion == ACCION_GIRAR:
+            self.motor.iniciar_giro(argumento)
+        elif accion == ACCION_ARCO:
+            self.motor.iniciar_arco(argumento[0], argumento[1], argumento[2], argumento[3])
+        else:
+            self.motor.detener()
+
+    async def ejecutar_paso(self, numero, paso, inicio):
+        """
+        Ejecuta el paso a partir del plazo 'inicio' y devuelve el plazo de fin,
+        que es el inicio del paso siguiente.
+        """
+        ahora = ticks_ms()
+        retraso = ticks_diff(ahora, inicio)
+        if retraso > TOLERANCIA_INICIO_MS:
+            print("Paso {}: empieza {} ms tarde, se replanifica".format(numero, retraso))
+            inicio = ahora
+
+        eventos, tramo_brazo, fin = planificar_paso(paso, self.motor, inicio, self.en_marcha)
+        if tramo_brazo is not None:
+            trayectoria = TrayectoriaBrazo(self.brazo.angulos_actuales, self.brazo.destino(tramo_brazo[2]),
+                                           ticks_diff(tramo_brazo[1], tramo_brazo[0]), tramo_brazo[3])
+            paso_brazo = 0
+        indice = 0
+        real_inicio = None
+
+        try:
+            while True:
+                ahora = ticks_ms()
+                while indice < len(eventos) and ticks_diff(ahora, eventos[indice][0]) >= 0:
+                    self._aplicar(eventos[indice][1], eventos[indice][2])
+                    if real_inicio is None:
+                        real_inicio = ahora
+                    indice += 1
+
+                proximo = fin
+                if tramo_brazo is not None and ticks_diff(ahora, tramo_brazo[0]) >= 0:
+                    if real_inicio is None:
+                        real_inicio = ahora
+                    k = trayectoria.paso_en(ticks_diff(ahora, tramo_brazo[0]))
+                    if k > paso_brazo:
+                        self.brazo.posicionar_paso(trayectoria, k)
+                        paso_brazo = k
+                    if k >= trayectoria.pasos:
+                        tramo_brazo = None
+                    else:
+                        proximo = ticks_add(tramo_brazo[0], trayectoria.instante_ms(k + 1))
+                elif tramo_brazo is not None:
+                    proximo = tramo_brazo[0]
+                if indice < len(eventos) and ticks_diff(eventos[indice][0], proximo) < 0:
+                    proximo = eventos[indice][0]
+
+                if indice == len(eventos) and tramo_brazo is None and ticks_diff(ahora, fin) >= 0:
+                    break
+                espera = ticks_diff(proximo, ticks_ms())
+                await asyncio.sleep(espera / 1000 if espera > 0 else 0)
+        except BaseException:
+            # Abortado o error: no dejar la base en marcha. Si el paso termina
+            # bien, la base se detiene con su evento (o sigue, si P_CONTINUAR)
+            self.motor.detener()
+            self.en_marcha = False
+            raise
+        self.en_marcha = bool(paso[P_CONTINUAR])
+
+        real_fin = ticks_ms()
+        if real_inicio is None:
+            real_inicio = real_fin
+        entrada = (numero, self._relativo(inicio), self._relativo(fin),
+                   self._relativo(real_inicio), self._relativo(real_fin))
+        self.registro.append(entrada)
+        print("Paso {}: plan {}-{} ms, real {}-{} ms ({:+d} ms)".format(
+            numero, entrada[1], entrada[2], entrada[3], entrada[4], entrada[4] - entrada[2]))
+        return fin
+
+    def resumen(self):
+        """Duración planificada y real del programa, en ms."""
+        if not self.registro:
+            return 0, 0
+        return self.registro[-1][2], self.registro[-1][4]
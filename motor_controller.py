@@ -1,5 +1,8 @@
-from machine import Pin, PWM
+from machine import Pin, PWM, Timer
+import math
 import time
+from calibracion_motores import TablaCalibracion, ARCHIVO_CALIBRACION, DUTY_MAXIMO
+from perfiles_movimiento import Rampa, crear_perfil
 
 # Constantes de calibración (AJUSTAR EXPERIMENTALMENTE)
 VELOCIDAD_BASE = 40000  # Duty cycle base (0-65535)
@@ -23,6 +26,10 @@ CM_POR_SEGUNDO = 25.0   # Velocidad lineal (cm/seg)
 # Si el carro no alcanza el valor del giro seleccionado, disminuir el valor de esta variable, Si se pasa, aumentarlo
 #Grados por segundo indica la velocidad angular del carro.
 GRADOS_POR_SEGUNDO = 120.0  # Velocidad angular (grados/seg) 
+# Distancia entre las ruedas izquierda y derecha, para los arcos (medir en el carro)
+ANCHO_EJE_MM = 150.0
+# Rampas de aceleración guardadas (una por velocidad usada)
+MAX_RAMPAS = 8
 
 class MotorController:
     def __init__(self):
@@ -45,6 +52,22 @@ class MotorController:
         self.velocidad_b = int(VELOCIDAD_BASE * AJUSTE_MOTOR_B)
         self.ena.duty_u16(self.velocidad_a)
         self.enb.duty_u16(self.velocidad_b)
+
+        # Los giros en el sitio y los movimientos con espera siguen con
+        # VELOCIDAD_BASE (CM_POR_SEGUNDO y GRADOS_POR_SEGUNDO se midieron así)
+        self.duty_base = (self.velocidad_a, self.velocidad_b)
+        # Tabla velocidad -> duty (calibracion_motores.py). Sin archivo de
+        # calibración: un solo punto, la velocidad de siempre
+        self.calibracion = TablaCalibracion.cargar(
+            ARCHIVO_CALIBRACION,
+            defecto=TablaCalibracion.por_defecto(CM_POR_SEGUNDO * 10, self.velocidad_a, self.velocidad_b))
+
+        # Perfiles de avance (perfiles_movimiento.py), reproducidos con un Timer
+        self.rampas = {}
+        self.timer = Timer()
+        self._perfil = None
+        self._tick = 0
+        self._tick_perfil = self._avanzar_perfil  # Callback creado una sola vez
     
     def _set_motors(self, dir_a, dir_b):
         """Control direccional independiente para cada motor"""
@@ -58,8 +81,12 @@ class MotorController:
     
     def _ajustar_velocidad(self, ajuste_temp_a=1.0, ajuste_temp_b=1.0):
         """Ajuste temporal de velocidad para maniobras"""
-        self.ena.duty_u16(int(self.velocidad_a * ajuste_temp_a))
-        self.enb.duty_u16(int(self.velocidad_b * ajuste_temp_b))
+        self.ena.duty_u16(min(DUTY_MAXIMO, int(self.velocidad_a * ajuste_temp_a)))
+        self.enb.duty_u16(min(DUTY_MAXIMO, int(self.velocidad_b * ajuste_temp_b)))
+
+    def fijar_velocidad(self, velocidad_mm_s):
+        """Ciclo útil de cada motor para esa velocidad lineal, según la calibración."""
+        self.velocidad_a, self.velocidad_b = self.calibracion.duties(velocidad_mm_s)
     
     def mover_adelante(self, distancia_cm):
         t = distancia_cm / CM_POR_SEGUNDO
@@ -96,8 +123,123 @@ class MotorController:
         self._ajustar_velocidad()  # Restaurar ajustes
     
     def detener(self):
+        self._parar_perfil()
         self._set_motors('stop', 'stop')
-    
+        # El siguiente movimiento fija su velocidad; si no, la base
+        self.velocidad_a, self.velocidad_b = self.duty_base
+
+    # API sin esperas para la línea de tiempo (linea_tiempo.py): las duraciones
+    # se calculan aquí, con la misma calibración, y quien llama decide cuándo
+    # detener. Distancias en mm y velocidades en mm/s, como en los programas;
+    # velocidad None es la máxima calibrada.
+    def duracion_giro_ms(self, angulo_grados):
+        return int(angulo_grados * 1000 / GRADOS_POR_SEGUNDO)
+
+    def rampa(self, velocidad_mm_s=None):
+        velocidad = self.calibracion.velocidad_real(velocidad_mm_s)
+        rampa = self.rampas.get(velocidad)
+        if rampa is None:
+            if len(self.rampas) >= MAX_RAMPAS:
+                self.rampas.clear()
+            rampa = self.rampas[velocidad] = Rampa(self.calibracion, velocidad)
+        return rampa
+
+    def perfil_avance(self, distancia_mm, velocidad_mm_s=None, acelerar=True, frenar=True):
+        """Perfil trapezoidal del avance; su duracion_ms es lo que tarda."""
+        return crear_perfil(self.rampa(velocidad_mm_s), distancia_mm, acelerar, frenar)
+
+    def _parar_perfil(self):
+        if self._perfil is not None:
+            self.timer.deinit()
+            self._perfil = None
+
+    def _avanzar_perfil(self, _timer):
+        # Callback del Timer: solo índices enteros y los dos duty_u16
+        perfil = self._perfil
+        if perfil is None:
+            return
+        self._tick += 1
+        i = perfil.indice(self._tick)
+        if i < 0:
+            # Se queda en el último ciclo útil hasta detener() o el siguiente movimiento
+            self._parar_perfil()
+            return
+        self.ena.duty_u16(perfil.duty_a[i])
+        self.enb.duty_u16(perfil.duty_b[i])
+
+    def iniciar_avance(self, adelante=True, velocidad_mm_s=None, perfil=None):
+        """Con perfil, arranca su primer tick y el Timer sigue con el resto."""
+        self._parar_perfil()
+        if perfil is None:
+            self.fijar_velocidad(velocidad_mm_s)
+            self._ajustar_velocidad()
+        else:
+            i = perfil.indice(0)
+            self.ena.duty_u16(perfil.duty_a[i])
+            self.enb.duty_u16(perfil.duty_b[i])
+            if perfil.con_rampas:
+                self._perfil = perfil
+                self._tick = 0
+                self.timer.init(period=perfil.periodo_ms, mode=Timer.PERIODIC, callback=self._tick_perfil)
+        if adelante:
+            self._set_motors('forward', 'forward')
+        else:
+            self._set_motors('backward', 'backward')
+
+    def iniciar_giro(self, derecha=True):
+        # Mismos ajustes de velocidad que girar_derecha / girar_izquierda
+        self._parar_perfil()
+        self.velocidad_a, self.velocidad_b = self.duty_base
+        if derecha:
+            self._ajustar_velocidad(ajuste_temp_a=1.2)
+            self._set_motors('forward', 'backward')
+        else:
+            self._ajustar_velocidad(ajuste_temp_b=1.5)
+            self._set_motors('backward', 'forward')
+
+    # Arcos de optimizador_rutas.py: la rueda exterior va a la velocidad pedida y
+    # la interior a 'relacion' de ella, según la calibración; por debajo de lo
+    # calibrado se escala el ciclo útil (como curva_suave). El centro avanza a
+    # la media de las dos.
+    def relacion_arco(self, distancia_mm, angulo_grados):
+        """Relación interior/exterior para girar angulo_grados en distancia_mm, o None si es muy cerrado."""
+        radio = distancia_mm / math.radians(angulo_grados)
+        if radio <= ANCHO_EJE_MM / 2:
+            return None
+        return (radio - ANCHO_EJE_MM / 2) / (radio + ANCHO_EJE_MM / 2)
+
+    def duracion_arco_ms(self, distancia_mm, relacion, velocidad_mm_s=None):
+        exterior = self.calibracion.velocidad_real(velocidad_mm_s)
+        return int(distancia_mm * 2000 / (exterior * (1 + relacion)))
+
+    def iniciar_arco(self, derecha, adelante, relacion, velocidad_mm_s=None):
+        self._parar_perfil()
+        exterior = self.calibracion.velocidad_real(velocidad_mm_s)
+        self.fijar_velocidad(exterior)
+        if exterior * relacion >= self.calibracion.velocidad_minima:
+            interior_a, interior_b = self.calibracion.duties(exterior * relacion)
+            if derecha:
+                self.velocidad_b = interior_b
+            else:
+                self.velocidad_a = interior_a
+            self._ajustar_velocidad()
+        elif derecha:
+            self._ajustar_velocidad(ajuste_temp_b=relacion)
+        else:
+            self._ajustar_velocidad(ajuste_temp_a=relacion)
+        if adelante:
+            self._set_motors('forward', 'forward')
+        else:
+            self._set_motors('backward', 'backward')
+
+    def correr_rueda(self, motor, duty, tiempo_s):
+        """Para calibrar: mueve solo una rueda ('a' o 'b') hacia adelante durante tiempo_s."""
+        self.ena.duty_u16(duty if motor == 'a' else 0)
+        self.enb.duty_u16(duty if motor == 'b' else 0)
+        self._set_motors('forward' if motor == 'a' else 'stop', 'forward' if motor == 'b' else 'stop')
+        time.sleep(tiempo_s)
+        self.detener()
+
     def curva_suave(self, direccion, radio_cm, distancia_cm):
         """Movimiento curvilíneo con radio controlado"""
         t = distancia_cm / CM_POR_SEGUNDO
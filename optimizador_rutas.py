@@ -0,0 +1,136 @@
+# optimizador_rutas.py
+# Pasada de optimización entre el parseo (comandos.py) y la ejecución
+# (linea_tiempo.py) de un programa completo:
+#   1. Quita los pasos que no hacen nada (sin distancia, sin giro y sin brazo).
+#   2. Junta rectas consecutivas en el mismo sentido (y la recta que sigue a
+#      un giro_y_recto) en un solo tramo.
+#   3. Si el programa lo permite ("permitir_arcos": true en el mensaje),
+#      cambia giro en el sitio + recta por un arco de tracción diferencial
+#      que termina con el mismo rumbo y recorre la misma distancia (la
+#      posición final no es idéntica: por eso hay que pedirlo).
+#   4. Marca los pasos tras los que la base puede seguir sin detenerse
+#      (P_CONTINUAR): el siguiente paso arranca avanzando en el mismo sentido.
+# Los programas que llegan por fragmentos se ejecutan tal cual: empezar antes
+# importa más que optimizar con pasos que todavía no llegaron.
+
+from comandos import (OP_RECTO, OP_GIRO_Y_RECTO, OP_ARCO, P_OP, P_SENTIDO, P_DISTANCIA,
+                      P_VELOCIDAD, P_ANGULO, P_ANGULOS, P_T_SER, P_SINCRONIA, P_CONTINUAR,
+                      P_RELACION, SINC_BRAZO_PRIMERO, SINC_AVANCE_PRIMERO)
+from linea_tiempo import duracion_plan_ms
+
+# Tiempo que se pierde en cada parada y arranque de la base (frenar, vencer
+# la inercia); solo se usa para el informe. AJUSTAR EXPERIMENTALMENTE
+PERDIDA_POR_PARADA_MS = 150
+
+
+def _reemplazar(paso, campos):
+    """Copia del paso con los campos {P_*: valor} cambiados (los pasos son tuplas)."""
+    nuevo = list(paso)
+    for indice in campos:
+        nuevo[indice] = campos[indice]
+    return tuple(nuevo)
+
+
+def _sin_movimiento(paso):
+    sin_giro = paso[P_OP] == OP_RECTO or paso[P_ANGULO] == 0
+    return paso[P_DISTANCIA] == 0 and sin_giro and paso[P_ANGULOS] is None
+
+
+def _hay_base(paso):
+    return paso[P_DISTANCIA] > 0 or (paso[P_OP] == OP_GIRO_Y_RECTO and paso[P_ANGULO] > 0)
+
+
+def _se_puede_juntar(anterior, paso):
+    """paso (una recta) puede sumarse al tramo recto final de anterior."""
+    return (paso[P_OP] == OP_RECTO and anterior[P_OP] in (OP_RECTO, OP_GIRO_Y_RECTO)
+            and paso[P_ANGULOS] is None and paso[P_SENTIDO] == anterior[P_SENTIDO]
+            and paso[P_VELOCIDAD] == anterior[P_VELOCIDAD]
+            and (anterior[P_ANGULOS] is None or anterior[P_SINCRONIA] != SINC_AVANCE_PRIMERO))
+
+
+class OptimizadorRutas:
+    """motor: el mismo objeto que usa la línea de tiempo (duraciones y relacion_arco)."""
+
+    def __init__(self, motor, perdida_por_parada_ms=PERDIDA_POR_PARADA_MS):
+        self.motor = motor
+        self.perdida_por_parada_ms = perdida_por_parada_ms
+        self.ultimo_informe = None
+
+    def optimizar(self, plan, permitir_arcos=False):
+        """Devuelve (plan optimizado, informe)."""
+        informe = {"pasos_antes": len(plan), "eliminados": 0, "juntados": 0, "arcos": 0}
+
+        pasos = []
+        for paso in plan:
+            if _sin_movimiento(paso):
+                informe["eliminados"] += 1
+            elif pasos and _se_puede_juntar(pasos[-1], paso):
+                anterior = pasos[-1]
+                pasos[-1] = _reemplazar(anterior, {P_DISTANCIA: anterior[P_DISTANCIA] + paso[P_DISTANCIA]})
+                informe["juntados"] += 1
+            else:
+                pasos.append(paso)
+
+        if permitir_arcos:
+            for i, paso in enumerate(pasos):
+                arco = self._como_arco(paso)
+                if arco is not None:
+                    pasos[i] = arco
+                    informe["arcos"] += 1
+
+        pasos, informe["paradas_evitadas"] = self._continuidad(pasos)
+
+        informe["pasos_despues"] = len(pasos)
+        informe["ms_antes"] = duracion_plan_ms(plan, self.motor) + self._paradas(plan) * self.perdida_por_parada_ms
+        informe["ms_despues"] = duracion_plan_ms(pasos, self.motor) + self._paradas(pasos) * self.perdida_por_parada_ms
+        self.ultimo_informe = informe
+        return tuple(pasos), informe
+
+    def optimizar_mensaje(self, plan, data):
+        """Para comandos.abrir_programa(mensaje, optimizar=...)."""
+        plan, informe = self.optimizar(plan, permitir_arcos=bool(data.get("permitir_arcos")))
+        print("Optimización: {} -> {} pasos ({} eliminados, {} juntados, {} arcos, {} paradas evitadas), "
+              "{} -> {} ms (ahorro {} ms)".format(
+                  informe["pasos_antes"], informe["pasos_despues"], informe["eliminados"], informe["juntados"],
+                  informe["arcos"], informe["paradas_evitadas"], informe["ms_antes"], informe["ms_despues"],
+                  informe["ms_antes"] - informe["ms_despues"]))
+        return plan
+
+    def _como_arco(self, paso):
+        if paso[P_OP] != OP_GIRO_Y_RECTO or paso[P_ANGULO] == 0 or paso[P_DISTANCIA] == 0 or paso[P_SENTIDO] < 0:
+            return None
+        relacion = self.motor.relacion_arco(paso[P_DISTANCIA], paso[P_ANGULO])
+        if relacion is None:
+            return None
+        return _reemplazar(paso, {P_OP: OP_ARCO, P_RELACION: relacion})
+
+    def _base_termina_al_final(self, paso):
+        """La base se mueve hasta el final del paso (el brazo no la deja esperando)."""
+        if paso[P_ANGULOS] is None or paso[P_SINCRONIA] == SINC_BRAZO_PRIMERO:
+            return True
+        if paso[P_SINCRONIA] == SINC_AVANCE_PRIMERO:
+            return False
+        duracion_base = duracion_plan_ms((_reemplazar(paso, {P_ANGULOS: None}),), self.motor)
+        return paso[P_T_SER] * 1000 <= duracion_base
+
+    def _continuidad(self, pasos):
+        evitadas = 0
+        for i in range(len(pasos) - 1):
+            paso, siguiente = pasos[i], pasos[i + 1]
+            sigue_avanzando = (paso[P_DISTANCIA] > 0 and siguiente[P_DISTANCIA] > 0
+                               and siguiente[P_OP] in (OP_RECTO, OP_ARCO)
+                               and siguiente[P_SENTIDO] == paso[P_SENTIDO]
+                               and (siguiente[P_ANGULOS] is None or siguiente[P_SINCRONIA] != SINC_BRAZO_PRIMERO))
+            if sigue_avanzando and self._base_termina_al_final(paso):
+                pasos[i] = _reemplazar(paso, {P_CONTINUAR: True})
+                evitadas += 1
+        return pasos, evitadas
+
+    def _paradas(self, plan):
+        """Paradas con la base en marcha antes y después (las que cuestan tiempo)."""
+        pasos = [paso for paso in plan if not _sin_movimiento(paso)]
+        paradas = 0
+        for i in range(len(pasos) - 1):
+            if _hay_base(pasos[i]) and _hay_base(pasos[i + 1]) and not pasos[i][P_CONTINUAR]:
+                paradas += 1
+        return paradas
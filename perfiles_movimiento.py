@@ -0,0 +1,118 @@
+# perfiles_movimiento.py
+# Perfiles trapezoidales (aceleración, crucero, frenado) para los avances en
+# línea recta. Pasar de parado al ciclo útil de crucero de golpe (y de vuelta)
+# hace patinar las ruedas al arrancar y deslizar al parar: el recorrido deja
+# de ser velocidad x tiempo, y más cuanto más rápido va el carro.
+#
+# Todo el cálculo en flotante se hace al planificar el paso:
+#   - Rampa: ciclos útiles de cada motor tick a tick, desde parado hasta una
+#     velocidad, sacados de la tabla de calibración. Se reutiliza para todos
+#     los movimientos a esa velocidad.
+#   - Perfil: cuántos ticks de subida, crucero y bajada necesita un avance
+#     concreto para recorrer su distancia.
+# Al reproducirlo con el Timer (motor_controller.py) solo hay índices enteros.
+
+from array import array
+
+PERIODO_PERFIL_MS = 10
+# Aceleración de las rampas, por debajo de la que patinan las ruedas (AJUSTAR EXPERIMENTALMENTE)
+ACELERACION_MM_S2 = 600
+
+
+class Rampa:
+    """
+    Ciclos útiles desde parado hasta 'velocidad' (mm/s) subiendo 'aceleracion'
+    mm/s² (None: sin rampa). El último elemento es el de crucero.
+    """
+
+    def __init__(self, tabla, velocidad, aceleracion=ACELERACION_MM_S2, periodo_ms=PERIODO_PERFIL_MS):
+        velocidad = tabla.velocidad_real(velocidad)
+        self.velocidad = velocidad
+        self.periodo_ms = periodo_ms
+
+        velocidades = []
+        if aceleracion:
+            incremento = aceleracion * periodo_ms / 1000
+            n = 1
+            while n * incremento < velocidad:
+                velocidades.append(n * incremento)
+                n += 1
+        velocidades.append(velocidad)
+
+        self.duty_a = array('H')
+        self.duty_b = array('H')
+        self.avance = array('f')  # mm que recorre el carro en un tick a cada velocidad
+        minima = tabla.velocidad_minima
+        for v in velocidades:
+            if v >= minima:
+                duty_a, duty_b = tabla.duties(v)
+            else:
+                # Por debajo de lo calibrado se escala el ciclo útil de la mínima
+                duty_a, duty_b = tabla.duties(minima)
+                duty_a, duty_b = int(duty_a * v / minima), int(duty_b * v / minima)
+            self.duty_a.append(duty_a)
+            self.duty_b.append(duty_b)
+            self.avance.append(v * periodo_ms / 1000)
+
+
+class Perfil:
+    """
+    Un avance: 'subida' ticks acelerando (índices 0..pico-1), 'crucero' ticks
+    en el índice 'pico' y 'bajada' ticks frenando (pico-1..0) de la rampa.
+    """
+
+    def __init__(self, rampa, subida, pico, crucero, bajada):
+        self.duty_a = rampa.duty_a
+        self.duty_b = rampa.duty_b
+        self.avance = rampa.avance
+        self.periodo_ms = rampa.periodo_ms
+        self.subida = subida
+        self.pico = pico
+        self.crucero = crucero
+        self.bajada = bajada
+        self.ticks = subida + crucero + bajada
+        self.duracion_ms = self.ticks * rampa.periodo_ms
+
+    @property
+    def con_rampas(self):
+        return self.subida > 0 or self.bajada > 0
+
+    def indice(self, tick):
+        """Índice en duty_a / duty_b para ese tick, o -1 si el perfil terminó."""
+        if tick < self.subida:
+            return tick
+        tick -= self.subida
+        if tick < self.crucero:
+            return self.pico
+        tick -= self.crucero
+        if tick < self.bajada:
+            return self.pico - 1 - tick
+        return -1
+
+    def recorrido_mm(self):
+        """Distancia que recorre si el carro sigue exactamente la rampa."""
+        total = 0.0
+        for tick in range(self.ticks):
+            total += self.avance[self.indice(tick)]
+        return total
+
+
+def crear_perfil(rampa, distancia_mm, acelerar=True, frenar=True):
+    """
+    Perfil para recorrer distancia_mm con esa rampa. acelerar / frenar: si
+    arranca desde parado y si termina parado (si sigue, va a velocidad de
+    crucero). Si las rampas no caben en la distancia, el pico baja (triángulo).
+    """
+    avance = rampa.avance
+    pico = len(avance) - 1
+    rampas = 0.0
+    veces = int(acelerar) + int(frenar)
+    if veces:
+        for i in range(pico):
+            rampas += avance[i] * veces
+        while pico > 0 and rampas > distancia_mm:
+            pico -= 1
+            rampas -= avance[pico] * veces
+    crucero = int(max(0.0, distancia_mm - rampas) / avance[pico] + 0.5)
+    return Perfil(rampa, pico if acelerar else 0, pico, crucero, pico if frenar else 0)
+
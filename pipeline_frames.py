@@ -0,0 +1,265 @@
+# pipeline_frames.py
+# Receptor -> cola acotada -> workers (procesos) de conversión y superresolución.
+# La recepción TCP nunca espera al modelo: si los workers van atrasados se
+# descarta el frame más antiguo y se trabaja siempre sobre el más reciente.
+
+import os
+import random
+import threading
+import time
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from conversion_yuv import yuv422_a_bgr
+from superresolucion import aplicar_nivel, es_modelo, precalentar_modelos
+
+
+class ColaUltimosFrames:
+    """
+    Cola FIFO acotada que descarta el elemento más antiguo cuando se llena.
+    Si se pone un elemento con una clave que ya está en la cola (misma
+    cámara), reemplaza al pendiente para que ninguna fuente acapare la cola.
+    """
+
+    def __init__(self, capacidad=2):
+        self.capacidad = capacidad
+        self._elementos = deque()
+        self._cond = threading.Condition()
+        self.descartados = 0
+
+    def poner(self, elemento, clave=None):
+        """Nunca bloquea. Devuelve el elemento descartado o None."""
+        descartado = None
+        with self._cond:
+            if clave is not None:
+                for pendiente in self._elementos:
+                    if pendiente[0] == clave:
+                        self._elementos.remove(pendiente)
+                        descartado = pendiente[1]
+                        break
+            if descartado is None and len(self._elementos) >= self.capacidad:
+                descartado = self._elementos.popleft()[1]
+            if descartado is not None:
+                self.descartados += 1
+            self._elementos.append((clave, elemento))
+            self._cond.notify()
+        return descartado
+
+    def sacar(self, timeout=None):
+        """Bloquea hasta que haya un elemento. Devuelve None si vence el timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._elementos, timeout):
+                return None
+            return self._elementos.popleft()[1]
+
+    def __len__(self):
+        with self._cond:
+            return len(self._elementos)
+
+
+class EstadisticasEtapa:
+    """Contador de latencias de una etapa del pipeline (tiempos en segundos)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cuenta = 0
+        self.total = 0.0
+        self.ultimo = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, segundos):
+        with self._lock:
+            self.cuenta += 1
+            self.total += segundos
+            self.ultimo = segundos
+            if segundos > self.maximo:
+                self.maximo = segundos
+
+    def resumen(self):
+        with self._lock:
+            promedio = self.total / self.cuenta if self.cuenta else 0.0
+            return {
+                "cuenta": self.cuenta,
+                "ultimo_ms": round(self.ultimo * 1000, 2),
+                "promedio_ms": round(promedio * 1000, 2),
+                "max_ms": round(self.maximo * 1000, 2),
+            }
+
+
+# --- Lado worker (se ejecuta dentro de cada proceso del pool) ---
+
+_directorio_modelos = "."
+
+
+def inicializar_worker(directorio_modelos, niveles_modelo, contadores, hilos_cv2=1):
+    """
+    Configura el proceso y empieza a cargar los modelos en segundo plano.
+    Mientras tanto los frames usan el nivel de respaldo (sin modelo).
+    """
+    global _directorio_modelos
+    cv2.setNumThreads(hilos_cv2)
+    _directorio_modelos = directorio_modelos
+    threading.Thread(target=precalentar_modelos, args=(niveles_modelo, directorio_modelos, contadores),
+                     name="precalentar", daemon=True).start()
+
+
+def arrancar_worker():
+    """Tarea vacía: obliga al pool a crear el proceso antes del primer frame."""
+    return os.getpid()
+
+
+def procesar_frame(yuv_data, width, height, nivel):
+    """
+    Convierte un frame YUV422 a BGR y lo escala con el nivel de
+    superresolución indicado.
+    Devuelve (imagen_bgr, tiempos, nivel_usado) con los tiempos de cada
+    etapa en segundos.
+    """
+    inicio = time.perf_counter()
+    esperado = width * height * 2
+    if len(yuv_data) != esperado:
+        print("Advertencia: tamaño inesperado. Completando.")
+        yuv_padded = bytearray(yuv_data[:esperado])
+        yuv_padded.extend([random.randint(0, 255) for _ in range(esperado - len(yuv_padded))])
+        yuv_data = yuv_padded
+
+    bgr = yuv422_a_bgr(yuv_data, width, height)
+    convertido = time.perf_counter()
+
+    imagen, nivel = aplicar_nivel(bgr, nivel, _directorio_modelos)
+    fin = time.perf_counter()
+    return imagen, {"conversion": convertido - inicio, "superresolucion": fin - convertido}, nivel
+
+
+# --- Lado servidor ---
+
+class PipelineFrames:
+    """
+    Recibe frames YUV crudos con enviar() y los procesa en un pool de procesos.
+    al_terminar(origen, imagen) se llama desde un hilo despachador con cada
+    resultado; origen es el id de cámara pasado a enviar().
+    Hay un hilo despachador por worker, así el pool nunca tiene más trabajo
+    encolado que procesos libres y la cola acotada decide qué se descarta.
+    El nivel de superresolución de cada frame lo decide el selector, que
+    recibe el tiempo de proceso medido de cada frame.
+    Los workers se crean y cargan sus modelos en segundo plano al iniciar();
+    un nivel con modelo se ofrece al selector cuando algún worker lo tiene.
+    """
+
+    ETAPAS = ("espera_cola", "conversion", "superresolucion", "entrega", "total")
+
+    def __init__(self, width, height, al_terminar, selector, directorio_modelos=".",
+                 workers=None, capacidad_cola=2):
+        self.width = width
+        self.height = height
+        self.al_terminar = al_terminar
+        self.selector = selector
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.cola = ColaUltimosFrames(capacidad_cola)
+        self.estadisticas = {etapa: EstadisticasEtapa() for etapa in self.ETAPAS}
+        self.recibidos = 0
+        self.procesados = 0
+        self.errores = 0
+        self._en_proceso = 0
+        self._lock = threading.Lock()
+        contexto = multiprocessing.get_context("spawn")
+        self.niveles_modelo = [nivel for nivel in selector.niveles if es_modelo(nivel)]
+        # Cuántos workers tienen listo cada modelo (mismo orden que niveles_modelo)
+        self._modelos_listos = contexto.Array("i", len(self.niveles_modelo))
+        selector.listo = self.nivel_listo
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=contexto,
+            initializer=inicializar_worker,
+            initargs=(directorio_modelos, self.niveles_modelo, self._modelos_listos),
+        )
+
+    def nivel_listo(self, nivel, todos=False):
+        """Un nivel sin modelo siempre está listo; uno con modelo, si algún worker (o todos) lo cargó."""
+        if not es_modelo(nivel):
+            return True
+        cargados = self._modelos_listos[self.niveles_modelo.index(nivel)]
+        return cargados >= self.workers if todos else cargados > 0
+
+    def preparacion(self):
+        """Estado del precalentamiento de los modelos."""
+        modelos = {nivel: self._modelos_listos[i] for i, nivel in enumerate(self.niveles_modelo)}
+        return {
+            "listo": all(cargados >= self.workers for cargados in modelos.values()),
+            "workers": self.workers,
+            "modelos_listos": modelos,
+        }
+
+    def iniciar(self):
+        # Crear los procesos ya (sin esperarlos) para que el primer frame no pague el arranque
+        for _ in range(self.workers):
+            self._pool.submit(arrancar_worker)
+        for i in range(self.workers):
+            threading.Thread(target=self._despachar, name=f"despachador-{i}", daemon=True).start()
+
+    def enviar(self, yuv_data, origen=None):
+        """Encola un frame recibido. No bloquea."""
+        with self._lock:
+            self.recibidos += 1
+        descartado = self.cola.poner((time.perf_counter(), origen, yuv_data), clave=origen)
+        if descartado is not None:
+            print("Pipeline saturado: se descarta el frame más antiguo.")
+
+    def _despachar(self):
+        while True:
+            elemento = self.cola.sacar()
+            if elemento is None:
+                continue
+            llegada, origen, yuv_data = elemento
+            inicio = time.perf_counter()
+            self.estadisticas["espera_cola"].registrar(inicio - llegada)
+            with self._lock:
+                self._en_proceso += 1
+            try:
+                nivel = self.selector.elegir()
+                futuro = self._pool.submit(procesar_frame, yuv_data, self.width, self.height, nivel)
+                imagen, tiempos, nivel = futuro.result()
+                for etapa, segundos in tiempos.items():
+                    self.estadisticas[etapa].registrar(segundos)
+                self.selector.registrar(nivel, sum(tiempos.values()))
+
+                entrega = time.perf_counter()
+                self.al_terminar(origen, imagen)
+                fin = time.perf_counter()
+                self.estadisticas["entrega"].registrar(fin - entrega)
+                self.estadisticas["total"].registrar(fin - llegada)
+                with self._lock:
+                    self.procesados += 1
+            except Exception as e:
+                print(f"Error en el pipeline: {e}")
+                with self._lock:
+                    self.errores += 1
+            finally:
+                with self._lock:
+                    self._en_proceso -= 1
+
+    def estado(self):
+        """Profundidad de cola, contadores y latencias por etapa."""
+        with self._lock:
+            contadores = {
+                "recibidos": self.recibidos,
+                "procesados": self.procesados,
+                "errores": self.errores,
+                "en_proceso": self._en_proceso,
+            }
+        contadores.update({
+            "workers": self.workers,
+            "profundidad_cola": len(self.cola),
+            "capacidad_cola": self.cola.capacidad,
+            "descartados": self.cola.descartados,
+            "etapas": {etapa: est.resumen() for etapa, est in self.estadisticas.items()},
+            "superresolucion": self.selector.estado(),
+            "preparacion": self.preparacion(),
+        })
+        return contadores
+
+    def cerrar(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,217 @@
+# receptor_camaras.py
+# Receptor TCP asyncio: atiende varias cámaras (Pico W) a la vez.
+# Cada conexión puede enviar uno o varios frames, en el formato de codec_frames
+# o en el de siempre (4 bytes de tamaño big endian + datos); el servidor
+# responde ACK/NACK a cada uno.
+
+import asyncio
+import socket
+import threading
+import time
+
+from almacen_frames import AlmacenFrames
+from codec_frames import MAGIC, TAMANO_CABECERA, DecodificadorFrames, desempaquetar_cabecera
+
+
+class RegistroCamaras:
+    """Un AlmacenFrames por cámara, creado la primera vez que se ve su id."""
+
+    def __init__(self, al_crear=None):
+        self.al_crear = al_crear
+        self._lock = threading.Lock()
+        self._almacenes = {}
+        self._info = {}
+        self.ultima = None  # id de la cámara que envió el último frame
+
+    def almacen(self, id_camara):
+        with self._lock:
+            almacen = self._almacenes.get(id_camara)
+            if almacen is not None:
+                return almacen
+            almacen = self._almacenes[id_camara] = AlmacenFrames()
+            self._info[id_camara] = {"frames": 0, "ultimo_frame": None}
+        print(f"Nueva cámara: {id_camara}")
+        if self.al_crear:
+            self.al_crear(id_camara, almacen)
+        return almacen
+
+    def obtener(self, id_camara=None):
+        """Almacén de una cámara (o de la última activa). None si no existe."""
+        with self._lock:
+            if id_camara is None:
+                id_camara = self.ultima
+            return self._almacenes.get(id_camara)
+
+    def registrar_frame(self, id_camara):
+        with self._lock:
+            info = self._info[id_camara]
+            info["frames"] += 1
+            info["ultimo_frame"] = time.time()
+            self.ultima = id_camara
+
+    def listar(self):
+        with self._lock:
+            return [
+                dict(id=id_camara, generacion=self._almacenes[id_camara].generacion, **info)
+                for id_camara, info in sorted(self._info.items())
+            ]
+
+
+# Buffer de recepción del socket: un frame completo cabe de una vez
+TAMANO_BUFFER_SOCKET = 1024 * 1024
+
+
+class ProtocoloCamara(asyncio.BufferedProtocol):
+    """
+    Una conexión de cámara. El transporte escribe directamente (recv_into)
+    en un bytearray preasignado del tamaño del frame, sin concatenar bytes.
+    Al completarse, ese bytearray se entrega tal cual a al_recibir (np.frombuffer
+    lo usa sin copiar) y se preasigna otro para el siguiente frame: el que se
+    entregó sigue en uso en la cola/almacén y no se puede sobrescribir.
+    Acepta el formato de codec_frames (cabecera "YF") y el anterior (4 bytes
+    de tamaño + YUV422). Un delta sin frame base se responde con NACK para
+    que la cámara envíe un frame clave.
+    """
+
+    PREFIJO, CABECERA, DATOS = range(3)
+
+    def __init__(self, receptor):
+        self.receptor = receptor
+        self.transport = None
+        self.direccion = None
+        self._cabecera = bytearray(TAMANO_CABECERA)
+        self._campos = None  # Cabecera del frame en curso (None en el formato anterior)
+        self._frame = bytearray(0)
+        self._empezar_prefijo()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, TAMANO_BUFFER_SOCKET)
+        self.direccion = transport.get_extra_info("peername")
+        self.receptor.conexiones += 1
+        print(f"Conexión desde {self.direccion}")
+
+    def get_buffer(self, sizehint):
+        return self._destino[self._recibidos:]
+
+    def buffer_updated(self, nbytes):
+        self._recibidos += nbytes
+        if self._recibidos < len(self._destino):
+            return
+        if self._fase == self.PREFIJO:
+            self._leer_prefijo()
+        elif self._fase == self.CABECERA:
+            self._leer_cabecera()
+        else:
+            self._terminar_frame()
+
+    def _esperar(self, fase, destino):
+        self._fase = fase
+        self._destino = destino
+        self._recibidos = 0
+
+    def _empezar_prefijo(self):
+        self._campos = None
+        self._esperar(self.PREFIJO, memoryview(self._cabecera)[:4])
+
+    def _leer_prefijo(self):
+        if self._cabecera[:2] == MAGIC:
+            self._esperar(self.CABECERA, memoryview(self._cabecera)[4:])
+        else:
+            self._empezar_datos(int.from_bytes(self._cabecera[:4], 'big'), vacio_permitido=False)
+
+    def _leer_cabecera(self):
+        try:
+            self._campos = desempaquetar_cabecera(self._cabecera)
+        except ValueError as e:
+            self._rechazar(str(e))
+            return
+        self._empezar_datos(self._campos[-1], vacio_permitido=True)
+
+    def _empezar_datos(self, size, vacio_permitido):
+        if not (0 < size or vacio_permitido) or size > self.receptor.tamano_maximo:
+            self._rechazar(f"Tamaño inválido: {size}")
+            return
+        if len(self._frame) != size:
+            self._frame = bytearray(size)
+        self._esperar(self.DATOS, memoryview(self._frame))
+        if size == 0:
+            self._terminar_frame()
+
+    def _rechazar(self, motivo):
+        print(f"{motivo} desde {self.direccion}")
+        self.transport.write(b"NACK")
+        self.transport.close()
+
+    def _terminar_frame(self):
+        datos, campos = self._frame, self._campos
+        # Preasignar el siguiente antes de entregar este
+        self._frame = bytearray(len(datos))
+        self._empezar_prefijo()
+
+        if campos is None:
+            id_camara, frame = self.direccion[0], datos
+        else:
+            id_camara = f"camara_{campos[2]}" if campos[2] else self.direccion[0]
+            try:
+                frame = self.receptor.decodificador(id_camara).decodificar(campos, datos)
+            except ValueError as e:
+                print(f"Frame descartado de {id_camara}: {e}")
+                self.transport.write(b"NACK")
+                return
+
+        self.transport.write(b"ACK")
+        registro = self.receptor.registro
+        registro.almacen(id_camara)
+        registro.registrar_frame(id_camara)
+        self.receptor.al_recibir(id_camara, frame)
+
+    def eof_received(self):
+        if self._fase != self.PREFIJO or self._recibidos:
+            print(f"Frame incompleto desde {self.direccion}.")
+            self.transport.write(b"NACK")
+        return False
+
+    def connection_lost(self, exc):
+        self.receptor.conexiones -= 1
+        if exc is not None:
+            print(f"Error en recepción desde {self.direccion}: {exc}")
+
+
+class ReceptorCamaras:
+    """
+    Servidor asyncio con un ProtocoloCamara por conexión.
+    al_recibir(id_camara, datos) se llama con cada frame completo (un
+    bytearray que pasa a ser del receptor de la llamada); debe ser rápido
+    (encolar) porque corre dentro del event loop.
+    """
+
+    def __init__(self, registro, al_recibir, host="0.0.0.0", port=8080, tamano_maximo=4 * 1024 * 1024):
+        self.registro = registro
+        self.al_recibir = al_recibir
+        self.host = host
+        self.port = port
+        self.tamano_maximo = tamano_maximo
+        self.conexiones = 0
+        self.escuchando = False
+        self._decodificadores = {}
+
+    def decodificador(self, id_camara):
+        """Estado de decodificación (frame anterior) de una cámara; vive más que la conexión."""
+        decodificador = self._decodificadores.get(id_camara)
+        if decodificador is None:
+            decodificador = self._decodificadores[id_camara] = DecodificadorFrames()
+        return decodificador
+
+    def iniciar_en_hilo(self):
+        threading.Thread(target=asyncio.run, args=(self.servir(),), name="receptor", daemon=True).start()
+
+    async def servir(self):
+        loop = asyncio.get_running_loop()
+        servidor = await loop.create_server(lambda: ProtocoloCamara(self), self.host, self.port)
+        self.escuchando = True
+        print(f"Esperando imágenes de las Pico W en el puerto {self.port}...")
+        async with servidor:
+            await servidor.serve_forever()
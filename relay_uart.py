@@ -0,0 +1,316 @@
+# relay_uart.py
+# Reenvío por UART de los mensajes que la central manda a otros carros.
+# Antes cada mensaje se volvía a serializar y se escribía con uart.write
+# bloqueante a 9600 baudios: un programa grande paraba el bucle principal
+# alrededor de un segundo. Ahora:
+#   - encolar() copia los bytes originales del datagrama, ya enmarcados, en
+#     un buffer circular y vuelve enseguida. Si no caben, se rechaza el
+#     mensaje y se cuenta (contrapresión): nunca se bloquea al que encola.
+#   - tarea() vacía el buffer en segundo plano, escribiendo en cada tick
+#     solo los bytes que la línea transmitió desde el anterior (como mucho
+#     TXBUF_UART), así que uart.write no espera.
+#   - Las tramas de datos que llegan del otro extremo se entregan a
+#     recibir(datos), si se indicó.
+#   - Al arrancar se propone al otro extremo subir a BAUDIOS_OBJETIVO.
+#   - Las tramas de control (negociación) no pasan por el buffer circular
+#     pero solo se escriben entre dos tramas de datos, nunca a mitad de una.
+#
+# Formato de trama (el otro extremo la lee con LectorTramas):
+#   SINCRONIA (2 bytes) | tipo (1) | longitud (2, big endian) | datos | suma (2)
+# suma: suma de los bytes de los datos, módulo 65536.
+#
+# Negociación de velocidad: quien propone envía TIPO_BAUDIOS con los
+# baudios y un sorteo (4 + 4 bytes); el otro responde TIPO_BAUDIOS_OK con
+# los baudios y cambia. Al recibir el OK, el que propuso cambia y confirma
+# con TIPO_CONFIRMAR. Si la confirmación no llega a la nueva velocidad, el
+# que respondió vuelve a la anterior; mientras espera no envía datos.
+# Si los dos extremos proponen a la vez (los dos arrancan con los valores
+# por defecto), sigue proponiendo el de sorteo mayor y el otro le responde.
+
+import struct
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+try:
+    from os import urandom
+except ImportError:
+    from uos import urandom
+
+from tiempo import ticks_ms, ticks_diff, ticks_add
+
+SINCRONIA = b"\xa5\x5a"
+CABECERA = 5                  # sincronía + tipo + longitud
+TIPO_DATOS = 0
+TIPO_BAUDIOS = 1
+TIPO_BAUDIOS_OK = 2
+TIPO_CONFIRMAR = 3
+
+CAPACIDAD_RELAY = 8192        # Bytes del buffer circular
+PERIODO_RELAY_MS = 10
+TXBUF_UART = 256              # Buffer de transmisión de machine.UART en el RP2040
+BAUDIOS_INICIALES = 9600
+BAUDIOS_OBJETIVO = 115200
+BAUDIOS_SOPORTADOS = (9600, 19200, 38400, 57600, 115200, 230400)
+TIMEOUT_BAUDIOS_MS = 500
+MAX_DATOS_TRAMA = 0xFFFF
+
+
+def suma16(datos):
+    return sum(datos) & 0xFFFF
+
+
+def trama(tipo, datos):
+    """Trama completa en bytes (para los mensajes de control y en el PC)."""
+    return SINCRONIA + struct.pack(">BH", tipo, len(datos)) + bytes(datos) + struct.pack(">H", suma16(datos))
+
+
+class LectorTramas:
+    """
+    Reconstruye las tramas de los bytes que llegan (en trozos de cualquier
+    tamaño). Los bytes que no forman una trama válida se descartan buscando la
+    siguiente sincronía.
+    """
+
+    def __init__(self, max_datos=CAPACIDAD_RELAY):
+        self.pendiente = bytearray()
+        self.max_datos = max_datos
+        self.tramas = 0
+        self.errores_suma = 0
+        self.descartados = 0
+
+    def agregar(self, datos):
+        """Devuelve la lista de (tipo, datos) completas."""
+        self.pendiente.extend(datos)
+        completas = []
+        while True:
+            inicio = self.pendiente.find(SINCRONIA)
+            if inicio < 0:
+                # Guardar el último byte por si es la mitad de la sincronía
+                sobra = len(self.pendiente) - 1
+                if sobra > 0:
+                    self.descartados += sobra
+                    del self.pendiente[:sobra]
+                return completas
+            if inicio:
+                self.descartados += inicio
+                del self.pendiente[:inicio]
+            if len(self.pendiente) < CABECERA:
+                return completas
+            tipo, longitud = struct.unpack_from(">BH", self.pendiente, 2)
+            if longitud > self.max_datos:
+                self.descartados += 2
+                del self.pendiente[:2]
+                continue
+            total = CABECERA + longitud + 2
+            if len(self.pendiente) < total:
+                return completas
+            datos = bytes(self.pendiente[CABECERA:CABECERA + longitud])
+            suma = struct.unpack_from(">H", self.pendiente, CABECERA + longitud)[0]
+            if suma == suma16(datos):
+                completas.append((tipo, datos))
+                self.tramas += 1
+                del self.pendiente[:total]
+            else:
+                # Puede ser una sincronía falsa dentro de otros datos
+                self.errores_suma += 1
+                self.descartados += 2
+                del self.pendiente[:2]
+
+
+class RelayUART:
+    """
+    uart: machine.UART (write, any, read, init, txdone). recibir(datos):
+    tramas de datos que llegan por la UART, o None para ignorarlas.
+    baudios_objetivo: velocidad a proponer al arrancar (None: no se negocia).
+    """
+
+    def __init__(self, uart, baudios=BAUDIOS_INICIALES, capacidad=CAPACIDAD_RELAY,
+                 periodo_ms=PERIODO_RELAY_MS, baudios_objetivo=BAUDIOS_OBJETIVO, recibir=None):
+        self.uart = uart
+        self.recibir = recibir
+        self.baudios = baudios
+        self.baudios_objetivo = baudios_objetivo
+        self.periodo_ms = periodo_ms
+        self.buffer = bytearray(capacidad)
+        self.vista = memoryview(self.buffer)
+        self.inicio = 0      # Siguiente byte a escribir en la UART
+        self.usado = 0
+        self._resto = 0      # Bytes que faltan de la trama a medio escribir (0: entre tramas)
+        self._controles = []  # Tramas de control esperando al fin de la trama en curso
+        self._ultimo_drenado = ticks_ms()
+        self.lector = LectorTramas()
+        self._respuesta_baudios = None
+        self._propuesta = None   # (baudios, sorteo) que propuso el otro extremo, por responder
+        self._sorteo = struct.unpack(">I", urandom(4))[0]  # Desempate si los dos proponen
+        self._confirmar = None   # (baudios anteriores, plazo) mientras se espera TIPO_CONFIRMAR
+        # Contadores
+        self.encolados = 0
+        self.rechazados = 0
+        self.bytes_enviados = 0
+        self.maximo_usado = 0
+
+    @property
+    def libre(self):
+        return len(self.buffer) - self.usado
+
+    def _copiar(self, datos):
+        """Copia al final del buffer circular (ya se comprobó que cabe)."""
+        n = len(datos)
+        fin = (self.inicio + self.usado) % len(self.buffer)
+        primero = min(n, len(self.buffer) - fin)
+        self.buffer[fin:fin + primero] = datos[:primero]
+        if primero < n:
+            self.buffer[:n - primero] = datos[primero:]
+        self.usado += n
+
+    def encolar(self, datos, tipo=TIPO_DATOS):
+        """
+        Encola los bytes (o el texto) como una trama. Devuelve False si no
+        caben: el que llama no se bloquea, el mensaje se pierde y se cuenta.
+        """
+        if isinstance(datos, str):
+            datos = datos.encode()
+        total = CABECERA + len(datos) + 2
+        if len(datos) > MAX_DATOS_TRAMA or total > self.libre:
+            self.rechazados += 1
+            return False
+        self._copiar(SINCRONIA)
+        self._copiar(struct.pack(">BH", tipo, len(datos)))
+        self._copiar(datos)
+        self._copiar(struct.pack(">H", suma16(datos)))
+        self.encolados += 1
+        if self.usado > self.maximo_usado:
+            self.maximo_usado = self.usado
+        return True
+
+    def _longitud_trama(self):
+        """Bytes de la trama que empieza en 'inicio' (su longitud está en la cabecera)."""
+        capacidad = len(self.buffer)
+        alto = self.buffer[(self.inicio + 3) % capacidad]
+        bajo = self.buffer[(self.inicio + 4) % capacidad]
+        return CABECERA + (alto << 8 | bajo) + 2
+
+    def drenar(self):
+        """
+        Escribe en la UART lo que la línea transmitió desde la última vez.
+        Las tramas de control pendientes salen en cuanto se termina la trama
+        de datos en curso, y después no se escribe nada más en este tick.
+        """
+        if self._confirmar is not None:
+            return  # Hasta saber si el otro extremo también cambió de velocidad
+        ahora = ticks_ms()
+        ms = max(self.periodo_ms, ticks_diff(ahora, self._ultimo_drenado))
+        self._ultimo_drenado = ahora
+        presupuesto = min(TXBUF_UART, max(1, self.baudios // 10 * ms // 1000))
+        while presupuesto:
+            if not self._resto:
+                if self._controles:
+                    for control in self._controles:
+                        self.uart.write(control)
+                    self._controles = []
+                    return
+                if not self.usado:
+                    return
+                self._resto = self._longitud_trama()
+            n = min(self._resto, presupuesto, len(self.buffer) - self.inicio)
+            escritos = self.uart.write(self.vista[self.inicio:self.inicio + n]) or 0
+            if not escritos:
+                return
+            self.inicio = (self.inicio + escritos) % len(self.buffer)
+            self.usado -= escritos
+            self._resto -= escritos
+            self.bytes_enviados += escritos
+            presupuesto -= escritos
+
+    # --- Lectura y negociación de velocidad --------------------------------
+
+    def _leer(self):
+        if not self.uart.any():
+            if self._confirmar is not None and ticks_diff(ticks_ms(), self._confirmar[1]) > 0:
+                print("Relay: sin confirmación a {} baudios, se vuelve a {}".format(self.baudios, self._confirmar[0]))
+                self._cambiar_baudios(self._confirmar[0])
+                self._confirmar = None
+            return
+        for tipo, datos in self.lector.agregar(self.uart.read()):
+            if tipo == TIPO_DATOS:
+                if self.recibir is not None:
+                    self.recibir(datos)
+            elif tipo == TIPO_CONFIRMAR:
+                self._confirmar = None
+            elif tipo in (TIPO_BAUDIOS, TIPO_BAUDIOS_OK):
+                if len(datos) != (8 if tipo == TIPO_BAUDIOS else 4):
+                    print("Relay: trama de baudios de {} bytes descartada".format(len(datos)))
+                elif tipo == TIPO_BAUDIOS:
+                    self._propuesta = struct.unpack(">II", datos)  # Se responde desde tarea() o negociar()
+                else:
+                    self._respuesta_baudios = struct.unpack(">I", datos)[0]
+
+    async def _enviar_ya(self, tipo, datos):
+        """
+        Trama de control, sin pasar por el buffer (va antes que los datos
+        pendientes, al terminar la trama en curso). Vuelve cuando ya salió
+        por la línea, para poder cambiar de velocidad detrás. Mientras se
+        espera una confirmación drenar() no escribe: se sigue leyendo para que
+        llegue o venza su plazo.
+        """
+        self._controles.append(trama(tipo, datos))
+        while self._controles:
+            self._leer()
+            self.drenar()
+            if self._controles:
+                await asyncio.sleep(self.periodo_ms / 1000)
+        while not self.uart.txdone():
+            await asyncio.sleep(self.periodo_ms / 1000)
+
+    def _cambiar_baudios(self, baudios):
+        self.uart.init(baudrate=baudios)
+        self.baudios = baudios
+        self.lector.pendiente[:] = b""
+
+    async def _responder_baudios(self, baudios):
+        if baudios not in BAUDIOS_SOPORTADOS:
+            return
+        await self._enviar_ya(TIPO_BAUDIOS_OK, struct.pack(">I", baudios))
+        self._confirmar = (self.baudios, ticks_add(ticks_ms(), TIMEOUT_BAUDIOS_MS))
+        self._cambiar_baudios(baudios)
+
+    async def negociar(self, baudios):
+        """
+        Propone 'baudios' al otro extremo; devuelve True si se cambió. Si el
+        otro también propone y gana el sorteo, se responde a su propuesta y
+        devuelve False.
+        """
+        self._respuesta_baudios = None
+        await self._enviar_ya(TIPO_BAUDIOS, struct.pack(">II", baudios, self._sorteo))
+        inicio = ticks_ms()
+        while ticks_diff(ticks_ms(), inicio) < TIMEOUT_BAUDIOS_MS:
+            self._leer()
+            if self._propuesta is not None:
+                propuesta, self._propuesta = self._propuesta, None
+                if propuesta[1] > self._sorteo:
+                    print("Relay: los dos extremos proponen, responde este")
+                    await self._responder_baudios(propuesta[0])
+                    return False
+                # Si no, el otro extremo responderá a la nuestra
+            if self._respuesta_baudios == baudios:
+                self._cambiar_baudios(baudios)
+                await self._enviar_ya(TIPO_CONFIRMAR, b"")
+                print("Relay: enlace a {} baudios".format(baudios))
+                return True
+            await asyncio.sleep(self.periodo_ms / 1000)
+        print("Relay: el otro extremo no respondió, se queda a {} baudios".format(self.baudios))
+        return False
+
+    async def tarea(self):
+        if self.baudios_objetivo and self.baudios_objetivo != self.baudios:
+            await self.negociar(self.baudios_objetivo)
+        while True:
+            self._leer()
+            if self._propuesta is not None:
+                (baudios, _), self._propuesta = self._propuesta, None
+                await self._responder_baudios(baudios)
+            self.drenar()
+            await asyncio.sleep(self.periodo_ms / 1000)
@@ -1,5 +1,6 @@
 from machine import Pin, PWM
-import time
+from interpolacion_brazo import TrayectoriaBrazo, recorrer, CURVA_LINEAL
+from tablas_servo import TablasServo
 
 class BrazoRobotico:
     def __init__(self):
@@ -15,11 +16,29 @@ class BrazoRobotico:
             'hombro': (-11111, 1550000),
             'codo': (-11668, 1550000)
         }
+        # Calibración y corrección del codo precalculadas (tablas_servo.py)
+        self.tablas = TablasServo(self.calibracion, self._corregir_codo)
         
+        # Último paso escrito de una trayectoria: angulos_actuales se calcula
+        # solo cuando alguien lo lee, no en cada paso
+        self._trayectoria = None
+        self._paso = 0
         self.angulos_actuales = [0, 90, 90]
         self.angulos_actuales[2] = self._corregir_codo(self.angulos_actuales[1], self.angulos_actuales[2])
         self.mover_brazo(self.angulos_actuales, tiempo_segundos=1.0)
     
+    @property
+    def angulos_actuales(self):
+        if self._trayectoria is not None:
+            self._angulos = list(self._trayectoria.angulos(self._paso))
+            self._trayectoria = None
+        return self._angulos
+    
+    @angulos_actuales.setter
+    def angulos_actuales(self, angulos):
+        self._angulos = angulos
+        self._trayectoria = None
+    
     def _corregir_codo(self, angulo_hombro, angulo_codo):
         if angulo_hombro == 90:
             return -angulo_codo + 90
@@ -27,22 +46,7 @@ class BrazoRobotico:
             return -0.6429 * angulo_codo + 102.86
         return angulo_codo
     
-    def _angulo_a_duty_ns(self, servo_nombre, angulo):
-        m, b = self.calibracion[servo_nombre]
-        return int(m * angulo + b)
-    
-    def _mover_suavemente(self, servo_pwm, servo_nombre, angulo_actual, angulo_final, tiempo_segundos):
-        pasos = 1000
-        delay = tiempo_segundos / pasos
-        delta = (angulo_final - angulo_actual) / pasos
-        
-        for i in range(pasos + 1):
-            angulo_interpolado = angulo_actual + delta * i
-            duty = self._angulo_a_duty_ns(servo_nombre, angulo_interpolado)
-            servo_pwm.duty_ns(duty)
-            time.sleep(delay)
-    
-    def mover_brazo(self, angulos, tiempo_segundos=1.0):
+    def mover_brazo(self, angulos, tiempo_segundos=1.0, curva=CURVA_LINEAL):
         if angulos is None:
             return
         
@@ -51,14 +55,30 @@ class BrazoRobotico:
         
         angulo_base, angulo_hombro, angulo_codo = angulos
         
-        angulo_codo_corregido = self._corregir_codo(angulo_hombro, angulo_codo)
+        angulo_codo_corregido = self.tablas.corregir_codo(angulo_hombro, angulo_codo)
         
-        self._mover_suavemente(self.base, 'base', self.angulos_actuales[0], angulo_base, tiempo_segundos)
-        self._mover_suavemente(self.hombro, 'hombro', self.angulos_actuales[1], angulo_hombro, tiempo_segundos)
-        self._mover_suavemente(self.codo, 'codo', self.angulos_actuales[2], angulo_codo_corregido, tiempo_segundos)
+        # Los tres servos a la vez, en tiempo_segundos (interpolacion_brazo.py)
+        trayectoria = TrayectoriaBrazo(self.angulos_actuales, (angulo_base, angulo_hombro, angulo_codo_corregido),
+                                       tiempo_segundos * 1000, curva)
+        recorrer(trayectoria, self.posicionar_paso)
         
         self.angulos_actuales = [angulo_base, angulo_hombro, angulo_codo_corregido]
     
+    # API sin esperas para la línea de tiempo (linea_tiempo.py), que recorre
+    # la trayectoria con su propio reloj
+    def destino(self, angulos):
+        """Ángulos que hay que aplicar a los servos (con la corrección del codo)."""
+        if len(angulos) != 3:
+            raise ValueError("Se requieren exactamente 3 ángulos")
+        angulo_base, angulo_hombro, angulo_codo = angulos
+        return (angulo_base, angulo_hombro, self.tablas.corregir_codo(angulo_hombro, angulo_codo))
+
+    def posicionar_paso(self, trayectoria, k):
+        """Escribe el paso k de la trayectoria: solo lecturas de las tablas."""
+        self.tablas.escribir(self.base, self.hombro, self.codo, trayectoria.indices, 3 * k)
+        self._trayectoria = trayectoria
+        self._paso = k
+
     def apagar(self):
         for servo in [self.base, self.hombro, self.codo]:
             try:
@@ -0,0 +1,204 @@
+# runtime_carro.py
+# Bucle principal del carro sobre asyncio (uasyncio en la Pico W).
+# Red, ejecución de programas, pantalla y telemetría son tareas que comparten
+# el procesador: mientras el carro se mueve se siguen leyendo los datagramas,
+# y un mensaje de control puede detener o reemplazar el programa en curso en
+# el siguiente tick de la tarea de red.
+#
+# Los mensajes llegan ya parseados desde ingesta_udp (red.recibir() devuelve
+# (texto, data, plan)) y ese mismo data se usa para despachar y para abrir el
+# programa. Los programas completos pasan por optimizador_rutas antes de
+# ejecutarse, y
+# los pasos se ejecutan con linea_tiempo.LineaTiempo, contra plazos absolutos.
+# La ingesta pregunta a admite() antes de confirmar un mensaje, así que los
+# pendientes no pasan de MAX_PENDIENTES sin descartar nada ya confirmado.
+#
+# La telemetría (telemetria.py) toma muestras cada PERIODO_MUESTREO_MS y al
+# terminar cada paso, y las publica juntas en un datagrama por send_interval.
+#
+# Si hay enlace UART con otros carros (relay_uart.RelayUART), su tarea vacía
+# el buffer de reenvío en segundo plano junto a las demás.
+#
+# El hardware se recibe desde main.py (motor, brazo, red, pantalla, relay), así que
+# el módulo se puede importar en el PC con objetos de prueba.
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+from comandos import abrir_programa, control_de, CONTROL_ABORTAR, CONTROL_REEMPLAZAR
+from linea_tiempo import LineaTiempo
+from optimizador_rutas import OptimizadorRutas
+from telemetria import Telemetria, PERIODO_MUESTREO_MS
+from tiempo import ticks_ms, ticks_diff, ticks_add
+
+TICK_RED_MS = 10             # Cada cuánto se revisa el socket
+PERIODO_PANTALLA_MS = 500
+MAX_PENDIENTES = 8           # Mensajes que se admiten mientras se ejecuta un programa
+
+
+class RuntimeCarro:
+    """
+    red: objeto con recibir() -> (texto, data, plan) o None, enviar(texto) -> bool,
+    read_internal_temp() y send_interval (CarroWiFi). pantalla: MyOLED o None.
+    relay: RelayUART o None.
+    """
+
+    def __init__(self, motor, brazo, red, pantalla=None, relay=None, tick_red_ms=TICK_RED_MS):
+        self.motor = motor
+        self.brazo = brazo
+        self.red = red
+        self.pantalla = pantalla
+        self.relay = relay
+        self.tick_red_ms = tick_red_ms
+        self.linea = LineaTiempo(motor, brazo)
+        self.optimizador = OptimizadorRutas(motor)
+        self.telemetria = Telemetria()
+
+        self.pendientes = []
+        self.programa = None
+        self.paso_actual = 0
+        self.estado = "esperando"
+        self._hay_mensajes = asyncio.Event()
+        self._tarea_programa = None
+
+    # --- Red ---------------------------------------------------------------
+
+    async def tarea_red(self):
+        while True:
+            msg = self.red.recibir()
+            while msg is not None:
+                try:
+                    self.despachar(msg[0], msg[1], msg[2])
+                except Exception as e:
+                    # Un mensaje malo no puede terminar la tarea de red (ni correr())
+                    print("Mensaje descartado:", e)
+                msg = self.red.recibir()
+            await asyncio.sleep(self.tick_red_ms / 1000)
+
+    def despachar(self, msg, data=None, plan=None):
+        """Decide qué hacer con un mensaje recibido (se llama desde la tarea de red)."""
+        control = control_de(msg, data)
+        if control == CONTROL_ABORTAR:
+            self.abortar()
+            return
+        if control == CONTROL_REEMPLAZAR:
+            self.abortar()
+        elif self.programa is not None and self.programa.agregar_mensaje(msg, data):
+            return
+
+        self.pendientes.append((msg, data, plan))
+        self._hay_mensajes.set()
+
+    def admite(self, msg, data, en_cola):
+        """
+        Para IngestaUDP.admitir: si hay sitio para el mensaje en pendientes,
+        contando los en_cola que la ingesta ya aceptó. Los controles y los
+        fragmentos del programa en curso no van a pendientes y siempre caben.
+        """
+        if control_de(msg, data) is not None:
+            return True
+        programa = self.programa
+        if programa is not None and programa.id is not None and data is not None \
+                and data.get("programa") == programa.id:
+            return True
+        return len(self.pendientes) + en_cola < MAX_PENDIENTES
+
+    def abortar(self):
+        """Detiene el carro ya y cancela el programa en curso y los pendientes."""
+        self.motor.detener()
+        self.pendientes.clear()
+        if self._tarea_programa is not None:
+            self._tarea_programa.cancel()
+
+    # --- Ejecución ---------------------------------------------------------
+
+    async def tarea_ejecutor(self):
+        while True:
+            while not self.pendientes:
+                self._hay_mensajes.clear()
+                await self._hay_mensajes.wait()
+            msg, data, plan = self.pendientes.pop(0)
+            print(f"Comando recibido: {msg}")
+            programa = abrir_programa(msg, optimizar=self.optimizador.optimizar_mensaje, data=data, plan=plan)
+            if programa is None:
+                print("Comando inválido. Esperando el siguiente mensaje...")
+                continue
+
+            self.programa = programa
+            self._tarea_programa = asyncio.create_task(self._ejecutar(programa))
+            try:
+                await self._tarea_programa
+                print("\n¡Todos los pasos completados con éxito!")
+            except asyncio.CancelledError:
+                print("Programa abortado")
+            except Exception as e:
+                print(f"Error durante la ejecución del paso: {e}")
+            finally:
+                self.motor.detener()
+                self.programa = None
+                self._tarea_programa = None
+                self.paso_actual = 0
+                self.estado = "esperando"
+
+    async def _ejecutar(self, programa):
+        # Fragmentos de este programa que llegaron antes que el primero
+        self.pendientes[:] = [m for m in self.pendientes if not programa.agregar_mensaje(m[0], m[1])]
+
+        plazo = self.linea.iniciar_programa()
+        while not programa.terminado:
+            siguiente = programa.siguiente()
+            if siguiente is None:
+                if programa.expirado():
+                    print("Programa {} incompleto: no llegaron más fragmentos".format(programa.id))
+                    return
+                self.estado = "esperando pasos"
+                await asyncio.sleep(self.tick_red_ms / 1000)
+                continue
+            self.paso_actual, paso = siguiente
+            self.estado = "paso {}".format(self.paso_actual)
+            print("\n--- Ejecutando Paso {} ---".format(self.paso_actual))
+            plazo = await self.linea.ejecutar_paso(self.paso_actual, paso, plazo)
+            numero, plan_inicio, plan_fin, real_inicio, real_fin = self.linea.registro[-1]
+            self.telemetria.registrar_paso(numero, plan_fin - plan_inicio, real_fin - real_inicio,
+                                           real_fin - plan_fin)
+
+        plan, real = self.linea.resumen()
+        print("Programa: plan {} ms, real {} ms".format(plan, real))
+
+    # --- Pantalla y telemetría ----------------------------------------------
+
+    async def tarea_pantalla(self):
+        mostrado = None
+        while True:
+            if self.pantalla is not None and self.estado != mostrado:
+                self.pantalla.draw_rectangle(0, 20, self.pantalla.width, 8, color=0, fill=True)
+                self.pantalla.write_text(self.estado, 0, 20)
+                mostrado = self.estado
+            await asyncio.sleep(PERIODO_PANTALLA_MS / 1000)
+
+    async def tarea_telemetria(self):
+        telemetria = self.telemetria
+        intervalo_ms = int(self.red.send_interval * 1000)
+        esperado = ticks_add(ticks_ms(), PERIODO_MUESTREO_MS)
+        proximo_envio = ticks_add(ticks_ms(), intervalo_ms)
+        while True:
+            await asyncio.sleep(PERIODO_MUESTREO_MS / 1000)
+            # Lo que tardó de más en despertar: cuánto tiempo retuvo el procesador otra tarea
+            ahora = ticks_ms()
+            retraso = max(0, ticks_diff(ahora, esperado))
+            esperado = ticks_add(ahora, PERIODO_MUESTREO_MS)
+            temperatura = self.red.read_internal_temp()
+            telemetria.muestrear(self.paso_actual, temperatura, retraso, self.programa is not None)
+            if ticks_diff(ahora, proximo_envio) >= 0:
+                proximo_envio = ticks_add(ahora, intervalo_ms)
+                telemetria.publicar(self.red.enviar, {"temperatura": temperatura, "estado": self.estado,
+                                                      "paso": self.paso_actual})
+
+    async def correr(self):
+        tareas = [self.tarea_red(), self.tarea_ejecutor(),
+                  self.tarea_pantalla(), self.tarea_telemetria()]
+        if self.relay is not None:
+            tareas.append(self.relay.tarea())
+        await asyncio.gather(*tareas)
@@ -0,0 +1,76 @@
+# secuencia.py
+# Entrega numerada de los comandos de la central.
+# La central (emisor_central.py) antepone a cada datagrama un sobre de texto
+#   "@<sesion>:<n>\n" + cuerpo
+# con el cuerpo de siempre detrás (JSON o formato_binario). sesion cambia
+# cada vez que arranca la central y n crece con cada comando nuevo para ese
+# destino; las retransmisiones repiten el mismo n. Como el cuerpo no cambia, la caché de
+# planes sigue acertando con los programas repetidos.
+#
+# El carro confirma cada comando aceptado con un datagrama ACK (texto_ack) y
+# descarta los n que ya vio con VentanaDuplicados: un ACK perdido hace que la
+# central reenvíe, y el repetido se vuelve a confirmar pero no se ejecuta.
+# Los datagramas sin sobre se siguen aceptando como antes, sin confirmación.
+
+SOBRE = 0x40               # "@": no empieza ningún JSON ni formato_binario
+MAX_SOBRE = 24             # "@65535:4294967295\n" cabe de sobra
+VENTANA_DUPLICADOS = 30    # n recordados por debajo del mayor (la máscara es un entero pequeño de MicroPython)
+
+
+def sobre(sesion, n, cuerpo):
+    """Lado central: cuerpo (bytes) con su sobre."""
+    return "@{}:{}\n".format(sesion, n).encode() + cuerpo
+
+
+def abrir_sobre(datagrama):
+    """(sesion, n, cuerpo) de un datagrama con sobre; cuerpo es una vista. ValueError si está mal formado."""
+    cabecera = bytes(datagrama[:MAX_SOBRE])
+    fin = cabecera.find(b"\n")
+    if cabecera[0] != SOBRE or fin < 0:
+        raise ValueError("Sobre de secuencia mal formado")
+    partes = cabecera[1:fin].split(b":")
+    if len(partes) != 2:
+        raise ValueError("Sobre de secuencia mal formado")
+    return int(partes[0]), int(partes[1]), datagrama[fin + 1:]
+
+
+def texto_ack(sesion, n, ip):
+    return '{"ack":%d,"s":%d,"ip":"%s"}' % (n, sesion, ip)
+
+
+class VentanaDuplicados:
+    """
+    Números de secuencia ya aceptados: el mayor y una máscara de bits con los
+    VENTANA_DUPLICADOS anteriores (bit d: se vio mayor - d). Lo que queda por
+    debajo de la ventana se trata como repetido; por eso la central no
+    manda un n que se adelante VENTANA_DUPLICADOS o más al más antiguo sin ACK.
+    """
+
+    def __init__(self, tamano=VENTANA_DUPLICADOS):
+        self.tamano = tamano
+        self.sesion = None
+        self.mayor = -1
+        self.mascara = 0
+
+    def visto(self, sesion, n):
+        if sesion != self.sesion or n > self.mayor:
+            return False
+        d = self.mayor - n
+        return d >= self.tamano or bool(self.mascara >> d & 1)
+
+    def marcar(self, sesion, n):
+        if sesion != self.sesion:
+            # La central se reinició: empieza otra numeración
+            self.sesion = sesion
+            self.mayor = n
+            self.mascara = 1
+        elif n > self.mayor:
+            salto = n - self.mayor
+            if salto < self.tamano:
+                # Se recorta antes de desplazar para no salir de los enteros pequeños
+                self.mascara = (self.mascara & ((1 << (self.tamano - salto)) - 1)) << salto | 1
+            else:
+                self.mascara = 1
+            self.mayor = n
+        else:
+            self.mascara |= 1 << (self.mayor - n)
@@ -0,0 +1,196 @@
+# superresolucion.py
+# Niveles de superresolución (de más barato a más caro) y selección automática
+# del nivel según un presupuesto de latencia por frame.
+
+import os
+import threading
+
+import cv2
+import numpy as np
+from cv2 import dnn_superres
+
+# nombre -> (archivo del modelo o interpolación de OpenCV, nombre en dnn_superres, escala)
+# Ordenados de menor a mayor calidad (y costo).
+NIVELES = {
+    "ninguno": (None, None, 1),
+    "bicubico": (cv2.INTER_CUBIC, None, 4),
+    "lanczos": (cv2.INTER_LANCZOS4, None, 4),
+    "espcn_x2": ("ESPCN_x2.pb", "espcn", 2),
+    "fsrcnn_x2": ("FSRCNN_x2.pb", "fsrcnn", 2),
+    "espcn_x4": ("ESPCN_x4.pb", "espcn", 4),
+    "fsrcnn_x4": ("FSRCNN_x4.pb", "fsrcnn", 4),
+    "edsr_x4": ("EDSR_x4.pb", "edsr", 4),
+}
+
+# Escala de salida de todos los niveles con modelo o interpolación; los
+# modelos x2 se completan con bicúbica para que el tamaño no cambie.
+ESCALA_SALIDA = 4
+
+# Camino rápido mientras el modelo pedido todavía se está cargando
+NIVEL_RESPALDO = "bicubico"
+
+
+def es_modelo(nivel):
+    return isinstance(NIVELES[nivel][0], str)
+
+
+def niveles_disponibles(directorio_modelos="."):
+    """Niveles utilizables: las interpolaciones y los modelos cuyo .pb existe."""
+    return [
+        nivel for nivel, (fuente, _, _) in NIVELES.items()
+        if not es_modelo(nivel) or os.path.exists(os.path.join(directorio_modelos, fuente))
+    ]
+
+
+# --- Lado worker ---
+
+_modelos = {}  # Solo modelos ya cargados y precalentados
+_lock_modelos = threading.Lock()
+
+
+def cargar_modelo(nivel, directorio_modelos="."):
+    """Carga (una vez por proceso) el modelo dnn_superres de un nivel."""
+    with _lock_modelos:
+        sr = _modelos.get(nivel)
+        if sr is None:
+            archivo, nombre, escala = NIVELES[nivel]
+            sr = dnn_superres.DnnSuperResImpl_create()
+            sr.readModel(os.path.join(directorio_modelos, archivo))
+            sr.setModel(nombre, escala)
+            # La primera inferencia es mucho más lenta que las siguientes
+            sr.upsample(np.zeros((16, 16, 3), dtype=np.uint8))
+            _modelos[nivel] = sr
+        return sr
+
+
+def precalentar_modelos(niveles, directorio_modelos, contadores=None):
+    """
+    Carga en orden los modelos de 'niveles' (pensado para un hilo aparte).
+    contadores (multiprocessing.Array) cuenta en cuántos workers está listo
+    cada nivel, en el mismo orden que 'niveles'.
+    """
+    for i, nivel in enumerate(niveles):
+        try:
+            cargar_modelo(nivel, directorio_modelos)
+        except Exception as e:
+            print(f"Error cargando el modelo {nivel}: {e}")
+            continue
+        if contadores is not None:
+            with contadores.get_lock():
+                contadores[i] += 1
+
+
+def aplicar_nivel(bgr, nivel, directorio_modelos="."):
+    """
+    Escala un frame BGR con el nivel indicado. Si es un modelo que este
+    proceso aún no tiene cargado, usa NIVEL_RESPALDO en vez de esperar.
+    Devuelve (imagen, nivel_usado).
+    """
+    if es_modelo(nivel) and nivel not in _modelos:
+        nivel = NIVEL_RESPALDO
+    fuente, _, escala = NIVELES[nivel]
+    if fuente is None:
+        return bgr, nivel
+    if not es_modelo(nivel):
+        return cv2.resize(bgr, None, fx=escala, fy=escala, interpolation=fuente), nivel
+
+    imagen = _modelos[nivel].upsample(bgr)
+    if escala != ESCALA_SALIDA:
+        factor = ESCALA_SALIDA // escala
+        imagen = cv2.resize(imagen, None, fx=factor, fy=factor, interpolation=cv2.INTER_CUBIC)
+    return imagen, nivel
+
+
+# --- Lado servidor ---
+
+class SelectorNivel:
+    """
+    Elige el nivel de mayor calidad cuyo tiempo medido (promedio móvil
+    exponencial) cabe en el presupuesto de latencia.
+    Un nivel que nunca se ha medido se prueba solo si el anterior dejó margen;
+    un nivel descartado por lento se vuelve a probar cada 'frames_reprueba'
+    frames, por si la carga del equipo cambió.
+    Con nivel_fijo se usa siempre ese nivel y solo se reportan los tiempos.
+    listo(nivel) indica si un nivel ya se puede usar (modelo cargado); los
+    que no están listos se saltan.
+    """
+
+    MARGEN_PRUEBA = 0.5  # Probar el siguiente nivel si el actual usa menos de la mitad
+
+    def __init__(self, niveles, presupuesto_s, nivel_fijo=None, alfa=0.3, frames_reprueba=200):
+        if nivel_fijo is not None and nivel_fijo not in niveles:
+            raise ValueError(f"Nivel de superresolución no disponible: {nivel_fijo}")
+        self.niveles = list(niveles)
+        self.presupuesto = presupuesto_s
+        self.nivel_fijo = nivel_fijo
+        self.alfa = alfa
+        self.frames_reprueba = frames_reprueba
+        self._lock = threading.Lock()
+        self._tiempos = {}
+        self._medido_en = {}
+        self._usos = {nivel: 0 for nivel in self.niveles}
+        self._frames = 0
+        self.activo = nivel_fijo or self.niveles[0]
+        self.listo = lambda nivel: True
+
+    def elegir(self):
+        with self._lock:
+            self._frames += 1
+            if self.nivel_fijo is None:
+                self.activo = self._elegir()
+            elif self.listo(self.nivel_fijo):
+                self.activo = self.nivel_fijo
+            else:
+                self.activo = self._mejor_listo_hasta(self.nivel_fijo)
+            self._usos[self.activo] += 1
+            return self.activo
+
+    def _mejor_listo_hasta(self, limite):
+        elegido = self.niveles[0]
+        for nivel in self.niveles[:self.niveles.index(limite)]:
+            if self.listo(nivel):
+                elegido = nivel
+        return elegido
+
+    def _elegir(self):
+        elegido = self.niveles[0]
+        for nivel in self.niveles:
+            if not self.listo(nivel):
+                continue
+            estimado = self._tiempos.get(nivel)
+            if estimado is not None and estimado > self.presupuesto \
+                    and self._frames - self._medido_en[nivel] >= self.frames_reprueba:
+                estimado = None  # Medición vieja: volver a probar
+            if estimado is None:
+                if self._tiempos.get(elegido, 0.0) <= self.presupuesto * self.MARGEN_PRUEBA:
+                    return nivel
+                break
+            if estimado > self.presupuesto:
+                break
+            elegido = nivel
+        return elegido
+
+    def registrar(self, nivel, segundos):
+        with self._lock:
+            anterior = self._tiempos.get(nivel)
+            if anterior is None or self._frames - self._medido_en[nivel] >= self.frames_reprueba:
+                self._tiempos[nivel] = segundos
+            else:
+                self._tiempos[nivel] = anterior + self.alfa * (segundos - anterior)
+            self._medido_en[nivel] = self._frames
+
+    def estado(self):
+        with self._lock:
+            return {
+                "activo": self.activo,
+                "modo": "fijo" if self.nivel_fijo else "auto",
+                "presupuesto_ms": round(self.presupuesto * 1000, 1),
+                "niveles": {
+                    nivel: {
+                        "promedio_ms": round(self._tiempos[nivel] * 1000, 2) if nivel in self._tiempos else None,
+                        "usos": self._usos[nivel],
+                        "listo": self.listo(nivel),
+                    }
+                    for nivel in self.niveles
+                },
+            }
@@ -0,0 +1,69 @@
+# tablas_servo.py
+# Tablas precalculadas ángulo -> duty_ns de los servos del brazo.
+# La calibración lineal de cada servo (m * angulo + b en BrazoRobotico) y la
+# corrección del codo según el hombro (_corregir_codo) se evalúan una sola vez
+# al arrancar, con PASOS_POR_GRADO valores por grado entre ANGULO_MINIMO y
+# ANGULO_MAXIMO. Las trayectorias (interpolacion_brazo.py) guardan el índice
+# de cada paso, así que escribir los servos es leer tres arrays: sin
+# flotantes, sin diccionarios y sin crear objetos.
+
+from array import array
+
+PASOS_POR_GRADO = 2       # Resolución de 0.5°, la banda muerta del servo
+ANGULO_MINIMO = -90       # La corrección del codo da ángulos negativos
+ANGULO_MAXIMO = 180
+INDICE_MAXIMO = (ANGULO_MAXIMO - ANGULO_MINIMO) * PASOS_POR_GRADO
+
+
+def indice_angulo(angulo):
+    """Índice en las tablas del ángulo más cercano (limitado al rango de las tablas)."""
+    i = int((angulo - ANGULO_MINIMO) * PASOS_POR_GRADO + 0.5)
+    if i < 0:
+        return 0
+    if i > INDICE_MAXIMO:
+        return INDICE_MAXIMO
+    return i
+
+
+def angulo_indice(i):
+    return i / PASOS_POR_GRADO + ANGULO_MINIMO
+
+
+def tabla_duty(m, b):
+    """duty_ns de m * angulo + b para cada índice (sin negativos)."""
+    return array('I', [max(0, int(m * angulo_indice(i) + b)) for i in range(INDICE_MAXIMO + 1)])
+
+
+def tabla_indices(funcion):
+    """Índice de funcion(angulo) para cada índice."""
+    return array('H', [indice_angulo(funcion(angulo_indice(i))) for i in range(INDICE_MAXIMO + 1)])
+
+
+class TablasServo:
+    """
+    calibracion: {'base': (m, b), 'hombro': (m, b), 'codo': (m, b)}.
+    corregir_codo(hombro, codo): la corrección del codo, que solo depende del
+    tramo en que está el hombro (90, entre 0 y 90, o ninguna).
+    """
+
+    def __init__(self, calibracion, corregir_codo):
+        self.base = tabla_duty(*calibracion['base'])
+        self.hombro = tabla_duty(*calibracion['hombro'])
+        self.codo = tabla_duty(*calibracion['codo'])
+        self.codo_hombro_90 = tabla_indices(lambda codo: corregir_codo(90, codo))
+        self.codo_hombro_medio = tabla_indices(lambda codo: corregir_codo(45, codo))
+
+    def corregir_codo(self, angulo_hombro, angulo_codo):
+        if angulo_hombro == 90:
+            tabla = self.codo_hombro_90
+        elif 0 < angulo_hombro < 90:
+            tabla = self.codo_hombro_medio
+        else:
+            return angulo_codo
+        return angulo_indice(tabla[indice_angulo(angulo_codo)])
+
+    def escribir(self, base, hombro, codo, indices, i):
+        """Escribe los servos con los índices indices[i], indices[i+1], indices[i+2]."""
+        base.duty_ns(self.base[indices[i]])
+        hombro.duty_ns(self.hombro[indices[i + 1]])
+        codo.duty_ns(self.codo[indices[i + 2]])
@@ -0,0 +1,120 @@
+# telemetria.py
+# Telemetría del carro: las muestras se guardan en un buffer circular de
+# tamaño fijo (arrays reservados al arrancar) y se publican todas juntas en un
+# solo datagrama por intervalo (send_interval de CarroWiFi).
+#
+# Cada muestra son CAMPOS enteros: tipo, t (ms desde el arranque), paso, v1, v2, v3
+#   MUESTRA_PASO:   al terminar un paso. v1 ms planificados, v2 ms reales,
+#                   v3 retraso del fin respecto al plan (ms)
+#   MUESTRA_ESTADO: cada PERIODO_MUESTREO_MS. v1 temperatura interna (décimas
+#                   de °C), v2 retraso máximo del bucle de asyncio (ms),
+#                   v3 memoria libre (bytes, -1 si no se sabe)
+#
+# Datagrama: {"temperatura", "estado", "paso" (los campos de siempre), "seq",
+# "perdidas", "fundidas", "m": [tipo, t, paso, v1, v2, v3, tipo, ...]}. La
+# lista plana de enteros es más corta y más barata de serializar que una lista
+# de objetos. Caben MAX_POR_DATAGRAMA muestras; el resto sale en el siguiente.
+#
+# Bajo carga (con un programa en marcha) las muestras de estado se funden en
+# la última pendiente (temperatura última, retraso máximo, memoria mínima):
+# el datagrama crece solo con los pasos y se serializa rápido. Si el buffer
+# se llena porque no se puede enviar, se pisan las muestras más antiguas y se
+# cuentan en "perdidas".
+
+import json
+from array import array
+
+from tiempo import ticks_ms, ticks_diff
+
+try:
+    from gc import mem_free
+except ImportError:  # CPython
+    mem_free = None
+
+MUESTRA_PASO = 0
+MUESTRA_ESTADO = 1
+CAMPOS = ("tipo", "t", "paso", "v1", "v2", "v3")
+
+CAPACIDAD_TELEMETRIA = 64
+PERIODO_MUESTREO_MS = 250
+MAX_POR_DATAGRAMA = 48    # ~1 KB de JSON: cabe en un datagrama sin fragmentar
+
+
+class Telemetria:
+    def __init__(self, capacidad=CAPACIDAD_TELEMETRIA, max_por_datagrama=MAX_POR_DATAGRAMA):
+        self.capacidad = capacidad
+        self.max_por_datagrama = max_por_datagrama
+        self.tipo = bytearray(capacidad)
+        self.t = array('i', [0] * capacidad)
+        self.paso = array('H', [0] * capacidad)
+        self.v1 = array('i', [0] * capacidad)
+        self.v2 = array('i', [0] * capacidad)
+        self.v3 = array('i', [0] * capacidad)
+        self.inicio = 0
+        self.usadas = 0
+        self._estado = -1     # Última muestra de estado pendiente, donde se funden las siguientes
+        self.t0 = ticks_ms()
+        self.seq = 0
+        self.perdidas = 0
+        self.fundidas = 0
+
+    def _agregar(self, tipo, paso, v1, v2, v3):
+        if self.usadas == self.capacidad:
+            if self.inicio == self._estado:
+                self._estado = -1
+            self.inicio = (self.inicio + 1) % self.capacidad
+            self.usadas -= 1
+            self.perdidas += 1
+        i = (self.inicio + self.usadas) % self.capacidad
+        self.tipo[i] = tipo
+        self.t[i] = ticks_diff(ticks_ms(), self.t0)
+        self.paso[i] = paso
+        self.v1[i] = v1
+        self.v2[i] = v2
+        self.v3[i] = v3
+        self.usadas += 1
+        return i
+
+    def registrar_paso(self, numero, plan_ms, real_ms, retraso_ms):
+        self._agregar(MUESTRA_PASO, numero, plan_ms, real_ms, retraso_ms)
+        self._estado = -1  # La siguiente muestra de estado va después del paso
+
+    def muestrear(self, paso, temperatura, retraso_bucle_ms, bajo_carga=False):
+        memoria = mem_free() if mem_free is not None else -1
+        decimas = int(temperatura * 10)
+        i = self._estado
+        if bajo_carga and i >= 0:
+            self.t[i] = ticks_diff(ticks_ms(), self.t0)
+            self.paso[i] = paso
+            self.v1[i] = decimas
+            if retraso_bucle_ms > self.v2[i]:
+                self.v2[i] = retraso_bucle_ms
+            if memoria < self.v3[i]:
+                self.v3[i] = memoria
+            self.fundidas += 1
+            return
+        self._estado = self._agregar(MUESTRA_ESTADO, paso, decimas, retraso_bucle_ms, memoria)
+
+    def publicar(self, enviar, campos):
+        """
+        Envía las muestras pendientes (hasta max_por_datagrama) junto a
+        'campos' con enviar(texto) -> bool. Si no se pudo enviar, se guardan
+        para el siguiente intento. Devuelve cuántas muestras salieron.
+        """
+        n = min(self.usadas, self.max_por_datagrama)
+        m = []
+        for k in range(n):
+            i = (self.inicio + k) % self.capacidad
+            m.extend((self.tipo[i], self.t[i], self.paso[i], self.v1[i], self.v2[i], self.v3[i]))
+        datos = dict(campos)
+        datos["seq"] = self.seq
+        datos["perdidas"] = self.perdidas
+        datos["fundidas"] = self.fundidas
+        datos["m"] = m
+        if not enviar(json.dumps(datos)):
+            return 0
+        self.seq += 1
+        self.inicio = (self.inicio + n) % self.capacidad
+        self.usadas -= n
+        self._estado = -1
+        return n
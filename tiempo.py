@@ -0,0 +1,21 @@
+# tiempo.py
+# ticks_ms / ticks_diff / ticks_add / sleep_ms de MicroPython, con un
+# equivalente en CPython para poder importar los módulos del carro en el PC
+# (las pruebas Prueba*.py). En el PC los ticks no dan la vuelta.
+
+try:
+    from time import ticks_ms, ticks_diff, ticks_add, sleep_ms
+except ImportError:  # CPython
+    from time import monotonic, sleep
+
+    def ticks_ms():
+        return int(monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+    def ticks_add(a, b):
+        return a + b
+
+    def sleep_ms(ms):
+        sleep(ms / 1000)